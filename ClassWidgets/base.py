@@ -1,7 +1,13 @@
-from PyQt5.QtWidgets import QWidget
+from contextlib import contextmanager
+import atexit
 import json
+import logging
 import os
+import select
 import sys
+import threading
+
+logger = logging.getLogger(__name__)
 
 
 def load_libs():  # 加载库文件
@@ -30,18 +36,137 @@ class PluginBase:  # 插件类
         pass
 
 
-class SettingsBase(QWidget):
-    def __init__(self, plugin_path, parent=None):
-        super().__init__(parent)
-        self.PATH = plugin_path
+def __getattr__(name):  # SettingsBase 依赖 Qt，首次使用时才导入 PyQt5
+    if name != 'SettingsBase':
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    from PyQt5.QtWidgets import QWidget
+
+    class SettingsBase(QWidget):
+        def __init__(self, plugin_path, parent=None):
+            super().__init__(parent)
+            self.PATH = plugin_path
+
+    globals()['SettingsBase'] = SettingsBase
+    return SettingsBase
+
+
+def _content_hash(data):  # hashlib 只在读写配置时才导入
+    import hashlib
+    return hashlib.sha1(data).digest()
+
+
+# inotify 事件：写入完成、移入（原子替换）、创建、删除
+_INOTIFY_MASK = 0x8 | 0x80 | 0x100 | 0x200
+
+
+def _inotify_watch(directory):  # Linux 上监视目录变化，失败或其它平台返回 None
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(directory), _INOTIFY_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except Exception:
+        return None
+
+
+class _ConfigWatcher:  # 配置文件变化监视线程：优先使用 inotify，否则定时检查文件状态
+    def __init__(self, config, poll_interval):
+        self.config = config
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._fd = _inotify_watch(config.path)
+        self._thread = threading.Thread(target=self._run, name='PluginConfigWatcher', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._fd is not None:
+                if not select.select([self._fd], [], [], self.poll_interval)[0]:
+                    continue
+                try:
+                    while os.read(self._fd, 4096):  # 只需知道目录有变化，事件内容直接丢弃
+                        pass
+                except BlockingIOError:
+                    pass
+            elif self._stop.wait(self.poll_interval):
+                break
+            if not self._stop.is_set():
+                self.config.update_config()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join(self.poll_interval + 1)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
 
 
 class PluginConfig:  # 简易的配置文件管理器
-    def __init__(self, path, filename):
+    def __init__(self, path, filename, flush_delay=None):
         self.path = path
         self.filename = filename
         self.config = {}
         self.full_path = os.path.join(self.path, self.filename)
+        # flush_delay 为 None 时每次修改立即保存；否则修改后延迟 flush_delay 秒在后台合并保存
+        self.flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._dirty_keys = set()  # 尚未写入文件的修改涉及的键，重新读取时保留
+        self._batch_depth = 0
+        self._timer = None
+        self._signature = None  # 上次读写时文件的 (mtime, 大小, inode)
+        self._digest = None  # 上次读写的文件内容哈希
+        self._callbacks = []
+        self._watcher = None
+        if flush_delay is not None:
+            atexit.register(self.flush)
+
+    @property
+    def dirty(self):  # 是否有尚未写入文件的修改
+        return self._dirty
+
+    @contextmanager
+    def transaction(self):  # 批量修改，退出时只保存一次
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._dirty:
+                    self._schedule_save()
+
+    def _mark_dirty(self):
+        with self._lock:
+            self._dirty = True
+            if self._batch_depth == 0:
+                self._schedule_save()
+
+    def _schedule_save(self):
+        if self.flush_delay is None:
+            self.save_config()
+        elif self._timer is None:  # 已有待执行的保存时合并到同一次写入
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):  # 立即写入尚未保存的修改（退出前调用）
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._dirty:
+                self.save_config()
 
     def load_config(self, default_config):
         if default_config is None:
@@ -49,40 +174,109 @@ class PluginConfig:  # 简易的配置文件管理器
             default_config = {}
         # 如果文件存在，加载配置
         if os.path.exists(self.full_path):
-            with open(self.full_path, 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
+            with self._lock:
+                signature = self._stat()
+                with open(self.full_path, 'rb') as f:
+                    data = f.read()
+                self.config = json.loads(data.decode('utf-8'))
+                self._signature = signature
+                self._digest = _content_hash(data)
         else:
             self.config = default_config  # 如果文件不存在，使用默认配置
             self.save_config()
 
-    def update_config(self):  # 更新配置
+    def _stat(self):
         try:
-            with open(self.full_path, 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
-        except Exception as e:
-            print(f'Error: {e}')
-            self.config = {}
+            st = os.stat(self.full_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def update_config(self):  # 更新配置，文件未变化时只检查文件状态；返回配置是否改变
+        with self._lock:
+            signature = self._stat()
+            if signature == self._signature:
+                return False
+            self._signature = signature  # 读取失败时也只在文件再次变化后重试
+            try:
+                with open(self.full_path, 'rb') as f:
+                    data = f.read()
+                digest = _content_hash(data)
+                if digest == self._digest:  # 只是修改时间变化，内容相同
+                    return False
+                config = json.loads(data.decode('utf-8'))
+            except Exception as e:
+                # 文件损坏或正在写入：保留上次有效的配置，文件再次变化时重新读取
+                logger.error('配置文件读取失败，继续使用当前配置 %s: %s', self.full_path, e)
+                return False
+            if not isinstance(config, dict):
+                logger.error('配置文件格式无效，继续使用当前配置: %s', self.full_path)
+                return False
+            for key in self._dirty_keys:  # 尚未保存的修改覆盖在新内容上，之后一起写入
+                if key in self.config:
+                    config[key] = self.config[key]
+            self.config = config
+            self._digest = digest
+            callbacks = list(self._callbacks)
+
+        for callback in callbacks:
+            try:
+                callback(config)
+            except Exception as e:
+                logger.error('配置变化回调失败: %s', e)
+        return True
+
+    def subscribe(self, callback, poll_interval=2):  # 文件内容变化时调用 callback(config)（在监视线程中调用）
+        with self._lock:
+            if callback not in self._callbacks:
+                self._callbacks.append(callback)
+            if self._watcher is None:
+                self._watcher = _ConfigWatcher(self, poll_interval)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+            watcher = None
+            if not self._callbacks and self._watcher is not None:
+                watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.stop()
 
     def upload_config(self, key=str or list, value=None):
-        if type(key) == str:
-            self.config[key] = value
-        elif type(key) == list:
-            for k in key:
-                self.config[k] = value
-        else:
-            raise TypeError('key must be str or list (键的类型必须是字符串或列表)')
-        self.save_config()
+        with self._lock:
+            if type(key) == str:
+                self.config[key] = value
+                self._dirty_keys.add(key)
+            elif type(key) == list:
+                for k in key:
+                    self.config[k] = value
+                    self._dirty_keys.add(k)
+            else:
+                raise TypeError('key must be str or list (键的类型必须是字符串或列表)')
+        self._mark_dirty()
 
-    def save_config(self):
-        with open(self.full_path, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=4)
+    def save_config(self):  # 先写临时文件再替换，避免写入中断时损坏配置
+        with self._lock:
+            data = json.dumps(self.config, ensure_ascii=False, indent=4).encode('utf-8')
+            temp_path = self.full_path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self.full_path)
+            self._dirty = False
+            self._dirty_keys.clear()
+            # 自己写入的内容不触发变化通知
+            self._signature = self._stat()
+            self._digest = _content_hash(data)
 
     def __getitem__(self, key):
         return self.config.get(key)
 
     def __setitem__(self, key, value):
-        self.config[key] = value
-        self.save_config()
+        with self._lock:
+            self.config[key] = value
+            self._dirty_keys.add(key)
+        self._mark_dirty()
 
     def __repr__(self):
         return json.dumps(self.config, ensure_ascii=False, indent=4)
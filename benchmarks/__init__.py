@@ -0,0 +1,27 @@
+"""EasiControl 性能基准
+
+在插件根目录下运行，例如：
+    python -m benchmarks.bench_process_watcher
+    python -m benchmarks.bench_update --output result.json
+    python -m benchmarks.soak --ticks 1000000
+    python -m benchmarks.bench_startup --budget-ms 150
+    python -m benchmarks.bench_fleet --rooms 1000 --days 7
+    python -m benchmarks.replay log/trace.ndjson
+    python -m benchmarks.stress_widget_store --writers 8 --seconds 5
+"""
+import importlib
+import sys
+import types
+from pathlib import Path
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+PACKAGE_NAME = 'easi_control'
+
+
+def load_plugin_module(name, package=PACKAGE_NAME, path=PLUGIN_DIR):
+    """按包内相对导入的方式加载插件模块（不执行插件 __init__）"""
+    if package not in sys.modules:
+        module = types.ModuleType(package)
+        module.__path__ = [str(path)]
+        sys.modules[package] = module
+    return importlib.import_module(f'{package}.{name}')
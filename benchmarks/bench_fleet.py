@@ -0,0 +1,100 @@
+"""全校批量布局计算基准
+
+生成 --rooms 间教室（--timetables 份不同的课表、--rule-sets 份不同的规则），
+用 fleet.evaluate 计算一周内每间教室每分钟的组件布局，记录耗时和输出表格大小。
+耗时超过 --budget-s 时退出码为 1。需要 NumPy。
+
+    python -m benchmarks.bench_fleet --rooms 1000 --days 7 --workers 4
+    python -m benchmarks.bench_fleet --rooms 50 --csv fleet.csv
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date
+
+from . import load_plugin_module
+from .host_sim import plugin_version
+
+SUBJECTS = ['语文', '数学', '英语', '物理', '化学', '生物', '历史', '地理', '政治', '体育', '自习']
+
+
+def make_schedule(rng):
+    """ClassWidgets 课表：上午 4 节、下午 4 节，每天课程随机"""
+    timeline = {}
+    for part in '01':
+        for i in range(1, 5):
+            timeline[f'a{part}{i}'] = '40'
+            if i < 4:
+                timeline[f'f{part}{i}'] = '10'
+    return {
+        'part': {'0': [8, 0, 'part'], '1': [14, 0, 'part']},
+        'part_name': {'0': '上午', '1': '下午'},
+        'timeline': {'default': timeline},
+        'schedule': {str(d): [rng.choice(SUBJECTS) for _ in range(8)] if d < 5 else [] for d in range(7)}
+    }
+
+
+def make_rules(rng):
+    rules = [
+        {'name': 'self-study', 'lessons': ['自习'], 'swap': ['weather.ui', 'countdown.ui']},
+        {'name': 'break', 'lessons': ['课间'], 'slot': 0, 'widget': 'break-tips.ui'},
+        {'name': 'evening', 'time': ['18:00', '07:00'], 'slot': -1, 'widget': 'night.ui'},
+        {'name': 'music', 'process': 'lx-music-desktop.exe', 'slot': -1, 'widget': 'lx-music-lyrics.ui'}
+    ]
+    return rng.sample(rules, rng.randint(2, len(rules)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--timetables', type=int, default=50, help='不同课表的数量')
+    parser.add_argument('--rule-sets', type=int, default=5, help='不同规则文件的数量')
+    parser.add_argument('--workers', type=int, default=1, help='按教室分片的进程数')
+    parser.add_argument('--budget-s', type=float, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--csv', help='写出计算结果表格')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    fleet = load_plugin_module('fleet')
+    rng = random.Random(args.seed)
+    schedules = [make_schedule(rng) for _ in range(args.timetables)]
+    rule_sets = [make_rules(rng) for _ in range(args.rule_sets)]
+    widgets = ['weather.ui', 'clock.ui', 'countdown-day.ui', 'schedule.ui', 'lyrics-slot.ui']
+    rooms = [
+        fleet.Room(f'room-{i:04d}', rng.choice(schedules), widgets, rng.choice(rule_sets))
+        for i in range(args.rooms)
+    ]
+
+    start = time.perf_counter()
+    timeline = fleet.evaluate(rooms, date(2025, 5, 5), days=args.days, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    if args.csv:
+        with open(args.csv, 'w', encoding='utf-8') as f:
+            timeline.write_csv(f)
+
+    report = {
+        'plugin_version': plugin_version(),
+        'python': sys.version.split()[0],
+        'params': {k: v for k, v in vars(args).items() if k not in ('csv', 'output')},
+        'seconds': elapsed,
+        'room_minutes_per_s': args.rooms * args.days * fleet.MINUTES_PER_DAY / elapsed,
+        'runs': len(timeline),
+        'layouts': len(timeline.layouts),
+        'passed': elapsed <= args.budget_s
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == '__main__':
+    main()
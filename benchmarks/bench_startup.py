@@ -0,0 +1,122 @@
+"""插件冷启动基准
+
+每一轮在新的解释器进程和新的插件副本中测量：导入插件模块、构造 Plugin、
+execute()（延迟初始化）和首次 update() 的耗时，并记录 PyQt5 / psutil 在各阶段是否已被导入。
+冷启动（导入 + 构造 + execute）耗时的中位数超过 --budget-ms，或构造阶段导入了 Qt / psutil 时退出码为 1。
+
+每一轮的插件副本都没有 __pycache__，所有模块都从源码编译，结果比宿主第二次启动时偏慢。
+参考机器（1 核 Intel Xeon 虚拟机、Python 3.11.7）上冷启动中位数约 95–105 ms，其中导入约 55 ms、
+execute 约 45 ms（主要是 logging.handlers 和课表读取）；默认上限 150 ms 为轮次间的波动留出余量，
+在更慢的机器上比较时按比例调整 --budget-ms。
+
+    python -m benchmarks.bench_startup --rounds 10 --budget-ms 150
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from . import PLUGIN_DIR
+from .host_sim import _IGNORED, plugin_version
+
+LAZY_MODULES = ('PyQt5', 'psutil')
+PHASES = ('import', 'construct', 'execute', 'first_update')
+
+
+# 子进程只导入计时所需的最少模块，避免提前加载插件依赖的标准库
+_CHILD = r"""
+import sys, time
+sys.path.insert(0, sys.argv[1])
+from benchmarks import load_plugin_module
+
+LAZY_MODULES = %r
+result = {'seconds': {}, 'loaded': {}}
+
+def mark(phase, start):
+    result['seconds'][phase] = time.perf_counter() - start
+    result['loaded'][phase] = [name for name in LAZY_MODULES if name in sys.modules]
+
+start = time.perf_counter()
+main = load_plugin_module('main', package='easi_control_startup', path=sys.argv[2])
+mark('import', start)
+
+contexts = {'PLUGIN_PATH': sys.argv[2], 'BASE_DIRECTORY': sys.argv[3], 'Current_Lesson': ''}
+start = time.perf_counter()
+plugin = main.Plugin(contexts, None)
+mark('construct', start)
+
+start = time.perf_counter()
+plugin.execute()
+mark('execute', start)
+
+start = time.perf_counter()
+plugin.update(contexts)
+mark('first_update', start)
+
+plugin.shutdown()
+import json
+print(json.dumps(result))
+""" % (LAZY_MODULES,)
+
+
+def run_round(workdir):
+    plugin_dir = os.path.join(workdir, 'plugin')
+    base_dir = os.path.join(workdir, 'host')
+    shutil.copytree(PLUGIN_DIR, plugin_dir, ignore=_IGNORED)
+    os.makedirs(os.path.join(base_dir, 'config'))
+    with open(os.path.join(base_dir, 'config', 'widget.json'), 'w', encoding='utf-8') as f:
+        json.dump({'widgets': ['example-1.ui', 'lyrics-slot.ui']}, f, indent=4)
+
+    output = subprocess.run(
+        [sys.executable, '-c', _CHILD, str(PLUGIN_DIR), plugin_dir, base_dir],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=150, help='冷启动（导入 + 构造 + execute）耗时上限')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    rounds = []
+    for _ in range(args.rounds):
+        workdir = tempfile.mkdtemp(prefix='easi-startup-')
+        try:
+            rounds.append(run_round(workdir))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def median_ms(values):
+        values = sorted(values)
+        return values[len(values) // 2] * 1e3
+
+    phases = {phase: median_ms([r['seconds'][phase] for r in rounds]) for phase in PHASES}
+    cold_start = median_ms([sum(r['seconds'][p] for p in ('import', 'construct', 'execute')) for r in rounds])
+    eager = sorted({name for r in rounds for name in r['loaded']['construct']})
+    report = {
+        'plugin_version': plugin_version(),
+        'python': sys.version.split()[0],
+        'params': {'rounds': args.rounds, 'budget_ms': args.budget_ms},
+        'phases_ms': phases,
+        'cold_start_ms': cold_start,
+        'loaded': rounds[-1]['loaded'] if rounds else {},
+        'passed': cold_start <= args.budget_ms and not eager
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == '__main__':
+    main()
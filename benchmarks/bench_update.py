@@ -0,0 +1,120 @@
+"""Plugin.update 宿主开销基准
+
+在模拟宿主中以宿主频率（host，每 tick 1 秒）和压力频率（stress，每 tick 10 毫秒）
+驱动 update()，输出 JSON：tick 耗时 p50/p99/max、每 tick 文件读写次数和内存分配峰值。
+
+    python -m benchmarks.bench_update --ticks 20000 --processes 500 --output result.json
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from .host_sim import HostSimulator, IOCounter, lesson_script, percentiles, plugin_version
+
+LESSONS = ['Subject_1', '课间', '数学', '暂无课程']
+RATES = {'host': 1.0, 'stress': 0.01}
+
+
+def _wait_idle(sim):
+    worker = sim.plugin.worker
+    while worker is not None and not worker.idle():
+        time.sleep(0.001)
+
+
+def _drive(sim, ticks, dt, lessons, process_ticks):
+    for i in range(ticks):
+        if process_ticks and i % process_ticks == 0:
+            sim.set_process((i // process_ticks) % 2 == 0)
+        yield sim.tick(next(lessons), dt)
+
+
+def run_scenario(name, args):
+    dt = RATES[name]
+    sim = HostSimulator(
+        tempfile.mkdtemp(prefix='easi-bench-'),
+        widgets=args.widgets,
+        process_count=args.processes,
+        real_processes=args.real_processes,
+        background={'inline': False, 'background': True}.get(args.mode)
+    )
+    lessons = lesson_script(LESSONS, max(1, int(args.lesson_seconds / dt)))
+    process_ticks = max(1, int(args.process_seconds / dt))
+    try:
+        for _ in _drive(sim, args.warmup, dt, lessons, process_ticks):
+            pass
+        _wait_idle(sim)
+
+        with IOCounter() as io:
+            samples = list(_drive(sim, args.ticks, dt, lessons, process_ticks))
+            _wait_idle(sim)
+
+        # 单独测量内存分配，避免 tracemalloc 影响耗时统计
+        alloc_ticks = min(args.ticks, args.alloc_ticks)
+        peaks = []
+        tracemalloc.start()
+        start_current = tracemalloc.get_traced_memory()[0]
+        for i in range(alloc_ticks):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            sim.tick(next(lessons), dt)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        _wait_idle(sim)
+        net_growth = tracemalloc.get_traced_memory()[0] - start_current
+        tracemalloc.stop()
+        peaks.sort()
+
+        return {
+            'dt_seconds': dt,
+            'ticks': args.ticks,
+            'latency': percentiles(samples),
+            'io_per_tick': {key: value / args.ticks for key, value in io.snapshot().items()},
+            'io_total': io.snapshot(),
+            'alloc': {
+                'ticks': alloc_ticks,
+                'peak_bytes_p50': peaks[len(peaks) // 2] if peaks else 0,
+                'peak_bytes_max': peaks[-1] if peaks else 0,
+                'net_growth_bytes': net_growth
+            },
+            'widget_store': dict(sim.plugin.widget_store.stats)
+        }
+    finally:
+        sim.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ticks', type=int, default=20000)
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--alloc-ticks', type=int, default=2000, help='用于统计内存分配的 tick 数')
+    parser.add_argument('--processes', type=int, default=300, help='模拟进程表大小')
+    parser.add_argument('--real-processes', action='store_true', help='使用本机真实进程表（需要 psutil）')
+    parser.add_argument('--widgets', type=int, default=8)
+    parser.add_argument('--lesson-seconds', type=float, default=300, help='每节课持续的虚拟秒数')
+    parser.add_argument('--process-seconds', type=float, default=600, help='目标进程启动/退出切换的虚拟秒数')
+    parser.add_argument('--mode', choices=['default', 'inline', 'background'], default='default')
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(RATES), default=['host', 'stress'])
+    parser.add_argument('--output', help='结果 JSON 文件（默认输出到标准输出）')
+    args = parser.parse_args()
+
+    report = {
+        'plugin_version': plugin_version(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'params': vars(args),
+        'results': {name: run_scenario(name, args) for name in args.scenarios}
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""ClassWidgets 宿主模拟器
+
+将插件复制到临时目录中加载（config/ 与 log/ 不会写入真实插件目录），
+使用虚拟时钟、合成的 widget.json 和模拟进程表驱动 Plugin.update()。
+"""
+import builtins
+import itertools
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+from . import PLUGIN_DIR, load_plugin_module
+
+TARGET = 'lx-music-desktop.exe'
+
+_IGNORED = shutil.ignore_patterns(
+    'config', 'log', 'benchmarks', '.git', '.github', '__pycache__', '*.png', '*.jsonl', 'img', 'assets'
+)
+_package_ids = itertools.count()
+
+
+def _simulate_read():
+    with open(__file__, 'rb') as f:
+        f.read(64)
+
+
+class FakeProcessTable:
+    """兼容 psutil 接口的模拟进程表
+
+    每次读取进程名或创建时间（构造 Process 时）都会真实读取一次小文件，以近似 /proc 读取的系统调用开销。
+    """
+
+    class Error(Exception):
+        pass
+
+    class NoSuchProcess(Error):
+        pass
+
+    class AccessDenied(Error):
+        pass
+
+    def __init__(self, size, target_present=False):
+        self._next_pid = itertools.count(1000)
+        self._clock = itertools.count(1)
+        self.table = {}
+        self.created = {}  # pid -> 创建时间
+        self.name_reads = 0
+        for _ in range(size):
+            self.spawn(f'proc-{len(self.table)}.exe')
+        if target_present:
+            self.spawn(TARGET)
+
+    def spawn(self, name, pid=None):
+        """启动进程；指定 pid 时模拟系统复用已退出进程的 PID"""
+        if pid is None:
+            pid = next(self._next_pid)
+        self.table[pid] = name
+        self.created[pid] = next(self._clock)
+        return pid
+
+    def kill(self, name):
+        for pid in [pid for pid, n in self.table.items() if n == name]:
+            del self.table[pid]
+            del self.created[pid]
+
+    def churn(self, count):
+        """结束 count 个普通进程并启动同样数量的新进程"""
+        victims = [pid for pid, name in self.table.items() if name != TARGET][:count]
+        for pid in victims:
+            del self.table[pid]
+            del self.created[pid]
+            self.spawn(f'proc-{pid}-new.exe')
+
+    def pids(self):
+        return list(self.table)
+
+    def Process(self, pid):
+        if pid not in self.table:
+            raise self.NoSuchProcess(pid)
+        return _FakeProcess(self, pid)
+
+    def process_iter(self, attrs=None):
+        for pid in list(self.table):
+            proc = _FakeProcess(self, pid)
+            proc.info = {'name': proc.name()}
+            yield proc
+
+
+class _FakeProcess:
+    def __init__(self, table, pid):
+        # 与 psutil 相同：构造时读取创建时间，用于识别 PID 复用
+        _simulate_read()
+        self._table = table
+        self.pid = pid
+        self._created = table.created.get(pid)
+
+    def create_time(self):
+        if self._created is None:
+            raise self._table.NoSuchProcess(self.pid)
+        return self._created
+
+    def name(self):
+        self._table.name_reads += 1
+        _simulate_read()
+        try:
+            return self._table.table[self.pid]
+        except KeyError:
+            raise self._table.NoSuchProcess(self.pid)
+
+    def is_running(self):
+        return self._table.created.get(self.pid) == self._created
+
+
+class VirtualClock:
+    """替换插件中的 time / datetime，使模拟不受真实时间限制"""
+
+    def __init__(self, start=None):
+        self.now_ts = start if start is not None else datetime(2025, 5, 1, 7, 30).timestamp()
+
+    def advance(self, seconds):
+        self.now_ts += seconds
+
+    def time(self):
+        return self.now_ts
+
+    def now(self):
+        return datetime.fromtimestamp(self.now_ts)
+
+
+class IOCounter:
+    """统计文件打开（读/写）、os.replace 和 os.stat 调用次数"""
+
+    def __init__(self):
+        self.counts = {'reads': 0, 'writes': 0, 'replaces': 0, 'stats': 0}
+        self._originals = None
+
+    def __enter__(self):
+        self._originals = (builtins.open, os.replace, os.stat)
+        real_open, real_replace, real_stat = self._originals
+        counts = self.counts
+
+        def open_(file, mode='r', *args, **kwargs):
+            counts['writes' if any(c in mode for c in 'wax+') else 'reads'] += 1
+            return real_open(file, mode, *args, **kwargs)
+
+        def replace_(*args, **kwargs):
+            counts['replaces'] += 1
+            return real_replace(*args, **kwargs)
+
+        def stat_(*args, **kwargs):
+            counts['stats'] += 1
+            return real_stat(*args, **kwargs)
+
+        builtins.open, os.replace, os.stat = open_, replace_, stat_
+        return self
+
+    def __exit__(self, *exc):
+        builtins.open, os.replace, os.stat = self._originals
+
+    def snapshot(self):
+        return dict(self.counts)
+
+
+def lesson_script(lessons, ticks_per_lesson):
+    """按顺序循环的课程序列，每节课持续 ticks_per_lesson 个 tick"""
+    for lesson in itertools.cycle(lessons):
+        for _ in range(ticks_per_lesson):
+            yield lesson
+
+
+class HostSimulator:
+    """在隔离目录中构建 Plugin 并模拟宿主调用 update()"""
+
+    def __init__(self, workdir, widgets=8, process_count=300, real_processes=False, background=None, setup=None):
+        self.workdir = workdir
+        self.plugin_dir = os.path.join(workdir, 'plugin')
+        self.base_dir = os.path.join(workdir, 'host')
+        shutil.copytree(PLUGIN_DIR, self.plugin_dir, ignore=_IGNORED)
+        os.makedirs(os.path.join(self.base_dir, 'config'))
+
+        widget_list = [f'widget-{i}.ui' for i in range(widgets - 2)] + ['example-1.ui', 'lyrics-slot.ui']
+        with open(os.path.join(self.base_dir, 'config', 'widget.json'), 'w', encoding='utf-8') as f:
+            json.dump({'widgets': widget_list, 'theme': 'default'}, f, indent=4)
+
+        self.clock = VirtualClock()
+        self.table = None if real_processes else FakeProcessTable(process_count)
+
+        package = f'easi_control_sim{next(_package_ids)}'
+        main = load_plugin_module('main', package=package, path=self.plugin_dir)
+        watcher = load_plugin_module('process_watcher', package=package, path=self.plugin_dir)
+        main.time = self.clock
+        main.datetime = self.clock
+        if self.table is not None:
+            watcher.psutil = self.table
+        if background is not None:
+            main.BACKGROUND_WORKER = background
+        main.SHARED_DETECTOR = False  # 不与本机真实插件实例共享检测结果
+        self.main = main
+
+        self.contexts = {'PLUGIN_PATH': self.plugin_dir, 'BASE_DIRECTORY': self.base_dir, 'Current_Lesson': ''}
+        if setup is not None:
+            setup(self)  # 构造 Plugin 之前修改配置文件或模块常量
+        self.plugin = main.Plugin(self.contexts, None)
+        self.plugin.execute()
+
+    def set_process(self, running):
+        if self.table is None:
+            return
+        if running and not any(n == TARGET for n in self.table.table.values()):
+            self.table.spawn(TARGET)
+        elif not running:
+            self.table.kill(TARGET)
+
+    def tick(self, lesson, dt):
+        """推进虚拟时钟并调用一次 update()，返回耗时（秒）"""
+        self.clock.advance(dt)
+        self.contexts['Current_Lesson'] = lesson
+        start = time.perf_counter()
+        self.plugin.update(self.contexts)
+        return time.perf_counter() - start
+
+    def close(self):
+        self.plugin.shutdown()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def percentiles(samples):
+    """返回 p50/p99/max/mean（微秒）"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    n = len(ordered)
+    return {
+        'p50_us': ordered[n // 2] * 1e6,
+        'p99_us': ordered[min(n - 1, int(n * 0.99))] * 1e6,
+        'max_us': ordered[-1] * 1e6,
+        'mean_us': sum(ordered) / n * 1e6
+    }
+
+
+def plugin_version():
+    with open(os.path.join(PLUGIN_DIR, 'plugin.json'), 'r', encoding='utf-8') as f:
+        return json.load(f).get('version')
@@ -0,0 +1,170 @@
+"""回放 tick 记录
+
+读取插件记录的 trace（log/trace.ndjson 及其轮转文件，需要 TRACE_ENABLED 或 config/trace.enable），
+在隔离目录中按 start 记录重建 widget.json、规则和状态，用虚拟时钟依次重放每个 tick 的课程输入、
+进程检测结果和规则变化，比较当前版本执行的操作与记录是否一致。不一致时退出码为 1。
+
+    python -m benchmarks.replay log/trace.ndjson
+    python -m benchmarks.replay log/trace.ndjson --session -1 --output report.json
+"""
+import argparse
+import bisect
+import json
+import os
+import sys
+import tempfile
+import time
+
+from . import load_plugin_module
+from .host_sim import HostSimulator, plugin_version
+
+
+class RecordedProcesses:
+    """按虚拟时间返回记录中的进程检测结果，代替 ProcessWatcher"""
+
+    def __init__(self, records, clock):
+        self.clock = clock
+        self._times = [record['t'] for record in records]
+        self._results = [record['running'] for record in records]
+        self.stats = {}
+
+    def watch(self, key, name=None, predicate=None):
+        pass
+
+    def unwatch(self, key):
+        pass
+
+    def poll(self):
+        index = bisect.bisect_right(self._times, self.clock.time()) - 1
+        return dict(self._results[index]) if index >= 0 else {}
+
+    def close(self):
+        pass
+
+
+def _setup(start):
+    def setup(sim):
+        main = sim.main
+        main.TRACE_ENABLED = True  # 用回放自身的记录比较执行的操作
+        main.TIMETABLE = False  # 课表切换按记录中的课程重放
+        sim.clock.now_ts = start['t']
+
+        config_dir = os.path.join(sim.plugin_dir, 'config')
+        os.makedirs(config_dir, exist_ok=True)
+        if start.get('widget_config') is not None:
+            with open(os.path.join(sim.base_dir, 'config', 'widget.json'), 'w', encoding='utf-8') as f:
+                json.dump(start['widget_config'], f, indent=4)
+        with open(os.path.join(config_dir, 'rules.json'), 'w', encoding='utf-8') as f:
+            json.dump({'rules': start['rules']}, f, indent=4)
+        state_journal = load_plugin_module('state_journal', package=main.__package__, path=sim.plugin_dir)
+        journal = state_journal.StateJournal(os.path.join(config_dir, 'state.journal'))
+        for name, backup in start['applied'].items():
+            journal.set(name, backup)
+        journal.compact()
+        journal.close()
+    return setup
+
+
+def replay(session, max_idle_ticks=100000):
+    """重放一次运行的记录，返回 (记录中的操作, 回放执行的操作, tick 数, 耗时)"""
+    start = session[0]
+    workdir = tempfile.mkdtemp(prefix='easi-replay-')
+    sim = HostSimulator(workdir, background=False, setup=_setup(start))
+    plugin = sim.plugin
+    plugin.process_watcher = RecordedProcesses([r for r in session if r['k'] == 'process'], sim.clock)
+
+    expected = []
+    process = None  # 记录中在下一个 tick 生效的检测结果
+    ticks = 0
+    began = time.perf_counter()
+    try:
+        for record in session:
+            kind = record['k']
+            if kind == 'actions':
+                expected.append(record)
+            elif kind == 'process':
+                process = record['running']
+            elif kind == 'rules':
+                plugin._rules_reload = record['config']
+                plugin.scheduler.wake()
+            elif kind == 'tick':
+                # 记录之间由调度器安排的 tick（例如失败重试的时间点可能不同）
+                for _ in range(max_idle_ticks):
+                    due = max(plugin.scheduler.next_due, sim.clock.now_ts)
+                    if due >= record['t']:
+                        break
+                    sim.clock.now_ts = due
+                    plugin.update(sim.contexts)
+                    ticks += 1
+
+                sim.clock.now_ts = record['t']
+                sim.contexts['Current_Lesson'] = record['lesson']
+                if process is not None:
+                    # 检测结果按记录的时间生效，不依赖回放自身的检测间隔
+                    plugin._on_process_result(process)
+                    plugin.scheduler.wake()
+                    process = None
+                if record.get('timetable') != plugin._timetable_lesson:
+                    plugin._timetable_lesson = record.get('timetable')
+                    plugin.scheduler.wake()
+                plugin.update(sim.contexts)
+                ticks += 1
+        elapsed = time.perf_counter() - began
+
+        plugin.trace.flush()
+        tick_trace = load_plugin_module('tick_trace', package=sim.main.__package__, path=sim.plugin_dir)
+        actual = [r for r in tick_trace.read_trace(plugin.trace.path) if r['k'] == 'actions']
+    finally:
+        sim.close()
+    return expected, actual, ticks, elapsed
+
+
+def compare(expected, actual, tolerance):
+    """逐条比较执行的操作和之后的生效规则，时间相差超过 tolerance 秒也视为不一致"""
+    mismatches = []
+    for i in range(max(len(expected), len(actual))):
+        want = expected[i] if i < len(expected) else None
+        got = actual[i] if i < len(actual) else None
+        if want is None or got is None or want['done'] != got['done'] or want['applied'] != got['applied'] \
+                or abs(want['t'] - got['t']) > tolerance:
+            mismatches.append({'index': i, 'expected': want, 'actual': got})
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('trace', help='log/trace.ndjson')
+    parser.add_argument('--session', type=int, default=0, help='回放第几次运行的记录（-1 为最近一次）')
+    parser.add_argument('--tolerance', type=float, default=15, help='操作时间允许的差异（秒）')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    tick_trace = load_plugin_module('tick_trace')
+    sessions = tick_trace.split_sessions(tick_trace.read_trace(args.trace))
+    if not sessions:
+        sys.exit('记录中没有可回放的运行')
+    expected, actual, ticks, elapsed = replay(sessions[args.session])
+    mismatches = compare(expected, actual, args.tolerance)
+
+    report = {
+        'plugin_version': plugin_version(),
+        'python': sys.version.split()[0],
+        'sessions': len(sessions),
+        'session': sessions[args.session][0]['session'],
+        'ticks': ticks,
+        'ticks_per_s': ticks / elapsed if elapsed else None,
+        'actions': {'expected': len(expected), 'actual': len(actual)},
+        'mismatches': mismatches[:20],
+        'passed': not mismatches
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == '__main__':
+    main()
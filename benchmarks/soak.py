@@ -0,0 +1,91 @@
+"""Plugin.update 长时间运行（soak）测试
+
+以压力频率连续调用 update()，定期记录 tracemalloc 快照，检查内存是否持续增长。
+结果以 JSON 输出；内存增长超过 --max-growth 时退出码为 1。
+
+    python -m benchmarks.soak --ticks 1000000 --snapshot-every 100000
+"""
+import argparse
+import gc
+import json
+import sys
+import tempfile
+import tracemalloc
+
+from .host_sim import HostSimulator, lesson_script, plugin_version
+
+LESSONS = ['Subject_1', '课间', '数学', '暂无课程']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ticks', type=int, default=1000000)
+    parser.add_argument('--warmup', type=int, default=5000)
+    parser.add_argument('--snapshot-every', type=int, default=100000)
+    parser.add_argument('--dt', type=float, default=0.05, help='每个 tick 推进的虚拟秒数')
+    parser.add_argument('--processes', type=int, default=300)
+    parser.add_argument('--lesson-seconds', type=float, default=120)
+    parser.add_argument('--process-seconds', type=float, default=300)
+    parser.add_argument('--max-growth', type=int, default=256 * 1024, help='允许的内存增长（字节）')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    sim = HostSimulator(tempfile.mkdtemp(prefix='easi-soak-'), process_count=args.processes, background=False)
+    lessons = lesson_script(LESSONS, max(1, int(args.lesson_seconds / args.dt)))
+    process_ticks = max(1, int(args.process_seconds / args.dt))
+
+    def run(start, count):
+        for i in range(start, start + count):
+            if i % process_ticks == 0:
+                sim.set_process((i // process_ticks) % 2 == 0)
+            sim.tick(next(lessons), args.dt)
+
+    try:
+        run(0, args.warmup)
+        gc.collect()
+        tracemalloc.start(10)
+        baseline = tracemalloc.take_snapshot()
+        baseline_bytes = tracemalloc.get_traced_memory()[0]
+        samples = [{'tick': 0, 'traced_bytes': baseline_bytes}]
+
+        done = 0
+        while done < args.ticks:
+            count = min(args.snapshot_every, args.ticks - done)
+            run(args.warmup + done, count)
+            done += count
+            gc.collect()  # 只统计无法回收的增长
+            samples.append({'tick': done, 'traced_bytes': tracemalloc.get_traced_memory()[0]})
+
+        gc.collect()
+        final = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+    finally:
+        sim.close()
+
+    growth = samples[-1]['traced_bytes'] - baseline_bytes
+    top = [
+        {'location': str(stat.traceback[0]), 'size_diff': stat.size_diff, 'count_diff': stat.count_diff}
+        for stat in final.compare_to(baseline, 'lineno')[:args.top]
+    ]
+    report = {
+        'plugin_version': plugin_version(),
+        'python': sys.version.split()[0],
+        'params': vars(args),
+        'samples': samples,
+        'growth_bytes': growth,
+        'top_growth': top,
+        'passed': growth <= args.max_growth
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""widget.json 并发写入压力测试
+
+启动 --writers 个进程，各自用 WidgetConfigStore 反复修改同一份 widget.json 中属于自己的组件位置
+（遇到 ConflictError 或锁超时时按 Backoff 退避后按新内容重试）；--host 时再启动一个不加锁、
+截断原文件整份重写的进程模拟宿主保存配置，另有一个进程持续读取并解析文件。
+结束后检查：读取期间没有解析失败、最终文件有效、每个写入进程最后一次成功提交的组件名仍在文件中
+（没有被其它写入覆盖丢失）。模拟宿主时它自身的整份重写仍可能覆盖插件的修改，读取进程也会读到宿主
+写入到一半的文件，这两项不计入检查；改为检查宿主每次保存前读取的文件都能解析（插件的写入没有损坏文件）。
+有任何一项不满足时退出码为 1。
+
+    python -m benchmarks.stress_widget_store --writers 8 --seconds 5
+    python -m benchmarks.stress_widget_store --writers 4 --host --widgets 2000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from . import load_plugin_module
+from .host_sim import plugin_version
+
+
+def _writer(path, slot, seconds, results):
+    widget_store = load_plugin_module('widget_store')
+    scheduler = load_plugin_module('scheduler')
+    store = widget_store.WidgetConfigStore(path)
+    backoff = scheduler.Backoff(0.001, 0.05, budget=8)
+    commits = conflicts = timeouts = 0
+    attempts = []  # 每次成功提交之前失败的次数
+    last = None
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        name = f'w{slot}-{commits % 2}.ui'  # 两个等长的名称交替，走原地写入
+        if commits % 10 == 9:
+            name = f'w{slot}-long-{commits}.ui'  # 不时改变长度，走整份替换
+        try:
+            store.data()
+            store.set_widget(slot, name)
+            store.commit()
+        except widget_store.ConflictError:
+            conflicts += 1
+        except TimeoutError:
+            timeouts += 1
+        except ValueError:
+            pass  # 读到宿主写入中的文件，稍后重试
+        else:
+            commits += 1
+            attempts.append(backoff.failures)
+            backoff.reset()
+            last = name
+            continue
+        store.discard()
+        store.invalidate()
+        time.sleep(backoff.fail())
+    results.put({
+        'slot': slot, 'commits': commits, 'conflicts': conflicts, 'timeouts': timeouts,
+        'attempts': attempts, 'last': last, 'lock': dict(store.lock.stats)
+    })
+    store.close()
+
+
+def _host(path, seconds, results):
+    """不加锁地读取后截断原文件整份重写，与宿主保存设置的方式相同"""
+    writes = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except ValueError:
+            errors += 1  # 只有宿主自己写入文件，此时读到的损坏来自插件的写入
+            time.sleep(0.01)
+            continue
+        data['host_counter'] = writes
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4)
+        writes += 1
+        time.sleep(0.01)
+    results.put({'host_writes': writes, 'host_read_errors': errors})
+
+
+def _reader(path, seconds, results):
+    reads = corrupt = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        try:
+            json.loads(raw.decode('utf-8'))
+        except ValueError:
+            corrupt += 1
+        reads += 1
+    results.put({'reads': reads, 'corrupt_reads': corrupt})
+
+
+def _percentile(values, q):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--widgets', type=int, default=50, help='widget.json 中的组件数量')
+    parser.add_argument('--host', action='store_true', help='同时模拟不加锁的宿主写入')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='easi-stress-')
+    path = os.path.join(workdir, 'widget.json')
+    widgets = [f'w{i}-0.ui' if i < args.writers else f'widget-{i}.ui' for i in range(max(args.widgets, args.writers))]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'widgets': widgets}, f, indent=4)
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_writer, args=(path, i, args.seconds, results))
+                 for i in range(args.writers)]
+    processes.append(multiprocessing.Process(target=_reader, args=(path, args.seconds, results)))
+    if args.host:
+        processes.append(multiprocessing.Process(target=_host, args=(path, args.seconds, results)))
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    writers = sorted((r for r in reports if 'slot' in r), key=lambda r: r['slot'])
+    reader = next(r for r in reports if 'reads' in r)
+    host = next((r for r in reports if 'host_writes' in r), {})
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            final = json.load(f)['widgets']
+    except ValueError:
+        final = None
+    lost = [r['slot'] for r in writers if final is None or (r['last'] is not None and final[r['slot']] != r['last'])]
+    attempts = [n for r in writers for n in r['attempts']]
+    commits = sum(r['commits'] for r in writers)
+
+    report = {
+        'plugin_version': plugin_version(),
+        'python': sys.version.split()[0],
+        'params': {k: v for k, v in vars(args).items() if k != 'output'},
+        'commits': commits,
+        'commits_per_s': commits / args.seconds,
+        'conflicts': sum(r['conflicts'] for r in writers),
+        'lock_timeouts': sum(r['timeouts'] for r in writers),
+        'lock_waits': sum(r['lock']['waits'] for r in writers),
+        'lock_wait_seconds': sum(r['lock']['wait_seconds'] for r in writers),
+        'retries': {'max': max(attempts, default=0), 'p99': _percentile(attempts, 0.99)},
+        'host_writes': host.get('host_writes'),
+        'host_read_errors': host.get('host_read_errors'),
+        'reads': reader['reads'],
+        'corrupt_reads': reader['corrupt_reads'],
+        'final_valid': final is not None,
+        'lost_updates': lost,
+        'passed': final is not None and (
+            host['host_read_errors'] == 0 if args.host else not lost and reader['corrupt_reads'] == 0
+        )
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+import logging
+import os
+import threading
+import time
+
+MAX_SLEEP = 3600  # 没有到期检查时最长的等待秒数
+
+logger = logging.getLogger(__name__)
+
+
+class _ExitWatch:
+    """进程退出通知：把进程监视器中已匹配进程的 pidfd 副本登记到事件循环，任一进程退出时调用 callback
+
+    source 提供 generation 和 exit_fds()（见 ProcessWatcher.exit_fds）；generation 变化后重新登记。
+    add_reader(fd, fired) / remove_reader(fd) 由具体的事件循环实现。
+    """
+
+    def __init__(self, source, callback, add_reader, remove_reader):
+        self.source = source
+        self.callback = callback
+        self._add_reader = add_reader
+        self._remove_reader = remove_reader
+        self._generation = None
+        self._fds = set()
+
+    def sync(self):
+        """在事件循环线程中调用（每次 tick 之后）"""
+        if self.source.generation == self._generation:
+            return
+        self.clear()
+        try:
+            self._generation, fds = self.source.exit_fds()
+        except OSError as e:
+            logger.warning("获取进程退出通知失败: %s", e)
+            return
+        for fd in fds:
+            try:
+                self._add_reader(fd, self.fired)
+            except (OSError, ValueError) as e:  # 事件循环不支持该类型的文件
+                logger.debug("无法等待进程退出通知: %s", e)
+                os.close(fd)
+                continue
+            self._fds.add(fd)
+
+    def fired(self, fd):
+        # 进程退出后 pidfd 一直可读：先注销，检测结果更新了匹配的进程后再重新登记
+        self._discard(fd)
+        self.callback()
+
+    def _discard(self, fd):
+        if fd in self._fds:
+            self._fds.discard(fd)
+            self._remove_reader(fd)
+            os.close(fd)
+
+    def clear(self):
+        for fd in list(self._fds):
+            self._discard(fd)
+        self._generation = None
+
+
+class AsyncioDriver:
+    """在私有的 asyncio 事件循环线程中驱动调度器
+
+    循环协程等待 next_due 到期或被唤醒（其它线程调用 Scheduler.wake()，例如课程变化、
+    后台任务完成、配置文件变化），然后执行一次 tick；空闲时不占用宿主的 update()。
+    登记了 watch_exits() 时，已匹配进程退出（pidfd 可读）也会立即唤醒循环。
+    """
+
+    def __init__(self, scheduler, tick, name='EasiControl-loop'):
+        self.scheduler = scheduler
+        self.tick = tick
+        self.name = name
+        self._loop = None
+        self._event = None
+        self._thread = None
+        self._stopping = False
+        self._exits = None  # (source, callback)
+
+    def watch_exits(self, source, callback):
+        """已匹配的进程退出时在循环线程中调用 callback()，需在 start() 之前调用"""
+        self._exits = (source, callback)
+
+    def start(self):
+        import asyncio  # 只有启用事件循环时才导入
+        self._loop = asyncio.new_event_loop()
+        self.scheduler.listener = self.wake
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self._run(),),
+                                        name=self.name, daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """可在任意线程调用；在循环线程内调用时循环本身会在 tick 之后重新计算"""
+        loop, event = self._loop, self._event
+        if loop is None or event is None or threading.current_thread() is self._thread:
+            return
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:  # 循环已关闭
+            pass
+
+    async def _run(self):
+        import asyncio
+        self._event = asyncio.Event()  # 在循环线程中创建，绑定到本循环
+        exits = None
+        if self._exits is not None:
+            source, callback = self._exits
+
+            def on_exit():
+                callback()
+                self._event.set()  # 循环线程中 wake() 不会打断等待，这里直接唤醒
+
+            exits = _ExitWatch(
+                source, on_exit,
+                lambda fd, fired: self._loop.add_reader(fd, fired, fd), self._loop.remove_reader
+            )
+        try:
+            await self._wait_and_tick(exits)
+        finally:
+            if exits is not None:
+                exits.clear()
+
+    async def _wait_and_tick(self, exits):
+        import asyncio
+        while not self._stopping:
+            if exits is not None:
+                exits.sync()
+            self._event.clear()
+            now = time.time()
+            delay = self.scheduler.next_due - now
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._event.wait(), min(delay, MAX_SLEEP))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                self.tick(now)
+            except Exception:
+                logger.exception("事件循环中的 tick 执行失败")
+                await asyncio.sleep(1)  # 避免持续失败时占满 CPU
+
+    def stop(self, timeout=5):
+        if self._loop is None:
+            return
+        self.scheduler.listener = None
+        self._stopping = True
+        if self._event is not None:
+            self._loop.call_soon_threadsafe(self._event.set)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._loop.close()
+        self._loop = None
+
+
+class QtDriver:
+    """在宿主的 Qt 事件循环中驱动调度器（需在 Qt 主线程中创建和启动）
+
+    用单次 QTimer 等待 next_due，唤醒（包括其它线程）通过排队的信号在主线程处理；
+    进程退出通知用 QSocketNotifier 等待 pidfd。
+    """
+
+    def __init__(self, scheduler, tick):
+        self.scheduler = scheduler
+        self.tick = tick
+        self._timer = None
+        self._bridge = None
+        self._thread = None
+        self._ticking = False
+        self._exits = None
+        self._exit_watch = None
+        self._notifiers = {}  # fd -> QSocketNotifier
+
+    def watch_exits(self, source, callback):
+        """已匹配的进程退出时在 Qt 主线程中调用 callback()，需在 start() 之前调用"""
+        self._exits = (source, callback)
+
+    def start(self):
+        from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal  # 只有启用 Qt 事件循环时才导入
+
+        class _Bridge(QObject):
+            woken = pyqtSignal()
+
+        self._bridge = _Bridge()
+        self._bridge.woken.connect(self._run, Qt.QueuedConnection)  # 始终排队，tick 中的唤醒不会重入
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._run)
+        self._thread = threading.current_thread()
+        self.scheduler.listener = self.wake
+        if self._exits is not None:
+            self._exit_watch = _ExitWatch(*self._exits, self._add_notifier, self._remove_notifier)
+        self._run()
+
+    def _add_notifier(self, fd, fired):
+        from PyQt5.QtCore import QSocketNotifier
+        notifier = QSocketNotifier(fd, QSocketNotifier.Read)
+        notifier.activated.connect(lambda *_: fired(fd))
+        self._notifiers[fd] = notifier
+
+    def _remove_notifier(self, fd):
+        notifier = self._notifiers.pop(fd, None)
+        if notifier is not None:
+            notifier.setEnabled(False)  # 关闭 fd 之前停止监视
+            notifier.deleteLater()
+
+    def wake(self):
+        if self._ticking and threading.current_thread() is self._thread:
+            return  # tick 结束后会重新计时
+        if self._bridge is not None:
+            self._bridge.woken.emit()
+
+    def _run(self):
+        if self._timer is None:
+            return
+        now = time.time()
+        if now >= self.scheduler.next_due:
+            self._ticking = True
+            try:
+                self.tick(now)
+            except Exception:
+                logger.exception("事件循环中的 tick 执行失败")
+            finally:
+                self._ticking = False
+        if self._exit_watch is not None:
+            self._exit_watch.sync()
+        delay = min(max(self.scheduler.next_due - time.time(), 0), MAX_SLEEP)
+        self._timer.start(int(delay * 1000))
+
+    def stop(self):
+        self.scheduler.listener = None
+        if self._exit_watch is not None:
+            self._exit_watch.clear()
+            self._exit_watch = None
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        self._bridge = None
+
+
+def create_driver(kind, scheduler, tick):
+    """kind 为 "thread"（私有 asyncio 循环线程）或 "qt"（宿主的 Qt 事件循环）"""
+    if kind == 'thread':
+        return AsyncioDriver(scheduler, tick)
+    if kind == 'qt':
+        return QtDriver(scheduler, tick)
+    raise ValueError(f'未知的事件循环类型: {kind}')
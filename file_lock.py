@@ -0,0 +1,84 @@
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def try_lock(f):
+    """非阻塞地获取文件排它锁"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def lock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """锁文件上的建议锁（只对同样使用该锁文件的进程有效），超过 timeout 秒未获得时抛出 TimeoutError"""
+
+    def __init__(self, path, timeout=2, poll_interval=0.005):
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._file = None
+        self.stats = {'acquired': 0, 'waits': 0, 'timeouts': 0, 'wait_seconds': 0.0}
+
+    def acquire(self):
+        if self._file is None:
+            self._file = open(self.path, 'a+b')
+        if try_lock(self._file):
+            self.stats['acquired'] += 1
+            return
+
+        # 其它进程持有锁：短间隔重试直到超时
+        self.stats['waits'] += 1
+        start = time.monotonic()
+        while True:
+            time.sleep(self.poll_interval)
+            if try_lock(self._file):
+                self.stats['acquired'] += 1
+                self.stats['wait_seconds'] += time.monotonic() - start
+                return
+            if time.monotonic() - start >= self.timeout:
+                self.stats['timeouts'] += 1
+                self.stats['wait_seconds'] += time.monotonic() - start
+                raise TimeoutError(f'等待文件锁超时: {self.path}')
+
+    def release(self):
+        if self._file is not None:
+            unlock(self._file)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
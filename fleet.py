@@ -0,0 +1,260 @@
+import json
+from datetime import timedelta
+from pathlib import Path
+
+from . import layout
+from .rules import RuleEngine
+from .timetable import Timetable, day_segments
+
+MINUTES_PER_DAY = 24 * 60
+MAX_RULES = 63  # 生效状态按位保存在 int64 中
+_RUN_DTYPE = [('room', 'i4'), ('start', 'i4'), ('end', 'i4'), ('layout', 'i4')]
+
+
+def _numpy():
+    # NumPy 只有离线批量计算才需要，插件运行时不依赖
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('批量计算需要 NumPy，请先安装: pip install numpy') from None
+    return numpy
+
+
+class Room:
+    """一间教室：课表内容、widget.json 中的组件列表和插件规则（均为普通数据，可传给子进程）"""
+
+    def __init__(self, name, schedule, widgets, rules, start_date=None):
+        self.name = name
+        self.schedule = schedule  # 课表文件内容（ClassWidgets config/schedule/*.json）
+        self.widgets = tuple(widgets)
+        self.rules = rules  # rules.json 中的 rules 列表
+        self.start_date = start_date  # 学期开始日期，用于区分单双周
+
+
+def load_room(base_dir, rules_file=None, name=None):
+    """从一份 ClassWidgets 目录读取教室数据，规则默认读取 base_dir/rules.json"""
+    base_dir = Path(base_dir)
+    timetable = Timetable(base_dir)
+    timetable.load()
+    with open(base_dir / 'config' / 'widget.json', 'r', encoding='utf-8') as f:
+        widgets = json.load(f).get('widgets', [])
+    with open(rules_file or base_dir / 'rules.json', 'r', encoding='utf-8') as f:
+        rules = json.load(f)['rules']
+    return Room(
+        name or base_dir.name, timetable.config.config, widgets, rules,
+        start_date=timetable.settings.get('start_date')
+    )
+
+
+class _LayoutStore:
+    """layout.plan 使用的内存组件列表"""
+
+    def __init__(self, widgets):
+        self._widgets = list(widgets)
+
+    def widgets(self):
+        return self._widgets
+
+    def positions(self, name):
+        return [i for i, widget in enumerate(self._widgets) if widget == name]
+
+    def apply(self, changes):
+        for index, name in changes:
+            self._widgets[index] = name
+
+
+class FleetTimeline:
+    """批量计算结果
+
+    layouts 为去重后的组件列表；runs 为按教室、时间排序的结构化数组，
+    每行 (room, start, end, layout) 表示教室 room 在 [start, end) 分钟（从第一天 0 点起算）
+    显示 layouts[layout]，在每天 0 点处分段。
+    """
+
+    def __init__(self, rooms, start, days, layouts, runs):
+        self.rooms = rooms
+        self.start = start
+        self.days = days
+        self.layouts = layouts
+        self.runs = runs
+
+    def __len__(self):
+        return len(self.runs)
+
+    def layout_at(self, room, day, minute):
+        """教室 room（名称或序号）在第 day 天 minute 分钟显示的组件列表"""
+        np = _numpy()
+        if isinstance(room, str):
+            room = self.rooms.index(room)
+        rows = self.runs[self.runs['room'] == room]
+        index = np.searchsorted(rows['start'], day * MINUTES_PER_DAY + minute, side='right') - 1
+        return self.layouts[rows['layout'][index]]
+
+    def write_csv(self, file):
+        """写出紧凑表格：每行为 教室, 日期, 开始, 结束, 布局编号；布局内容在表格末尾列出"""
+        file.write('room,date,start,end,layout\n')
+        for room, start, end, index in self.runs.tolist():
+            day, start = divmod(start, MINUTES_PER_DAY)
+            end -= day * MINUTES_PER_DAY
+            file.write(
+                f'{self.rooms[room]},{self.start + timedelta(days=day)},'
+                f'{start // 60:02d}:{start % 60:02d},{end // 60:02d}:{end % 60:02d},{index}\n'
+            )
+        file.write('\nlayout,widgets\n')
+        for index, widgets in enumerate(self.layouts):
+            file.write(f'{index},"{";".join(widgets)}"\n')
+
+
+def evaluate(rooms, start, days=7, processes=(), workers=1, mp_context=None):
+    """计算所有教室从 start 日期起 days 天内每分钟显示的组件布局
+
+    规则条件与插件运行时相同（Rule.evaluate）：课程按课表计算，时间窗口按分钟计算，
+    processes 中的进程视为一直在运行。生效的规则按规则文件中的顺序依次修改组件。
+    debounce/hysteresis 延迟不参与计算。workers 大于 1 时按教室分片在多个进程中计算，
+    mp_context 为子进程的启动方式（multiprocessing.get_context(...)），默认使用平台默认值。
+    """
+    rooms = list(rooms)
+    processes = frozenset(p.lower() for p in processes)
+    if workers <= 1 or len(rooms) < 2:
+        return _merge(rooms, start, days, [_evaluate_shard(rooms, start, days, processes)])
+
+    from concurrent.futures import ProcessPoolExecutor
+    size = -(-len(rooms) // workers)
+    shards = [rooms[i:i + size] for i in range(0, len(rooms), size)]
+    with ProcessPoolExecutor(
+            max_workers=len(shards), mp_context=mp_context, initializer=exec, initargs=(_package_bootstrap(),)
+    ) as executor:
+        results = list(executor.map(
+            _evaluate_shard, shards, [start] * len(shards), [days] * len(shards), [processes] * len(shards)
+        ))
+    return _merge(rooms, start, days, results)
+
+
+def _package_bootstrap():
+    """在子进程中注册插件包的代码
+
+    插件可能以任意包名加载（宿主或 benchmarks.load_plugin_module 注册的包），spawn 启动的子进程
+    无法直接导入，反序列化分片任务之前需要按同样的包名和目录重新注册（不执行插件 __init__）。
+    """
+    path = str(Path(__file__).resolve().parent)
+    return (
+        'import sys, types\n'
+        f'if {__package__!r} not in sys.modules:\n'
+        f'    sys.modules[{__package__!r}] = types.ModuleType({__package__!r})\n'
+        f'    sys.modules[{__package__!r}].__path__ = [{path!r}]\n'
+    )
+
+
+def _merge(rooms, start, days, results):
+    """合并各分片的结果：布局重新编号，教室序号加上分片偏移"""
+    np = _numpy()
+    ids = {}  # 组件列表 -> 合并后的编号
+    runs = []
+    offset = 0
+    for shard_rooms, shard_layouts, shard_runs in results:
+        remap = np.array([ids.setdefault(widgets, len(ids)) for widgets in shard_layouts], dtype=np.int32)
+        shard_runs = shard_runs.copy()
+        shard_runs['room'] += offset
+        if len(remap):
+            shard_runs['layout'] = remap[shard_runs['layout']]
+        runs.append(shard_runs)
+        offset += shard_rooms
+    runs = np.concatenate(runs) if runs else np.empty(0, dtype=_RUN_DTYPE)
+    return FleetTimeline([room.name for room in rooms], start, days, list(ids), runs)
+
+
+def _evaluate_shard(rooms, start, days, processes):
+    """计算一组教室，返回 (教室数, 布局列表, runs)"""
+    np = _numpy()
+    total = days * MINUTES_PER_DAY
+    vocabulary = {}  # 课程名 -> 编号
+
+    # 每间教室每分钟的课程编号，同一课表同一天只计算一次
+    lessons = np.empty((len(rooms), total), dtype=np.int32)
+    rows = {}
+    for r, room in enumerate(rooms):
+        for d in range(days):
+            day = start + timedelta(days=d)
+            key = (id(room.schedule), room.start_date, day)
+            row = rows.get(key)
+            if row is None:
+                segments = day_segments(room.schedule, day, room.start_date)
+                bounds = [min(offset // 60, MINUTES_PER_DAY) for offset, _ in segments] + [MINUTES_PER_DAY]
+                codes = [vocabulary.setdefault(name, len(vocabulary)) for _, name in segments]
+                row = rows[key] = np.repeat(np.array(codes, dtype=np.int32), np.diff(bounds))
+            lessons[r, d * MINUTES_PER_DAY:(d + 1) * MINUTES_PER_DAY] = row
+    minute = np.arange(total, dtype=np.int32) % MINUTES_PER_DAY
+
+    # 按规则文件分组，每组规则对组内所有教室一次性计算
+    groups = {}
+    for r, room in enumerate(rooms):
+        groups.setdefault(json.dumps(room.rules, sort_keys=True), []).append(r)
+
+    layouts = {}  # 组件列表 -> 编号
+    plans = {}  # (规则组, 原始组件列表, 生效规则位) -> 布局编号
+    layout_ids = np.empty((len(rooms), total), dtype=np.int32)
+    for key, members in groups.items():
+        engine = RuleEngine.from_dicts(rooms[members[0]].rules)
+        if len(engine.rules) > MAX_RULES:
+            raise ValueError(f'批量计算最多支持 {MAX_RULES} 条规则')
+        group_lessons = lessons[members]
+        active = np.zeros(group_lessons.shape, dtype=np.int64)
+        for bit, rule in enumerate(engine.rules):
+            if not all(name in processes for name in rule.processes):
+                continue
+            condition = np.ones(group_lessons.shape, dtype=bool)
+            if rule.lessons is not None:
+                codes = [vocabulary[name] for name in rule.lessons if name in vocabulary]
+                condition &= np.isin(group_lessons, codes)
+            if rule.window is not None:
+                begin, end = rule.window
+                if begin <= end:
+                    condition &= (minute >= begin) & (minute < end)
+                else:
+                    condition &= (minute >= begin) | (minute < end)
+            active |= condition.astype(np.int64) << bit
+
+        for i, r in enumerate(members):
+            masks, inverse = np.unique(active[i], return_inverse=True)
+            ids = np.empty(len(masks), dtype=np.int32)
+            for j, mask in enumerate(masks.tolist()):
+                plan_key = (key, rooms[r].widgets, mask)
+                if plan_key not in plans:
+                    widgets = _plan_layout(engine.rules, rooms[r].widgets, mask)
+                    plans[plan_key] = layouts.setdefault(widgets, len(layouts))
+                ids[j] = plans[plan_key]
+            layout_ids[r] = ids[inverse]
+
+    return len(rooms), list(layouts), _runs(layout_ids, days)
+
+
+def _plan_layout(rules, widgets, mask):
+    """按规则顺序依次应用 mask 中生效的规则，返回最终组件列表"""
+    store = _LayoutStore(widgets)
+    for bit, rule in enumerate(rules):
+        if mask >> bit & 1:
+            changes, _ = layout.plan(store, rule.mappings)
+            store.apply((index, replacement) for index, _, replacement in changes)
+    return tuple(store.widgets())
+
+
+def _runs(layout_ids, days):
+    """将每分钟的布局编号压缩为连续区间，在每天 0 点处分段"""
+    np = _numpy()
+    rooms, total = layout_ids.shape
+    change = np.ones(layout_ids.shape, dtype=bool)
+    change[:, 1:] = layout_ids[:, 1:] != layout_ids[:, :-1]
+    change[:, ::MINUTES_PER_DAY] = True
+    room, start = np.nonzero(change)
+    end = np.empty_like(start)
+    end[:-1] = start[1:]
+    last = np.ones(len(start), dtype=bool)
+    last[:-1] = room[1:] != room[:-1]
+    end[last] = total
+
+    runs = np.empty(len(start), dtype=_RUN_DTYPE)
+    runs['room'] = room
+    runs['start'] = start
+    runs['end'] = end
+    runs['layout'] = layout_ids[room, start]
+    return runs
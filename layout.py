@@ -0,0 +1,166 @@
+def backup_slots(backup):
+    """备份记录中的 [(位置, 原始组件, 目标组件)]，兼容旧版单组件格式"""
+    if 'slots' in backup:
+        return [tuple(slot) for slot in backup['slots']]
+    return [(backup.get('index'), backup['original'], backup['replacement'])]
+
+
+def rebase(backup, index, replacement, original):
+    """返回修改了位置 index 上原始组件的备份副本（备份可能仍被状态日志引用，不原地修改）"""
+    return {'slots': [
+        [i, original if (i, r) == (index, replacement) else o, r] for i, o, r in backup['slots']
+    ]}
+
+
+def stacks(applied, widgets):
+    """已生效规则在各位置上叠加的修改层：{位置: [(规则名, 原始组件, 目标组件), ...]}，从当前显示的上层到下层
+
+    上层的原始组件即下层的目标组件，最上层的目标组件是当前显示的组件。
+    """
+    entries = {}
+    for name, backup in applied.items():
+        for index, original, replacement in (backup or {}).get('slots', ()):
+            entries.setdefault(index, {})[replacement] = (name, original, replacement)
+    result = {}
+    for index, layers in entries.items():
+        if not 0 <= index < len(widgets):
+            continue
+        chain = []
+        current = widgets[index]
+        while current in layers:
+            layer = layers.pop(current)
+            chain.append(layer)
+            current = layer[1]
+        if chain:
+            result[index] = chain
+    return result
+
+
+def covering(stacks, rank, level):
+    """各位置上规则顺序在 level 之后的最下层修改：{位置: (规则名, 原始组件, 目标组件)}
+
+    规则按规则文件中的顺序叠加（与生效的先后无关），顺序在后的规则显示在上层；
+    rank 为 规则名 -> 顺序，已删除的规则视为最下层。
+    """
+    result = {}
+    for index, chain in stacks.items():
+        for layer in chain:
+            if rank.get(layer[0], -1) <= level:
+                break
+            result[index] = layer
+    return result
+
+
+class _Covered:
+    """被上层规则覆盖的位置按其下层的组件计算，供 plan 使用"""
+
+    def __init__(self, store, below):
+        self._store = store
+        self._widgets = store.widgets()
+        self._below = below
+
+    def widgets(self):
+        return self
+
+    def __len__(self):
+        return len(self._widgets)
+
+    def __getitem__(self, index):
+        return self._below.get(index, self._widgets[index])
+
+    def positions(self, name):
+        found = [i for i in self._store.positions(name) if i not in self._below]
+        found.extend(i for i, widget in self._below.items() if widget == name)
+        return sorted(found)
+
+
+def plan(store, mappings, below=None):
+    """计算规则生效后的目标布局
+
+    按名称查找使用 store 的组件名 -> 位置索引，开销只与 mappings 的数量有关。
+    below 为被顺序在后的规则覆盖的 {位置: 下层组件}，这些位置按下层组件计算
+    （对应的修改不写入 store，而是交给上层规则的备份，见 covering）。
+    返回 (changes, skipped)：changes 为需要修改的 [(位置, 原始组件, 目标组件)]，
+    skipped 为无法执行的 [(原因, 组件名)]。
+    """
+    if below:
+        store = _Covered(store, below)
+    widgets = store.widgets()
+    count = len(widgets)
+    changes = []
+    skipped = []
+    claimed = set()  # 本次已占用的位置
+    planned = set()  # 本次将要放入的组件
+
+    for slot, original, replacement in mappings:
+        if slot is not None:
+            if not -count <= slot < count:
+                skipped.append(('位置超出范围', replacement))
+                continue
+            index = slot % count
+            if original is not None and widgets[index] != original:
+                skipped.append(('目标组件不存在', original))
+                continue
+        else:
+            index = next((i for i in store.positions(original) if i not in claimed), None)
+            if index is None:
+                skipped.append(('目标组件不存在', original))
+                continue
+            if store.positions(replacement) or replacement in planned:
+                skipped.append(('目标组件已存在', replacement))
+                continue
+
+        if index in claimed:
+            skipped.append(('位置重复', replacement))
+            continue
+        claimed.add(index)
+        planned.add(replacement)
+        if widgets[index] != replacement:
+            changes.append((index, widgets[index], replacement))
+    return changes, skipped
+
+
+def hand_off(stacks, name, slots):
+    """规则恢复时，已被其它规则覆盖的位置不写回：原始组件交给紧邻的上层规则，由其恢复时写回
+
+    返回 (remaining, handoffs)：remaining 为仍需写回的位置，
+    handoffs 为 [(上层规则名, 位置, 上层目标组件, 新的原始组件)]（见 rebase）。
+    """
+    remaining = []
+    handoffs = []
+    for index, original, replacement in slots:
+        chain = stacks.get(index, ())
+        depth = next((i for i, layer in enumerate(chain) if layer[0] == name and layer[2] == replacement), None)
+        if not depth:  # 显示在最上层，或不在叠加的修改层中
+            remaining.append((index, original, replacement))
+            continue
+        upper = chain[depth - 1]
+        handoffs.append((upper[0], index, upper[2], original))
+    return remaining, handoffs
+
+
+def plan_revert(store, slots):
+    """计算恢复备份需要写回的位置
+
+    记录的位置上仍是目标组件时直接恢复，否则按名称查找。
+    返回 (changes, missing)：changes 为 [(位置, 原始组件)]，missing 为找不到的目标组件。
+    """
+    widgets = store.widgets()
+    count = len(widgets)
+    changes = []
+    missing = []
+    claimed = set()
+
+    for index, original, replacement in slots:
+        if index is not None and -count <= index < count and widgets[index] == replacement \
+                and index % count not in claimed:
+            index %= count
+        else:
+            # 记录的位置已变化时按名称查找
+            index = next((i for i in store.positions(replacement) if i not in claimed), None)
+            if index is None:
+                missing.append(replacement)
+                continue
+        claimed.add(index)
+        changes.append((index, original))
+    return changes, missing
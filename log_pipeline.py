@@ -0,0 +1,208 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+LOG_FORMAT = '[%(asctime)s] %(levelname)s - %(message)s'
+
+_listeners = {}
+
+
+class _DropQueueHandler(logging.handlers.QueueHandler):
+    """队列已满时丢弃日志而不是阻塞调用线程；格式化留给后台线程"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # 同进程队列无需提前格式化，消息拼接和时间格式化都在写入线程完成
+        return record
+
+
+class DedupFilter(logging.Filter):
+    """对 WARNING 及以上级别的重复日志限流
+
+    相同级别、模板和参数的日志在 window 秒内只输出第一条，
+    窗口结束后的下一条会附带被省略的次数。
+    """
+
+    def __init__(self, window=60, max_keys=1024):
+        super().__init__()
+        self.window = window
+        self.max_keys = max_keys
+        self._seen = {}  # key -> [窗口开始时间, 省略次数]
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+
+        try:
+            key = (record.levelno, record.msg, tuple(str(a) for a in record.args or ()))
+        except Exception:
+            return True
+
+        now = record.created
+        entry = self._seen.get(key)
+        if entry is not None and now - entry[0] < self.window:
+            entry[1] += 1
+            return False
+
+        if entry is not None and entry[1]:
+            record.msg = f"{record.msg} (过去 {self.window} 秒内重复 {entry[1]} 次)"
+        if len(self._seen) >= self.max_keys:
+            self._prune(now)
+        self._seen[key] = [now, 0]
+        return True
+
+    def _prune(self, now):
+        for key in [k for k, (start, _) in self._seen.items() if now - start >= self.window]:
+            del self._seen[key]
+        if len(self._seen) >= self.max_keys:
+            self._seen.clear()
+
+
+class DailyRotatingFileHandler(logging.Handler):
+    """按日期切换日志文件，单个文件超过 max_bytes 时分卷
+
+    文件名为 {prefix}_YYYY-MM-DD.log、{prefix}_YYYY-MM-DD.1.log ……
+    切换文件时删除超过 retention_days 天的日志，并保证日志总大小不超过 max_total_bytes。
+    """
+
+    def __init__(self, log_dir, prefix='plugin', max_bytes=5 * 1024 * 1024, retention_days=14,
+                 max_total_bytes=50 * 1024 * 1024, encoding='utf-8'):
+        super().__init__()
+        self.log_dir = Path(log_dir)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self.max_total_bytes = max_total_bytes
+        self.encoding = encoding
+        self._pattern = re.compile(rf'^{re.escape(prefix)}_(\d{{4}}-\d{{2}}-\d{{2}})(?:\.(\d+))?\.log$')
+        self._stream = None
+        self._day = None
+        self._part = 0
+        self._size = 0
+
+    def _path(self, day, part):
+        suffix = f'.{part}' if part else ''
+        return self.log_dir / f'{self.prefix}_{day}{suffix}.log'
+
+    def _open(self, day, part):
+        if self._stream is not None:
+            self._stream.close()
+        path = self._path(day, part)
+        self._stream = open(path, 'a', encoding=self.encoding)
+        self._day = day
+        self._part = part
+        self._size = self._stream.tell()
+
+    def _rollover(self, day):
+        if day != self._day:
+            # 新的一天（或首次写入）：接着当天已有的最后一个分卷写
+            parts = [p for d, p, _ in self._log_files() if d == day]
+            self._open(day, max(parts) if parts else 0)
+        else:
+            self._open(day, self._part + 1)
+        self._cleanup()
+
+    def _log_files(self):
+        files = []
+        for entry in os.scandir(self.log_dir):
+            match = self._pattern.match(entry.name)
+            if match:
+                files.append((match.group(1), int(match.group(2) or 0), entry.path))
+        return files
+
+    def _cleanup(self):
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime('%Y-%m-%d')
+        current = str(self._path(self._day, self._part))
+        remaining = []
+        for day, part, path in sorted(self._log_files()):
+            if path == current:
+                continue
+            if day < cutoff:
+                self._remove(path)
+            else:
+                remaining.append(path)
+
+        total = sum(os.path.getsize(p) for p in remaining) + self._size
+        for path in remaining:
+            if total <= self.max_total_bytes:
+                break
+            total -= os.path.getsize(path)
+            self._remove(path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def emit(self, record):
+        try:
+            data = self.format(record) + '\n'
+            size = len(data.encode(self.encoding))
+            day = time.strftime('%Y-%m-%d', time.localtime(record.created))
+            if day != self._day or (self.max_bytes and self._size and self._size + size > self.max_bytes):
+                self._rollover(day)
+            self._stream.write(data)
+            self._stream.flush()
+            self._size += size
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self.acquire()
+        try:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+        finally:
+            self.release()
+        super().close()
+
+
+def setup(logger, log_dir, level=logging.INFO, queue_size=10000, dedup_window=60, **file_options):
+    """为 logger 安装队列日志管道：调用线程只入队，后台线程格式化、写文件和轮转"""
+    if logger.name in _listeners:
+        return _listeners[logger.name][0]
+
+    file_handler = DailyRotatingFileHandler(log_dir, **file_options)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.Queue(queue_size)
+    queue_handler = _DropQueueHandler(log_queue)
+    queue_handler.addFilter(DedupFilter(dedup_window))
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    _listeners[logger.name] = (listener, queue_handler)
+    atexit.register(stop, logger)
+
+    logger.setLevel(level)
+    logger.addHandler(queue_handler)
+    return listener
+
+
+def stop(logger):
+    """写完队列中剩余的日志并关闭文件"""
+    entry = _listeners.pop(logger.name, None)
+    if entry is None:
+        return
+    listener, queue_handler = entry
+    logger.removeHandler(queue_handler)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
@@ -1,11 +1,15 @@
+import atexit
+import os
 import logging
 import time
 from pathlib import Path
 import json
-import shutil
-import psutil
 from datetime import datetime
-from .ClassWidgets.base import PluginBase
+from .ClassWidgets.base import PluginBase, PluginConfig
+from .process_watcher import ProcessWatcher
+from .rules import RuleEngine, process_signal, LESSON, CLOCK
+from .state import PluginState
+from .scheduler import Scheduler, AdaptiveInterval, Backoff
 
 
 # --常量定义--
@@ -14,443 +18,842 @@ from .ClassWidgets.base import PluginBase
 LESSON_TRIGGERS = ["Subject_1", "Subiect_2", "Subiect_3"]  # 可扩展的触发文本列表
 # 在上述特定课程切换的小组件名称。当课程为 LESSON_TRIGGERS 中的课程时，显示目标组件；否则，显示原始组件
 WIDGET_TARGET_PAIR = ("example-1.ui", "example-2.ui")  # (原始组件，目标组件)
+# 课程变化后等待的秒数（防抖动）
+LESSON_DEBOUNCE = 4
+# 读取 ClassWidgets 课表，预先计算当天的课程切换时间，到点直接切换（不等待 Current_Lesson 和防抖动）
+TIMETABLE = True
+TIMETABLE_PREPARE = 5  # 切换前提前读取 widget.json 并建立组件索引的秒数
+TIMETABLE_GRACE = 15  # 按课表切换后，宿主超过该秒数仍未报告课程变化时改用宿主的课程
+TIMETABLE_RETRY = 60  # 课表读取失败后重新读取的间隔（秒）
+# 进程检测间隔（秒）：进程状态稳定时从最小间隔逐步放宽到最大间隔，状态变化后恢复最小间隔
+PROCESS_POLL_MIN = 2
+PROCESS_POLL_MAX = 10
+# 修改失败的规则重试间隔（秒）：连续失败时按指数退避（带随机抖动）增长到 RETRY_MAX，
+# 连续失败超过 RETRY_BUDGET 次后固定按 RETRY_MAX 重试，规则状态变化或修改成功后恢复
+RETRY_INTERVAL = 1
+RETRY_MAX = 60
+RETRY_BUDGET = 8
+# 在后台线程执行进程检测、widget.json 写入和状态保存，update 只负责调度
+BACKGROUND_WORKER = True
+# 执行检查的方式：None 为在宿主调用 update() 时检查到期时间；"thread" 为在私有的 asyncio 事件循环线程中
+# 等待到期或唤醒；"qt" 为在宿主的 Qt 事件循环中用定时器等待。后两种方式下 update() 只转发课程变化
+EVENT_LOOP = None
+# 同一用户下运行多个 ClassWidgets 实例时，可开启共享进程检测结果（只由其中一个实例扫描进程）
+SHARED_DETECTOR = False
+# 状态日志持久化级别："none"（不主动刷新）/ "flush"（刷新到系统）/ "fsync"（写入磁盘）
+STATE_DURABILITY = "flush"
+# 运行指标（各阶段耗时、计数器），写入 config/metrics.json；也可通过创建 config/metrics.enable 在运行时开启
+METRICS_ENABLED = False
+METRICS_FLUSH_INTERVAL = 30  # 指标文件写出间隔（秒）
+# 日志按日期轮转；单个文件超过该大小时分卷，超过保留天数的日志自动删除
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_RETENTION_DAYS = 14
+# 记录每个 tick 的输入和执行的操作（log/trace.ndjson），可用 benchmarks/replay.py 回放；也可通过创建 config/trace.enable 开启
+TRACE_ENABLED = False
+TRACE_MAX_BYTES = 1024 * 1024
+TRACE_BACKUPS = 3
+
+# 首次运行时写入 config/rules.json 的默认规则，之后请直接编辑该文件
+DEFAULT_RULES = [
+    {
+        "name": "lesson",
+        "lessons": LESSON_TRIGGERS,
+        "swap": list(WIDGET_TARGET_PAIR)
+    },
+    {
+        "name": "lx-music",
+        "process": "lx-music-desktop.exe",
+        "slot": -1,
+        "widget": "lx-music-lyrics.ui"
+    }
+]
 
 
 class Plugin(PluginBase):
     def __init__(self, cw_contexts, method):
+        # 构造函数只初始化内存中的对象，文件读写在 _warm_up() 中进行
         # 初始化路径属性（必须最先执行）
         self.plugin_dir = Path(__file__).parent
         self.config_dir = self.plugin_dir / "config"
         self.log_dir = self.plugin_dir / "log"
-        
-        # 创建必要目录
-        self.config_dir.mkdir(exist_ok=True, parents=True)
-        self.log_dir.mkdir(exist_ok=True, parents=True)
-        
+
         # 配置文件路径
-        self.state_file = self.config_dir / "plugin_state.json"
-        self.original_file = self.config_dir / "original_value.txt"
+        self.journal_file = self.config_dir / "state.journal"
+        self.rules_file = self.config_dir / "rules.json"
         self.base_dir = Path(cw_contexts.get('BASE_DIRECTORY', '.'))
         self.target_config = self.base_dir / "config" / "widget.json"
-        
+        self._widget_store = None  # 首次预读或修改 widget.json 时创建，见 widget_store
+        self.journal = None
+        self.metrics = None
+
         # 调用父类初始化
         super().__init__(cw_contexts, method)
-        
-        # 初始化日志系统
-        self._init_logger()
+
         self.logger = logging.getLogger(__name__)
-        
+
         # 状态管理系统
-        self.state = {
-            'process_name': 'lx-music-desktop.exe',
-            'modified': False,
-            'original_value': None,
-            'backup_done': False,
-            'check_interval': 3,  # 从5秒改为3秒
-            'lesson_modified': False,
-            'lesson_backup_done': False,
-            'lesson_original_value': None,
-            'last_lesson_change': 0,
-            'current_lesson': None
-        }
+        self.state = PluginState()
+        self._reconciling = False  # 后台修改执行中：state.applied 由其结果替换，期间不提交新的修改
+        self._pending = set()  # 期望状态与实际状态不一致、需要处理的规则
+        self._stale = set()  # 已生效但定义已被修改的规则，需要先按旧备份恢复
+        self._rules_reload = None  # 规则文件变化后待应用的新配置（由监视线程设置）
+
+        # 课表：当天剩余的切换时间（倒序，末尾最早）和按课表切换后的课程
+        self.timetable = None
+        self._transitions = []
+        self._timetable_lesson = None
+        self._timetable_reload = False
+
+        # 各项检查登记下一次到期时间，空闲的 tick 只需比较一次时间
+        self.scheduler = Scheduler()
+        self._poll_interval = AdaptiveInterval(PROCESS_POLL_MIN, PROCESS_POLL_MAX)
+        self._retry = Backoff(RETRY_INTERVAL, RETRY_MAX, budget=RETRY_BUDGET)
+
+        self.trace = None
+        self.driver = None
+        self.worker = None
+        self._ready = False  # 是否已完成延迟初始化
+
+    def execute(self):
+        """宿主启动后调用，完成延迟初始化"""
+        if not self._ready:
+            self._warm_up()
+
+    def _warm_up(self):
+        """延迟初始化：创建目录、初始化日志、迁移旧文件、加载状态和规则"""
+        self._ready = True
+
+        # 创建必要目录
+        self.config_dir.mkdir(exist_ok=True, parents=True)
+        self.log_dir.mkdir(exist_ok=True, parents=True)
+
+        # 初始化日志系统
+        self._init_logger()
+
+        # 只有延迟初始化之后才用到的模块在这里导入，不计入插件模块的导入耗时
+        from .state_journal import StateJournal
+        from .metrics import Metrics
+        self.journal = StateJournal(self.journal_file, durability=STATE_DURABILITY)
+        self.metrics = Metrics(
+            self.config_dir / "metrics.json",
+            enabled=METRICS_ENABLED,
+            flush_interval=METRICS_FLUSH_INTERVAL,
+            toggle_file=None if METRICS_ENABLED else self.config_dir / "metrics.enable"
+        )
 
-        self._load_state()
         self._migrate_old_files()  # 旧文件迁移
-        
+        self._load_state()
+        self._load_rules()
+        if TIMETABLE:
+            self._load_timetable()
+        if TRACE_ENABLED or (self.config_dir / "trace.enable").exists():
+            from .tick_trace import TraceRecorder  # 只有开启记录时才导入
+            self.trace = TraceRecorder(
+                self.log_dir / "trace.ndjson", f"{os.getpid()}-{int(time.time())}",
+                max_bytes=TRACE_MAX_BYTES, backups=TRACE_BACKUPS, snapshot=self._trace_snapshot
+            )
+
+        if BACKGROUND_WORKER:
+            from .worker import BackgroundWorker
+            # 后台任务完成后唤醒调度器，下一个 tick 执行回调
+            self.worker = BackgroundWorker(on_complete=self.scheduler.wake)
+        self.scheduler.schedule('metrics', 0)
+
+        if EVENT_LOOP:
+            try:
+                from .event_loop import create_driver  # 只有启用事件循环时才导入
+                self.driver = create_driver(EVENT_LOOP, self.scheduler, self._tick)
+                self.driver.watch_exits(self.process_watcher, self._on_process_exit)
+                self.driver.start()
+            except Exception as e:
+                self.logger.warning("事件循环启动失败，改为在 update 中检查: %s", e)
+                self.driver = None
+        if self.worker is not None or self.driver is not None or self.trace is not None:
+            atexit.register(self.shutdown)  # 退出前等待后台写入、写出剩余的记录
+
         self.logger.info("插件初始化完成")
 
     def _init_logger(self):
-        """日志系统初始化"""
-        logger = logging.getLogger(__name__)
-        if logger.handlers:
-            return
+        """日志系统初始化：写文件和按日期轮转在后台线程完成
 
-        file_handler = logging.FileHandler(
-            filename=self.log_dir / f"plugin_{datetime.now().strftime('%Y-%m-%d')}.log",
-            encoding='utf-8'
+        日志管道安装在插件包的 logger 上，后台任务、事件循环等其它模块的日志也写入插件日志。
+        """
+        from . import log_pipeline  # logging.handlers 导入较慢，延迟到初始化阶段
+        log_pipeline.setup(
+            logging.getLogger(__package__), self.log_dir,
+            max_bytes=LOG_MAX_BYTES, retention_days=LOG_RETENTION_DAYS
         )
-        formatter = logging.Formatter(
-            '[%(asctime)s] %(levelname)s - %(message)s'
-        )
-        file_handler.setFormatter(formatter)
-        
-        logger.setLevel(logging.INFO)
-        logger.addHandler(file_handler)
 
     def _migrate_old_files(self):
-        """旧配置文件迁移"""
-        old_files = [
-            (self.plugin_dir / "plugin_state.json", self.state_file),
-            (self.plugin_dir / "original_value.txt", self.original_file)
-        ]
-        
-        for old_path, new_path in old_files:
-            if old_path.exists() and not new_path.exists():
-                try:
-                    old_path.rename(new_path)
-                    self.logger.info(f"迁移旧配置文件: {old_path.name}")
-                except Exception as e:
-                    self.logger.error(f"文件迁移失败: {str(e)}")
+        """将旧版状态文件（plugin_state.json / original_value.txt / lesson_backup.json）迁移到状态日志"""
+        old_files = []
+        for directory in (self.plugin_dir, self.config_dir):
+            for name in ("plugin_state.json", "original_value.txt", "lesson_backup.json"):
+                if (directory / name).exists():
+                    old_files.append(directory / name)
+        if not old_files:
+            return
 
-    def _load_state(self):
-        """加载持久化状态"""
-        try:
-            if self.state_file.exists():
-                with open(self.state_file, 'r') as f:
-                    saved_state = json.load(f)
-                    self.state.update({
-                        'modified': saved_state.get('modified', False),
-                        'backup_done': saved_state.get('backup_done', False),
-                        'lesson_modified': saved_state.get('lesson_modified', False),
-                        'lesson_backup_done': saved_state.get('lesson_backup_done', False)
-                    })
-            
-            # 加载原始值
-            if self.original_file.exists():
-                with open(self.original_file, 'r') as f:
-                    self.state['original_value'] = f.read().strip()
-
-            # 加载课程相关备份
-            lesson_backup = self.config_dir / "lesson_backup.json"
-            if lesson_backup.exists():
-                with open(lesson_backup, 'r') as f:
-                    self.state['lesson_original_value'] = json.load(f).get('widgets', [])
-                    
-        except json.JSONDecodeError as e:
-            self.logger.critical(f"状态文件损坏，重置状态: {str(e)}")
-            self._reset_state()
+        if not self.journal.exists():
+            try:
+                for name, backup in self._read_legacy_state().items():
+                    self.journal.set(name, backup)
+                self.journal.compact()
+                self.logger.info("迁移旧配置文件: %s", ', '.join(f.name for f in old_files))
+            except Exception as e:
+                self.logger.error("文件迁移失败: %s", e)
+                return
 
-        except Exception as e:
-            self.logger.error(f"状态加载失败: {str(e)}")
+        for f in old_files:
+            f.unlink(missing_ok=True)
 
-    def _save_state(self):
-        """保存持久化状态"""
-        try:
-            state_to_save = {
-                'modified': self.state['modified'],
-                'backup_done': self.state['backup_done']
+    def _read_legacy_state(self):
+        """读取旧版状态文件，转换为规则名 -> 备份信息"""
+        def find(name):
+            for directory in (self.config_dir, self.plugin_dir):
+                if (directory / name).exists():
+                    return directory / name
+            return None
+
+        state_file = find("plugin_state.json")
+        original_file = find("original_value.txt")
+        if state_file is None:
+            return {}
+        with open(state_file, 'r') as f:
+            saved_state = json.load(f)
+        if 'applied' in saved_state:
+            return saved_state['applied']
+
+        # 更早的版本：modified / lesson_modified 标志对应默认规则
+        applied = {}
+        if saved_state.get('modified') and original_file is not None:
+            with open(original_file, 'r') as f:
+                applied['lx-music'] = {
+                    'index': -1,
+                    'original': f.read().strip(),
+                    'replacement': DEFAULT_RULES[1]['widget']
+                }
+        if saved_state.get('lesson_modified'):
+            applied['lesson'] = {
+                'index': None,
+                'original': WIDGET_TARGET_PAIR[0],
+                'replacement': WIDGET_TARGET_PAIR[1]
             }
-            with open(self.state_file, 'w') as f:
-                json.dump(state_to_save, f)
-            
-            if self.state['original_value']:
-                with open(self.original_file, 'w') as f:
-                    f.write(self.state['original_value'])
-                    
+        return applied
+
+    def _load_rules(self):
+        """加载并编译规则文件，之后文件变化时自动重新加载"""
+        self.rules_config = PluginConfig(str(self.config_dir), self.rules_file.name)
+        try:
+            self.rules_config.load_config({'rules': DEFAULT_RULES})
+            items = self.rules_config['rules'] or []
+            self.rules = RuleEngine.from_dicts(items)
         except Exception as e:
-            self.logger.error(f"状态保存失败: {str(e)}")
+            self.logger.error("规则文件加载失败，使用默认规则: %s", e)
+            items = DEFAULT_RULES
+            self.rules = RuleEngine.from_dicts(items)
+        self._rule_sources = {item['name']: item for item in items}
+
+        # 增量进程监视器（只检查新出现的进程）
+        self.process_watcher = ProcessWatcher()
+        if SHARED_DETECTOR:
+            try:
+                from .shared_detector import SharedProcessDetector, default_directory  # 只有开启时才导入
+                # leader 最长每 PROCESS_POLL_MAX 秒检测一次，结果超过该间隔（加上余量）仍未更新时改用本地检测
+                self.process_watcher = SharedProcessDetector(
+                    default_directory(), self.process_watcher, max_age=PROCESS_POLL_MAX + PROCESS_POLL_MIN
+                )
+            except Exception as e:
+                self.logger.warning("共享进程检测不可用，使用本地检测: %s", e)
+        self._watched = set()
+        self._watch_processes(self.rules.processes())
+
+        if self._watched:
+            self.scheduler.schedule('detect', 0)
+
+        # 已生效的规则从生效状态开始计算，条件不再满足时自动恢复
+        self.rules.preset(self.state.applied)
+
+        # 规则文件中已删除的规则直接恢复
+        self._pending.update(name for name in self.state.applied if name not in self._rule_sources)
+        self.logger.info("已加载 %d 条规则", len(self.rules.rules))
+
+        self.rules_config.subscribe(self._on_rules_changed)
 
-    def _detect_process(self):
-        """精确进程检测"""
+    def _on_rules_changed(self, config):
+        """规则文件内容变化（监视线程），在下一个 tick 重新加载"""
+        self._rules_reload = config
+        self.scheduler.wake()
+
+    def _reload_rules(self, config):
+        """重新编译规则并与已生效的状态对齐（宿主线程）"""
         try:
-            current_time = time.time()
-            target = self.state['process_name'].lower()
-            
-            # 使用state中的间隔参数
-            if current_time - self.state.get('last_check', 0) < self.state['check_interval']:
-                return self.state.get('process_running', False)
-            
-            # 执行实际进程检测
-            process_running = False
-            for proc in psutil.process_iter(['name']):
-                proc_name = proc.info['name'].lower()
-                if proc_name == target:
-                    process_running = True
-                    break
-            
-            # 更新状态
-            self.state['last_check'] = current_time
-            self.state['process_running'] = process_running
-            return process_running
-            
+            items = config.get('rules', [])
+            rules = RuleEngine.from_dicts(items)
         except Exception as e:
-            self.logger.error(f"进程检测失败: {str(e)}")
-            return False
+            self.logger.error("规则文件无效，继续使用当前规则: %s", e)
+            return
+        sources = {item['name']: item for item in items}
 
-    def _create_backup(self):
-        """创建唯一备份"""
-        if self.state['backup_done']:
-            return True
-            
+        applied = set(self.state.applied)
+        for name in applied:
+            if name in sources and sources[name] != self._rule_sources.get(name):
+                # 定义已修改：先按旧备份恢复，新规则重新计算后再生效
+                self._stale.add(name)
+        rules.preset(applied - self._stale)
+
+        self.rules = rules
+        if self.timetable is not None:
+            self._timetable_reload = True  # 规则中的课程可能变化
+        self._rule_sources = sources
+        self._pending.update(name for name in applied if name not in sources or name in self._stale)
+
+        # 进程监视目标交给检测所在的线程修改
+        processes = rules.processes()
+        if self.worker is None or not self.worker.submit('watch', self._watch_processes, processes):
+            self._watch_processes(processes)
+        if processes:
+            self._poll_interval.reset()
+            self.scheduler.schedule('detect', 0)
+        else:
+            self.scheduler.cancel('detect')
+            self.state.process_running = {}
+        self.logger.info("规则文件已重新加载: %d 条规则", len(rules.rules))
+
+    def _load_timetable(self):
+        """读取宿主课表并计算当天的切换时间，课表文件变化时重新计算"""
+        from .timetable import Timetable
+        timetable = Timetable(self.base_dir)
         try:
-            with open(self.target_config, 'r') as f:
-                data = json.load(f)
-                original = data.get('widgets', [])[-1] if data.get('widgets') else None
-                
-                if not original:
-                    self.logger.error("无效的widgets配置")
-                    return False
-                
-                with open(self.original_file, 'w') as f:
-                    f.write(original)
-                self.state.update({
-                    'original_value': original,
-                    'backup_done': True
-                })
-                self._save_state()
-                return True
-                
+            timetable.load()
         except Exception as e:
-            self.logger.error(f"备份失败: {str(e)}")
-            return False
+            self.logger.info("未读取到课表，只按 Current_Lesson 检测课程变化: %s", e)
+            return
+        timetable.subscribe(self._on_timetable_changed)
+        self.timetable = timetable
+        self._plan_transitions(time.time())
 
-    def _apply_modification(self):
-        """应用配置修改"""
-        if not self._create_backup():
-            return False
+    def _trace_snapshot(self):
+        """记录文件开头的状态快照：回放时据此重建 widget.json、规则和状态"""
+        # 直接读取文件：widget_store 可能正由工作线程使用
+        try:
+            with open(self.target_config, 'r', encoding='utf-8') as f:
+                widgets = json.load(f)
+        except Exception:
+            widgets = None
+        return {
+            'widget_config': widgets,
+            'applied': dict(self.state.applied),
+            'rules': list(self._rule_sources.values())
+        }
+
+    def _on_timetable_changed(self, config):
+        """课表文件内容变化（监视线程），在下一个 tick 重新计算"""
+        self._timetable_reload = True
+        self.scheduler.wake()
+
+    def _plan_transitions(self, now):
+        """计算今天剩余的、进入或离开规则中课程的切换时间"""
+        dt = datetime.now()
+        midnight = now - (dt.hour * 3600 + dt.minute * 60 + dt.second + dt.microsecond / 1e6)
+        transitions = [
+            (midnight + offset, lesson)
+            for offset, lesson in self.timetable.transitions(dt.date(), self.rules.lessons())
+            if midnight + offset > now
+        ]
+        self._transitions = transitions[::-1]
+        self.scheduler.schedule('timetable_day', midnight + 24 * 3600 + 1)
+        self._schedule_transition()
+        self.logger.debug("今天剩余 %d 个课表切换点", len(transitions))
 
+    def _schedule_transition(self):
+        if self._transitions:
+            due = self._transitions[-1][0]
+            self.scheduler.schedule('transition', due)
+            self.scheduler.schedule('prepare', due - TIMETABLE_PREPARE)
+        else:
+            self.scheduler.cancel('transition')
+            self.scheduler.cancel('prepare')
+
+    def _check_timetable(self, now, due):
+        """处理到期的课表事件：重新计算切换时间、切换前预读布局、按课表切换课程"""
+        if self._timetable_reload or 'timetable_day' in due:
+            self._timetable_reload = False
+            try:
+                self.timetable.load()  # 同时检查宿主是否切换了课表
+            except Exception as e:
+                self.logger.warning("课表读取失败，只按 Current_Lesson 检测课程变化，%d 秒后重试: %s", TIMETABLE_RETRY, e)
+                self._transitions = []
+                self._schedule_transition()
+                # 文件损坏时监视线程不一定再通知，不重新安排就再也不会计算切换时间
+                self.scheduler.schedule('timetable_day', now + TIMETABLE_RETRY)
+            else:
+                self._plan_transitions(now)
+
+        if 'prepare' in due:
+            # 后台模式下队列已满时跳过（只是预读），不在宿主线程与工作线程同时使用 widget_store
+            if self.worker is None:
+                self._prepare_layout()
+            else:
+                self.worker.submit('prepare', self._prepare_layout)
+
+        if 'transition' in due:
+            self._check_lesson_change(now)  # 先处理宿主在同一 tick 报告的课程变化
+            lesson = None
+            while self._transitions and self._transitions[-1][0] <= now:
+                lesson = self._transitions.pop()[1]
+            if lesson is not None:
+                self._timetable_lesson = lesson
+                self.scheduler.schedule('timetable_grace', now + TIMETABLE_GRACE)
+                self.logger.debug("按课表切换课程: %s", lesson)
+                self.metrics.event('timetable_transition', lesson)
+            self._schedule_transition()
+
+        if 'timetable_grace' in due:
+            self._timetable_lesson = None
+
+    def _prepare_layout(self):
+        """读取 widget.json 并建立组件索引，切换时只需修改和写入"""
         try:
-            with open(self.target_config, 'r+') as f:
-                data = json.load(f)
-                if data['widgets'][-1] == "lx-music-lyrics.ui":
-                    return True
-                    
-                data['widgets'][-1] = "lx-music-lyrics.ui"
-                f.seek(0)
-                json.dump(data, f, indent=4)
-                f.truncate()
-                
-                self.state['modified'] = True
-                self._save_state()
-                return True
-                
+            self.widget_store.positions(None)
         except Exception as e:
-            self.logger.error(f"修改失败: {str(e)}")
-            return False
+            self.logger.warning("预读组件配置失败: %s", e)
 
-    def _restore_config(self):
-        """恢复原始配置"""
-        if not self.original_file.exists():
-            self.logger.error("原始值备份丢失")
-            return False
+    def _watch_processes(self, names):
+        """更新进程监视目标"""
+        names = set(names)
+        for name in self._watched - names:
+            self.process_watcher.unwatch(name)
+        for name in names - self._watched:
+            self.process_watcher.watch(name, name=name)
+        self._watched = names
 
+    def _load_state(self):
+        """重放状态日志"""
         try:
-            with open(self.original_file, 'r') as f:
-                original_value = f.read().strip()
-                
-            with open(self.target_config, 'r+') as f:
-                data = json.load(f)
-                if data['widgets'][-1] == original_value:
-                    return True
-                    
-                data['widgets'][-1] = original_value
-                f.seek(0)
-                json.dump(data, f, indent=4)
-                f.truncate()
-                
-                self.state.update({
-                    'modified': False,
-                    'backup_done': False
-                })
-                self._save_state()
-                self.original_file.unlink(missing_ok=True)
-                return True
-                
+            data, dropped = self.journal.load()
+            if dropped:
+                self.logger.critical("状态日志损坏，已丢弃 %d 条记录", dropped)
+            self.state.applied = dict(data)
+
         except Exception as e:
-            self.logger.error(f"恢复失败: {str(e)}")
-            return False
+            self.logger.critical("状态加载失败，重置状态: %s", e)
+            self._reset_state()
+
+    def _detect_process(self, now):
+        """精确进程检测（由调度器按自适应间隔触发）"""
+        try:
+            # 后台模式：提交检测任务，结果在之后的 tick 中生效
+            if self.worker is not None:
+                # 任务失败时不会有回调，先按最大间隔登记下一次检测
+                self.scheduler.schedule('detect', now + PROCESS_POLL_MAX)
+                if not self.worker.submit('detect', self._poll_processes, callback=self._on_process_result):
+                    self.scheduler.schedule('detect', now + PROCESS_POLL_MIN)
+                return
+
+            # 执行增量进程检测
+            self._on_process_result(self._poll_processes())
+
+        except Exception as e:
+            self.logger.error("进程检测失败: %s", e)
+            self.scheduler.schedule('detect', now + self._poll_interval.current)
+
+    def _poll_processes(self):
+        """执行一次增量进程检测"""
+        with self.metrics.phase('detect_process'):
+            result = self.process_watcher.poll()
+        self.metrics.incr('process_polls')
+        return result
+
+    def _on_process_exit(self):
+        """事件循环收到已匹配进程的退出通知：立即重新检测，不必等到下一次轮询"""
+        self._poll_interval.reset()
+        self.scheduler.schedule('detect', 0)
+
+    def _on_process_result(self, process_running):
+        """进程检测完成（宿主线程）：进程状态变化后收紧检测间隔，稳定时逐步放宽"""
+        changed = process_running != self.state.process_running
+        self.state.process_running = process_running
+        if changed and self.trace is not None:
+            self.trace.record('process', time.time(), running=process_running)
+        self.scheduler.schedule('detect', time.time() + self._poll_interval.next(changed))
+
+    def _collect_signals(self, now, due):
+        """收集本 tick 的规则输入信号"""
+        if 'detect' in due:
+            self._detect_process(now)
+        signals = {
+            process_signal(name): running
+            for name, running in self.state.process_running.items()
+        }
+
+        # 课程变化后等待防抖动时间再生效（到期时调度器会触发一次 tick）
+        with self.metrics.phase('check_lesson_change'):
+            current_lesson = self._check_lesson_change(now)
+        if self._timetable_lesson is not None:
+            # 已按课表切换，宿主的 Current_Lesson 尚未更新
+            signals[LESSON] = self._timetable_lesson
+        elif not self.scheduler.scheduled('lesson'):
+            signals[LESSON] = current_lesson
+
+        if self.rules.uses(CLOCK):
+            dt = datetime.now()
+            signals[CLOCK] = dt.hour * 60 + dt.minute
+            if 'clock' in due or not self.scheduler.scheduled('clock'):
+                # 下一个整分钟
+                self.scheduler.schedule('clock', now + 60 - dt.second - dt.microsecond / 1e6)
+        return signals
 
     def update(self, cw_contexts):
-        """主状态机逻辑"""
+        """主状态机逻辑：没有到期的检查且课程未变化时直接返回"""
         super().update(cw_contexts)
-        
-        process_running = self._detect_process()
-
-        # 新功能：课程变化检测
-        current_lesson = self._check_lesson_change()
-        lesson_condition = self._lesson_condition_met()
-        time_since_change = time.time() - self.state['last_lesson_change']
-        
-        # 课程相关处理逻辑
-        if time_since_change > 4:  # 等待4秒防抖动
-            if lesson_condition and not self.state['lesson_modified']:
-                if self._modify_for_lesson():
-                    self.logger.info("课程条件触发修改完成")
-                    
-            elif not lesson_condition and self.state['lesson_modified']:
-                if self._restore_for_lesson():
-                    self.logger.info("课程条件触发恢复完成")
-        
-        # 进程启动处理
-        if process_running and not self.state['modified']:
-            if self._apply_modification():
-                self.logger.info("配置修改成功")
-                
-        # 进程退出处理
-        if not process_running and self.state['modified']:
-            if self._restore_config():
-                self.logger.info("配置恢复成功")
-
-    def _save_lesson_state(self):
-        """安全保存课程相关状态（修复版）"""
+        if not self._ready:
+            self._warm_up()
+
+        if self.driver is not None:
+            # 由事件循环执行检查，这里只转发课程变化
+            if cw_contexts.get('Current_Lesson', '') != self.state.current_lesson:
+                self.scheduler.wake()
+            return
+
+        now = time.time()
+        if now < self.scheduler.next_due and cw_contexts.get('Current_Lesson', '') == self.state.current_lesson:
+            return
+        self._tick(now)
+
+    def _tick(self, now):
+        """执行到期的检查并处理规则变化"""
+        due = self.scheduler.pop_due(now)
+
+        # 应用上一个 tick 之后完成的后台任务结果
+        if self.worker is not None:
+            self.worker.run_callbacks()
+
+        self.metrics.incr('ticks')
+        if 'metrics' in due:
+            if self.metrics.tick(now):
+                self._flush_metrics()
+            metrics_due = self.metrics.next_due()
+            if metrics_due is not None:
+                self.scheduler.schedule('metrics', metrics_due)
+
+        if self._rules_reload is not None:
+            config, self._rules_reload = self._rules_reload, None
+            if self.trace is not None:
+                self.trace.record('rules', now, config=config)
+            self._reload_rules(config)
+        if self.timetable is not None:
+            self._check_timetable(now, due)
+
+        # 只有输入变化的规则会被重新计算
+        signals = self._collect_signals(now, due)
+        if self.trace is not None:
+            self.trace.record(
+                'tick', now, lesson=self.state.current_lesson, timetable=self._timetable_lesson, due=due
+            )
+        with self.metrics.phase('evaluate_rules'):
+            changed = self.rules.evaluate(signals, now)
+        switch = self.rules.next_switch()
+        if switch is not None:
+            self.scheduler.schedule('switch', switch)
+        for rule in changed:
+            self._pending.add(rule.name)
+        if changed:
+            self._retry.reset()  # 新的状态变化立即处理
+        if not self._pending:
+            return
+
+        # 期望状态：规则名 -> 需要生效的规则（None 表示需要恢复）
+        rules = {rule.name: rule for rule in self.rules.rules}
+        rank = {rule.name: i for i, rule in enumerate(self.rules.rules)}  # 同一位置上按规则顺序叠加
+        desired = {}
+        for name in self._pending:
+            rule = rules.get(name)
+            if name in self._stale:
+                desired[name] = None  # 按旧定义恢复，之后的 tick 再按新定义生效
+            else:
+                desired[name] = rule if rule is not None and rule.active else None
+
+        if self.worker is None:
+            self._finish_reconcile(self._reconcile(desired, rank, dict(self.state.applied)))
+        elif self._reconciling:
+            pass  # 等待执行中的修改完成，按其结果重新计算
+        elif self.worker.submit(
+                'reconcile', self._reconcile, desired, rank, dict(self.state.applied), callback=self._finish_reconcile
+        ):
+            self._reconciling = True
+        else:
+            self.logger.warning("后台队列已满，稍后重试")
+
+        # 仍未处理完的规则（失败或后台执行中）稍后再检查
+        if self._pending:
+            self.scheduler.schedule('retry', now + self._retry.delay())
+
+    def _reconcile(self, desired, rank, snapshot):
+        """按期望状态修改 widget.json（后台模式下在工作线程执行）
+
+        snapshot 为提交时 state.applied 的副本，只修改其拷贝；工作线程不持有宿主线程会等待的锁，
+        结果由 _finish_reconcile 在宿主线程替换 state.applied。
+        返回 (提交成功后需要记录的日志（写入失败为 None）, 是否有规则处理失败, 处理后生效的规则)。
+        """
+        with self.metrics.phase('reconcile'):
+            applied = dict(snapshot)  # 备份不会被原地修改，浅拷贝即可
+            done = []
+            failed = False
+
+            for name, rule in desired.items():
+                if rule is not None and name not in applied:
+                    with self.metrics.phase('apply_rule'):
+                        ok = self._apply_rule(rule, rank, applied)
+                    if ok:
+                        done.append(f"规则生效: {name}")
+                    failed |= not ok
+                elif rule is None and name in applied:
+                    with self.metrics.phase('revert_rule'):
+                        ok = self._revert_rule(name, applied)
+                    if ok:
+                        done.append(f"规则恢复: {name}")
+                    failed |= not ok
+
+            # 本 tick 所有修改合并为一次写入
+            if not self._commit_tick():
+                self._rollback_journal(snapshot)
+                return None, True, snapshot
+            return done, failed, applied
+
+    def _rollback_journal(self, snapshot):
+        """写入失败时回滚状态日志：丢弃未写入的记录，已写入的记录追加补偿记录"""
+        self.journal.discard()
+        for name in set(self.journal.data) | set(snapshot):
+            if name not in snapshot:
+                self.journal.delete(name)
+            elif name not in self.journal.data or self.journal.data[name] != snapshot[name]:
+                self.journal.set(name, snapshot[name])
         try:
-            # 创建要保存的状态数据
-            state_to_save = {
-                'modified': self.state['modified'],
-                'backup_done': self.state['backup_done'],
-                'lesson_modified': self.state['lesson_modified'],
-                'lesson_backup_done': self.state['lesson_backup_done']
-            }
+            self.journal.commit()
+        except Exception as e:
+            self.logger.error("状态保存失败: %s", e)
+            self.journal.discard()
+
+    def _finish_reconcile(self, result):
+        """处理修改结果（宿主线程）"""
+        done, failed, applied = result
+        self.state.applied = applied
+        self._reconciling = False
+        if done is None:
+            self.metrics.incr('commit_failures')
+        for message in done or ():
+            self.logger.info(message)
+            self.metrics.incr('transitions')
+            self.metrics.event('transition', message)
+
+        # 处理失败的规则保留到下一个 tick 重试
+        rules = {rule.name: rule for rule in self.rules.rules}
+        self._stale &= set(applied)
+        self._pending = {
+            name for name in self._pending
+            if name in self._stale or (name in rules and rules[name].active) != (name in applied)
+        }
+        # 只有写入失败（包括 ConflictError）或规则处理失败才退避；仍待处理的规则
+        # （例如先按旧定义恢复、或后台执行期间又有变化）按正常间隔继续
+        if failed:
+            self._retry.fail()
+            if self._retry.failures == RETRY_BUDGET + 1:
+                self.logger.error("连续 %d 次修改失败，之后每 %d 秒重试一次", RETRY_BUDGET + 1, RETRY_MAX)
+        else:
+            self._retry.reset()
+        if self.trace is not None and done != []:  # 只记录实际的修改和失败
+            self.trace.record('actions', time.time(), done=done, applied=sorted(applied))
 
-            # 使用原子写入方式防止文件损坏
-            temp_file = self.state_file.with_suffix('.tmp')
-            with open(temp_file, 'w') as f:
-                json.dump(state_to_save, f, indent=4)
-
-            # 替换原文件
-            temp_file.replace(self.state_file)
-            
-            # 单独保存课程备份（使用相同安全方式）
-            if self.state['lesson_original_value']:
-                lesson_backup = self.config_dir / "lesson_backup.json"
-                temp_backup = lesson_backup.with_suffix('.tmp')
-                with open(temp_backup, 'w') as f:
-                    json.dump({'widgets': self.state['lesson_original_value']}, f, indent=4)
-                temp_backup.replace(lesson_backup)
-            
+    def shutdown(self):
+        """停止后台线程，等待未完成的写入"""
+        if not self._ready:
+            return
+        if self.driver is not None:
+            self.driver.stop()
+            self.driver = None
+        if self.worker is not None:
+            if not self.worker.shutdown():
+                self.logger.warning("后台任务未能在超时前完成")
+            self.worker.run_callbacks()
+            self.worker = None
+        if self.metrics.enabled:
+            self._write_metrics(self._metrics_components())
+        self.rules_config.unsubscribe(self._on_rules_changed)
+        self.process_watcher.close()
+        if self._widget_store is not None:
+            self._widget_store.close()
+        if self.timetable is not None:
+            self.timetable.close()
+        self.journal.close()
+        if self.trace is not None:
+            self.trace.close()
+
+        from . import log_pipeline
+        log_pipeline.stop(logging.getLogger(__package__))
+
+    def _metrics_components(self):
+        """各组件自带的计数器（缓存命中、扫描次数等）"""
+        components = {
+            'process_watcher': dict(self.process_watcher.stats),
+            'retry_failures': self._retry.failures,
+            'journal': dict(self.journal.stats),
+            'pending_rules': len(self._pending)
+        }
+        if self._widget_store is not None:
+            components['widget_store'] = dict(self._widget_store.stats)
+            components['widget_lock'] = dict(self._widget_store.lock.stats)
+        if self.worker is not None:
+            components['worker'] = dict(self.worker.stats)
+        return components
+
+    def _flush_metrics(self):
+        """写出指标文件（后台模式下交给工作线程）"""
+        components = self._metrics_components()
+        if self.worker is None or not self.worker.submit('metrics', self._write_metrics, components):
+            self._write_metrics(components)
+
+    def _write_metrics(self, components):
+        try:
+            self.metrics.flush(components)
         except Exception as e:
-            self.logger.error(f"课程状态保存失败: {str(e)}")
-            # 清理可能残留的临时文件
-            for f in [temp_file, temp_backup]:
-                if f and f.exists():
-                    try:
-                        f.unlink()
-                    except:
-                        pass
-
-    def _check_lesson_change(self):
-        """检测课程变化"""
-        current_lesson = self.cw_contexts.get('Current_Lesson', '')
-        
-        # 首次检测或发生变化时记录时间戳
-        if current_lesson != self.state['current_lesson']:
-            self.state['current_lesson'] = current_lesson
-            self.state['last_lesson_change'] = time.time()
-            self.logger.debug(f"课程变化检测: {current_lesson}")
-            
-        return current_lesson
+            self.logger.error("指标写出失败: %s", e)
 
-    def _lesson_condition_met(self):
-        """检查课程触发条件"""
-        current_lesson = self.state['current_lesson']
-        return current_lesson in LESSON_TRIGGERS
+    @property
+    def widget_store(self):
+        """widget.json 缓存层：首次使用时才导入和创建（在预读或修改所在的线程中），不占用启动时间"""
+        if self._widget_store is None:
+            from .widget_store import WidgetConfigStore
+            self._widget_store = WidgetConfigStore(self.target_config)
+        return self._widget_store
 
-    def _create_lesson_backup(self, widgets):
-        """创建课程相关备份"""
-        if self.state['lesson_backup_done']:
+    def _commit_tick(self):
+        """提交本 tick 暂存的修改并保存状态"""
+        if not self.state.dirty:
             return True
-            
+        self.state.dirty = False
+
+        # 先写入状态日志再写入 widget.json，保证中途退出后仍可恢复
         try:
-            original_widgets = widgets.copy()
-            self.state['lesson_original_value'] = original_widgets
-            self.state['lesson_backup_done'] = True
-            self._save_lesson_state()
-            self.logger.info("课程相关配置备份成功")
-            return True
+            with self.metrics.phase('state_save'):
+                self.journal.commit()
         except Exception as e:
-            self.logger.error(f"课程备份失败: {str(e)}")
+            self.logger.error("状态保存失败: %s", e)
+            self.widget_store.discard()
             return False
 
-    def _modify_for_lesson(self):
-        """执行课程相关修改"""
+        from .widget_store import ConflictError
         try:
-            with open(self.target_config, 'r+') as f:
-                data = json.load(f)
-                widgets = data.get('widgets', [])
-                
-                # 验证修改条件
-                target_index = self._find_widget_index(widgets, WIDGET_TARGET_PAIR[0])
-                if target_index == -1:
-                    self.logger.warning("目标组件不存在，跳过修改")
-                    return False
-                if WIDGET_TARGET_PAIR[1] in widgets:
-                    self.logger.warning("目标组件已存在，跳过修改")
-                    return False
-                
-                # 创建备份
-                if not self._create_lesson_backup(widgets):
-                    return False
-                
-                # 执行修改
-                widgets[target_index] = WIDGET_TARGET_PAIR[1]
-                f.seek(0)
-                json.dump(data, f, indent=4)
-                f.truncate()
-                
-                self.state['lesson_modified'] = True
-                self._save_lesson_state()
-                self.logger.info(f"课程触发修改成功: {WIDGET_TARGET_PAIR[0]} → {WIDGET_TARGET_PAIR[1]}")
-                return True
+            with self.metrics.phase('widget_commit'):
+                written = self.widget_store.commit()
+        except ConflictError:
+            # 宿主或其它程序刚修改了 widget.json：回滚后按新内容重新计算
+            self.logger.warning("widget.json 已被其它程序修改，稍后按新内容重试")
+            self.metrics.incr('widget_conflicts')
+            self.widget_store.discard()
+            return False
+        except TimeoutError as e:
+            self.logger.warning("配置写入失败: %s", e)
+            self.metrics.incr('widget_lock_timeouts')
+            self.widget_store.discard()
+            return False
         except Exception as e:
-            self.logger.error(f"课程相关修改失败: {str(e)}")
+            self.logger.error("配置写入失败: %s", e)
+            self.widget_store.discard()
             return False
+        self.metrics.incr('widget_writes' if written else 'widget_skipped_writes')
+        return True
 
-    def _restore_for_lesson(self):
-        """恢复课程相关配置"""
-        if not self.state['lesson_backup_done']:
-            return False
-            
+    def _check_lesson_change(self, now):
+        """检测课程变化"""
+        current_lesson = self.cw_contexts.get('Current_Lesson', '')
+
+        # 首次检测或发生变化时记录时间戳，防抖动结束时触发一次 tick
+        if current_lesson != self.state.current_lesson:
+            self.state.current_lesson = current_lesson
+            self.scheduler.schedule('lesson', now + LESSON_DEBOUNCE)
+            # 宿主已报告变化：不再使用课表的课程，防抖动期间保持当前结果
+            self._timetable_lesson = None
+            self.scheduler.cancel('timetable_grace')
+            self.logger.debug("课程变化检测: %s", current_lesson)
+            self.metrics.event('lesson_change', current_lesson)
+
+        return current_lesson
+
+    def _apply_rule(self, rule, rank, applied):
+        """暂存规则的组件修改，并记录备份信息
+
+        位置已被规则顺序在后的规则修改时，本规则放在其下层：不写入组件，改为更新上层规则备份中的原始组件。
+        """
+        from . import layout  # 与 widget_store 一样在首次修改时才导入
         try:
-            original_widgets = self.state['lesson_original_value']
-            with open(self.target_config, 'r+') as f:
-                data = json.load(f)
-                current_widgets = data.get('widgets', [])
-                
-                # 只恢复被修改的部分
-                try:
-                    target_index = current_widgets.index(WIDGET_TARGET_PAIR[1])
-                    current_widgets[target_index] = WIDGET_TARGET_PAIR[0]
-                except ValueError:
-                    self.logger.warning("目标组件不存在，无需恢复")
-                    return True
-                
-                # 写入修改
-                data['widgets'] = current_widgets
-                f.seek(0)
-                json.dump(data, f, indent=4)
-                f.truncate()
-                
-                self.state.update({
-                    'lesson_modified': False,
-                    'lesson_backup_done': False,
-                    'lesson_original_value': None
-                })
-                self._save_lesson_state()
-                
-                # 清理备份文件
-                (self.config_dir / "lesson_backup.json").unlink(missing_ok=True)
-                self.logger.info("课程相关配置恢复成功")
-                return True
+            widgets = self.widget_store.widgets()
+            if not widgets:
+                self.logger.error("无效的widgets配置")
+                return False
+
+            above = layout.covering(layout.stacks(applied, widgets), rank, rank.get(rule.name, -1))
+            changes, skipped = layout.plan(
+                self.widget_store, rule.mappings, {index: layer[1] for index, layer in above.items()}
+            )
+            for reason, widget in skipped:
+                self.logger.warning("%s，跳过修改: %s", reason, widget)
+
+            # 所有位置合并为一条备份记录，修改暂存后由 _commit_tick 统一写入
+            backup = None
+            if changes:
+                backup = {'slots': [list(change) for change in changes]}
+                for index, _, replacement in changes:
+                    if index in above:
+                        upper, _, upper_replacement = above[index]
+                        self._rebase(applied, upper, index, upper_replacement, replacement)
+                    else:
+                        self.widget_store.set_widget(index, replacement)
+            applied[rule.name] = backup
+            self.journal.set(rule.name, backup)
+            self.state.dirty = True
+            return True
+
         except Exception as e:
-            self.logger.error(f"课程恢复失败: {str(e)}")
+            self.logger.error("修改失败 %s: %s", rule.name, e)
             return False
 
-    def _find_widget_index(self, widgets, target):
-        """查找组件索引"""
+    def _revert_rule(self, name, applied):
+        """按备份信息暂存恢复操作；已被其它规则覆盖的位置交给上层规则恢复"""
+        from . import layout
         try:
-            return widgets.index(target)
-        except ValueError:
-            return -1
-        
+            backup = applied[name]
+            if backup is not None:
+                stacks = layout.stacks(applied, self.widget_store.widgets())
+                slots, handoffs = layout.hand_off(stacks, name, layout.backup_slots(backup))
+                for upper, index, replacement, original in handoffs:
+                    self._rebase(applied, upper, index, replacement, original)
+                changes, missing = layout.plan_revert(self.widget_store, slots)
+                for widget in missing:
+                    self.logger.warning("目标组件不存在，无需恢复: %s", widget)
+                self.widget_store.apply(changes)
+
+            del applied[name]
+            self.journal.delete(name)
+            self.state.dirty = True
+            return True
+
+        except Exception as e:
+            self.logger.error("恢复失败 %s: %s", name, e)
+            return False
+
+    def _rebase(self, applied, name, index, replacement, original):
+        """修改已生效规则 name 在位置 index 上备份的原始组件"""
+        from . import layout
+        backup = layout.rebase(applied[name], index, replacement, original)
+        applied[name] = backup
+        self.journal.set(name, backup)
+
     def _reset_state(self):
         """重置为初始状态"""
-        backup_files = [
-            self.state_file,
-            self.original_file,
-            self.config_dir / "lesson_backup.json"
-        ]
-        
-        for f in backup_files:
-            try:
-                if f.exists():
-                    f.unlink()
-            except Exception as e:
-                self.logger.error(f"清理文件失败 {f.name}: {str(e)}")
-        
-        self.state.update({
-            'modified': False,
-            'backup_done': False,
-            'lesson_modified': False,
-            'lesson_backup_done': False,
-            'lesson_original_value': None
-        })
+        try:
+            self.journal.reset()
+        except Exception as e:
+            self.logger.error("清理状态日志失败: %s", e)
+
+        self.state.applied = {}
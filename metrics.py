@@ -0,0 +1,155 @@
+import json
+import os
+import time
+from pathlib import Path
+
+
+class _NullPhase:
+    """关闭统计时使用的空计时器"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _Histogram:
+    """按 2 的幂划分的耗时直方图（微秒）"""
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * 32
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(31, int(seconds * 1e6).bit_length())] += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1e3,
+            'mean_us': self.total / self.count * 1e6 if self.count else 0,
+            'max_us': self.max * 1e6,
+            # [上界（微秒）, 次数]
+            'buckets_us': [[1 << i, n] for i, n in enumerate(self.buckets) if n]
+        }
+
+
+class Metrics:
+    """运行时指标：各阶段耗时直方图、计数器和最近事件时间戳
+
+    关闭时 phase() 返回共享的空计时器，incr()/event() 直接返回，开销接近于零。
+    开关可以在运行时调用 set_enabled()，或创建/删除 toggle_file 切换（仅在文件状态变化时生效）。
+    """
+
+    def __init__(self, path, enabled=False, flush_interval=30, toggle_file=None, toggle_interval=10):
+        self.path = Path(path)
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.toggle_file = Path(toggle_file) if toggle_file else None
+        self.toggle_interval = toggle_interval
+        self._next_flush = 0
+        self._next_toggle_check = 0
+        self._toggle_present = None
+        self._reset()
+
+    def _reset(self):
+        self.phases = {}
+        self.counters = {}
+        self.events = {}
+        self.since = time.time()
+
+    def set_enabled(self, enabled):
+        if enabled and not self.enabled:
+            self._reset()
+        self.enabled = enabled
+
+    def phase(self, name):
+        """计时上下文：with metrics.phase('name'): ..."""
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def record(self, name, seconds):
+        histogram = self.phases.get(name)
+        if histogram is None:
+            histogram = self.phases[name] = _Histogram()
+        histogram.add(seconds)
+
+    def incr(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def event(self, name, detail=None):
+        """记录事件最近一次发生的时间"""
+        if self.enabled:
+            self.events[name] = {'time': time.time(), 'detail': detail}
+
+    def tick(self, now):
+        """每个 tick 调用一次，返回是否需要写出指标文件"""
+        if self.toggle_file is not None and now >= self._next_toggle_check:
+            self._next_toggle_check = now + self.toggle_interval
+            present = self.toggle_file.exists()
+            if present != self._toggle_present:
+                if present or self._toggle_present is not None:
+                    self.set_enabled(present)
+                self._toggle_present = present
+
+        if not self.enabled or now < self._next_flush:
+            return False
+        self._next_flush = now + self.flush_interval
+        return True
+
+    def next_due(self):
+        """下一次需要调用 tick() 的时间，没有时返回 None"""
+        times = []
+        if self.toggle_file is not None:
+            times.append(self._next_toggle_check)
+        if self.enabled:
+            times.append(self._next_flush)
+        return min(times) if times else None
+
+    def snapshot(self, components=None):
+        return {
+            'since': self.since,
+            'updated': time.time(),
+            'phases': {name: h.to_dict() for name, h in list(self.phases.items())},
+            'counters': dict(self.counters),
+            'events': dict(self.events),
+            'components': components or {}
+        }
+
+    def flush(self, components=None):
+        """原子写出指标文件"""
+        data = self.snapshot(components)
+        temp_file = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, self.path)
@@ -0,0 +1,177 @@
+import os
+import select
+import threading
+
+psutil = None  # 首次检测时才导入，加快插件加载
+
+
+def _load_psutil():
+    global psutil
+    if psutil is None:
+        import psutil as module
+        psutil = module
+    return psutil
+
+
+class _Target:
+    """单个监视目标"""
+    __slots__ = ('key', 'name', 'predicate', 'matches')
+
+    def __init__(self, key, name, predicate):
+        self.key = key
+        self.name = name.lower() if name else None
+        self.predicate = predicate
+        self.matches = {}  # pid -> _Handle
+
+    def match(self, name, proc):
+        if self.name is not None and name.lower() != self.name:
+            return False
+        if self.predicate is not None and not self.predicate(name, proc):
+            return False
+        return True
+
+
+class _Handle:
+    """已匹配进程的句柄（含可选的 pidfd 退出通知）"""
+    __slots__ = ('proc', 'fd')
+
+    def __init__(self, proc, fd=None):
+        self.proc = proc
+        self.fd = fd
+
+    def alive(self):
+        if self.fd is not None:
+            # 进程退出时 pidfd 变为可读，无需读取 /proc
+            readable, _, _ = select.select([self.fd], [], [], 0)
+            return not readable
+        return self.proc.is_running()
+
+    def release(self):
+        if self.fd is not None:
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = None
+
+
+class ProcessWatcher:
+    """增量进程监视器
+
+    记录已检查过的进程（PID 和创建时间），每次只读取新出现进程的名称，PID 被复用（创建时间变化）
+    时也视为新进程；已匹配的进程保持句柄，仅检查其存活状态（Linux 5.3+ 使用 pidfd 退出通知）。
+    多个目标在同一次扫描中完成匹配。事件循环可通过 exit_fds() 等待已匹配进程退出。
+    """
+
+    def __init__(self, backend=None):
+        self._ps = backend  # 兼容 psutil 接口的后端，便于测试替换；默认首次 poll() 时加载 psutil
+        self._targets = {}
+        self._seen = {}  # pid -> 进程创建时间
+        self._lock = threading.RLock()  # poll() 与 exit_fds() 可能在不同线程调用
+        self.generation = 0  # 已匹配进程变化的次数
+        # pidfd 只适用于真实进程表
+        self._use_pidfd = backend is None and hasattr(os, 'pidfd_open')
+        self.stats = {'polls': 0, 'scans': 0, 'name_reads': 0, 'identity_checks': 0, 'liveness_checks': 0}
+
+    def watch(self, key, name=None, predicate=None):
+        """添加监视目标：按进程名（不区分大小写）和/或判定函数 predicate(name, proc)"""
+        if name is None and predicate is None:
+            raise ValueError('name 和 predicate 至少需要提供一个')
+        with self._lock:
+            self.unwatch(key)
+            self._targets[key] = _Target(key, name, predicate)
+            # 新目标需要重新检查已见过的进程
+            self._seen.clear()
+
+    def unwatch(self, key):
+        """移除监视目标"""
+        with self._lock:
+            target = self._targets.pop(key, None)
+            if target is not None and target.matches:
+                for handle in target.matches.values():
+                    handle.release()
+                self.generation += 1
+
+    def poll(self):
+        """执行一次检测，返回 {key: 是否运行}"""
+        with self._lock:
+            self.stats['polls'] += 1
+            if self._ps is None:
+                self._ps = _load_psutil()
+            self._check_alive()
+            if any(not t.matches for t in self._targets.values()):
+                self._scan_new()
+            return {key: bool(t.matches) for key, t in self._targets.items()}
+
+    def exit_fds(self):
+        """返回 (generation, [pidfd 副本])：进程退出时副本变为可读，由调用方登记到事件循环并负责关闭
+
+        generation 变化说明已匹配的进程有变化，需要重新获取。
+        """
+        with self._lock:
+            fds = []
+            for target in self._targets.values():
+                for handle in target.matches.values():
+                    if handle.fd is not None:
+                        fds.append(os.dup(handle.fd))
+            return self.generation, fds
+
+    def close(self):
+        """释放所有句柄"""
+        with self._lock:
+            for key in list(self._targets):
+                self.unwatch(key)
+
+    def _check_alive(self):
+        """只检查已匹配进程的存活状态"""
+        for target in self._targets.values():
+            for pid, handle in list(target.matches.items()):
+                self.stats['liveness_checks'] += 1
+                try:
+                    alive = handle.alive()
+                except (self._ps.Error, OSError):
+                    alive = False
+                if not alive:
+                    handle.release()
+                    del target.matches[pid]
+                    self.generation += 1
+
+    def _scan_new(self):
+        """只读取新出现进程的名称（按 PID 和创建时间识别，PID 被复用时重新读取）"""
+        self.stats['scans'] += 1
+        seen = {}
+        targets = list(self._targets.values())
+
+        for pid in self._ps.pids():
+            try:
+                proc = self._ps.Process(pid)
+                created = proc.create_time()
+            except self._ps.Error:
+                continue  # 已退出或无权访问，下次扫描再检查
+            self.stats['identity_checks'] += 1
+            seen[pid] = created
+            if self._seen.get(pid) == created:
+                continue
+            try:
+                name = proc.name() or ''
+            except self._ps.Error:
+                continue
+            self.stats['name_reads'] += 1
+
+            # 新进程与所有目标匹配，避免目标退出后漏掉已见过的其它实例
+            for target in targets:
+                if pid not in target.matches and target.match(name, proc):
+                    target.matches[pid] = _Handle(proc, self._open_pidfd(pid))
+                    self.generation += 1
+
+        # 已退出的 PID 不再保留，大小与进程表一致
+        self._seen = seen
+
+    def _open_pidfd(self, pid):
+        if not self._use_pidfd:
+            return None
+        try:
+            return os.pidfd_open(pid)
+        except OSError:
+            # 内核不支持或进程已退出，退回 is_running 检查
+            return None
@@ -0,0 +1,238 @@
+# 输入信号名称
+LESSON = 'lesson'
+CLOCK = 'clock'  # 当天的分钟数（0-1439）
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def process_signal(name):
+    """进程运行状态信号名称"""
+    return f'process:{name.lower()}'
+
+
+def parse_minute(text):
+    """将 "HH:MM" 转换为当天的分钟数"""
+    hour, minute = text.split(':')
+    return int(hour) * 60 + int(minute)
+
+
+class Rule:
+    """单条规则：所有条件同时满足时规则生效
+
+    条件：课程属于 lessons 集合 / processes 中的进程均在运行 / 当前时间在 window 内。
+    动作：swap=(原始组件, 目标组件) 按名称替换；slot + widget 替换指定位置的组件；
+    或 remap 同时替换多个组件。三种写法都编译为 mappings：(位置, 原始组件, 目标组件) 列表，
+    位置为 None 时按原始组件名称查找，原始组件为 None 时替换该位置上的任意组件。
+    debounce：条件满足持续该秒数后才生效；hysteresis：条件不再满足持续该秒数后才恢复。
+    """
+    __slots__ = (
+        'name', 'lessons', 'processes', 'window', 'mappings',
+        'debounce', 'hysteresis', 'condition', 'active'
+    )
+
+    def __init__(self, name, lessons=None, processes=(), window=None, swap=None, slot=None, widget=None,
+                 remap=None, debounce=0, hysteresis=0):
+        self.name = name
+        self.lessons = frozenset(lessons) if lessons is not None else None
+        self.processes = tuple(p.lower() for p in processes)
+        self.window = window  # (开始分钟, 结束分钟)，结束小于开始时跨越午夜
+        self.debounce = debounce
+        self.hysteresis = hysteresis
+        self.condition = False  # 条件的当前结果（未经延迟）
+        self.active = False
+
+        if self.lessons is None and not self.processes and self.window is None:
+            raise ValueError(f'规则 {name} 至少需要一个条件')
+        if [swap is not None, slot is not None, remap is not None].count(True) != 1:
+            raise ValueError(f'规则 {name} 需要且只能指定 swap、slot 或 remap 其中一种动作')
+        if swap is not None:
+            if len(swap) != 2:
+                raise ValueError(f'规则 {name} 的 swap 必须为 [原始组件, 目标组件]')
+            remap = [(None, swap[0], swap[1])]
+        elif slot is not None:
+            remap = [(slot, None, widget)]
+        self.mappings = tuple(self._mapping(item) for item in remap)
+        if not self.mappings:
+            raise ValueError(f'规则 {name} 的 remap 不能为空')
+        if not (isinstance(debounce, (int, float)) and isinstance(hysteresis, (int, float))) \
+                or debounce < 0 or hysteresis < 0:
+            raise ValueError(f'规则 {name} 的 debounce/hysteresis 必须为非负秒数')
+
+    def _mapping(self, item):
+        if isinstance(item, dict):
+            item = (item.get('slot'), item.get('original'), item.get('widget'))
+        slot, original, replacement = item
+        if not replacement:
+            raise ValueError(f'规则 {self.name} 需要提供目标组件 widget')
+        if slot is None and not original:
+            raise ValueError(f'规则 {self.name} 的每项替换需要指定 slot 或 original')
+        if slot is not None and not isinstance(slot, int):
+            raise ValueError(f'规则 {self.name} 的 slot 必须为整数')
+        return slot, original, replacement
+
+    @classmethod
+    def from_dict(cls, data):
+        processes = data.get('process', ())
+        if isinstance(processes, str):
+            processes = (processes,)
+        window = data.get('time')
+        if window is not None:
+            window = (parse_minute(window[0]), parse_minute(window[1]))
+        return cls(
+            name=data['name'],
+            lessons=data.get('lessons'),
+            processes=processes,
+            window=window,
+            swap=data.get('swap'),
+            slot=data.get('slot'),
+            widget=data.get('widget'),
+            remap=data.get('remap'),
+            debounce=data.get('debounce', 0),
+            hysteresis=data.get('hysteresis', 0)
+        )
+
+    def inputs(self):
+        """规则依赖的输入信号"""
+        signals = [process_signal(p) for p in self.processes]
+        if self.lessons is not None:
+            signals.append(LESSON)
+        if self.window is not None:
+            signals.append(CLOCK)
+        return signals
+
+    def in_window(self, minute):
+        start, end = self.window
+        if start <= end:
+            return start <= minute < end
+        return minute >= start or minute < end
+
+    def evaluate(self, signals):
+        if self.lessons is not None and signals.get(LESSON) not in self.lessons:
+            return False
+        for name in self.processes:
+            if not signals.get(process_signal(name), False):
+                return False
+        if self.window is not None:
+            minute = signals.get(CLOCK)
+            if minute is None or not self.in_window(minute):
+                return False
+        return True
+
+
+class RuleEngine:
+    """编译后的规则集合
+
+    课程条件按课程名建立哈希索引，其它信号建立信号→规则的倒排索引，
+    每次只重新计算输入发生变化的规则。
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self._by_input = {}     # 信号 -> 依赖该信号的全部规则
+        self._by_lesson = {}    # 课程名 -> 规则
+        self._by_boundary = {}  # 时间窗口边界分钟 -> 规则
+        self._signals = {}
+        self._switches = {}  # 规则名 -> (延迟切换的到期时间, 规则)
+
+        names = set()
+        for rule in self.rules:
+            if rule.name in names:
+                raise ValueError(f'规则名称重复: {rule.name}')
+            names.add(rule.name)
+
+            for signal in rule.inputs():
+                self._by_input.setdefault(signal, []).append(rule)
+            if rule.lessons is not None:
+                for lesson in rule.lessons:
+                    self._by_lesson.setdefault(lesson, []).append(rule)
+            if rule.window is not None:
+                for minute in rule.window:
+                    self._by_boundary.setdefault(minute % MINUTES_PER_DAY, []).append(rule)
+
+    @classmethod
+    def from_dicts(cls, items):
+        return cls(Rule.from_dict(item) for item in items)
+
+    def processes(self):
+        """规则中引用的所有进程名"""
+        return sorted({name for rule in self.rules for name in rule.processes})
+
+    def lessons(self):
+        """规则中引用的所有课程名"""
+        return set(self._by_lesson)
+
+    def preset(self, names):
+        """设置初始状态：names 中的规则视为已生效"""
+        self._switches.clear()
+        for rule in self.rules:
+            rule.active = rule.condition = rule.name in names
+
+    def uses(self, signal):
+        """是否有规则依赖该信号"""
+        return signal in self._by_input
+
+    def next_switch(self):
+        """最早的延迟切换时间，没有时返回 None"""
+        if not self._switches:
+            return None
+        return min(due for due, _ in self._switches.values())
+
+    def evaluate(self, signals, now=0.0):
+        """更新输入信号，返回状态发生变化的规则列表（包括延迟到期的规则）"""
+        dirty = {}
+        for key, value in signals.items():
+            if key not in self._signals:
+                # 首次收到的信号：依赖它的规则全部计算一次
+                self._signals[key] = value
+                for rule in self._by_input.get(key, ()):
+                    dirty[rule.name] = rule
+                continue
+
+            old = self._signals[key]
+            if old == value:
+                continue
+            self._signals[key] = value
+
+            if key == LESSON:
+                # 只有包含旧课程或新课程的规则结果可能改变
+                for rule in self._by_lesson.get(old, ()):
+                    dirty[rule.name] = rule
+                for rule in self._by_lesson.get(value, ()):
+                    dirty[rule.name] = rule
+            elif key == CLOCK:
+                for rule in self._clock_candidates(old, value):
+                    dirty[rule.name] = rule
+            else:
+                for rule in self._by_input.get(key, ()):
+                    dirty[rule.name] = rule
+
+        changed = []
+        for rule in dirty.values():
+            condition = rule.evaluate(self._signals)
+            if condition == rule.condition:
+                continue
+            rule.condition = condition
+            if condition == rule.active:
+                # 延迟期间条件又恢复，取消切换
+                self._switches.pop(rule.name, None)
+                continue
+            delay = rule.debounce if condition else rule.hysteresis
+            if delay > 0:
+                self._switches[rule.name] = (now + delay, rule)
+            else:
+                rule.active = condition
+                changed.append(rule)
+
+        if self._switches:
+            for name, (due, rule) in list(self._switches.items()):
+                if due <= now:
+                    del self._switches[name]
+                    rule.active = rule.condition
+                    changed.append(rule)
+        return changed
+
+    def _clock_candidates(self, old, new):
+        # 连续的分钟只需检查恰好到达边界的规则，跳变时全部重算
+        if new == (old + 1) % MINUTES_PER_DAY:
+            return self._by_boundary.get(new, ())
+        return self._by_input.get(CLOCK, ())
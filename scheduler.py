@@ -0,0 +1,114 @@
+import heapq
+import itertools
+
+
+class Scheduler:
+    """截止时间调度器（最小堆）
+
+    各项检查登记自己的下一次到期时间，next_due 始终是最早的到期时间，
+    update() 只需比较一次 now < next_due 即可判断本 tick 是否有事要做。
+    同一 key 重新登记时旧的到期时间作废（惰性删除）。
+    """
+
+    def __init__(self):
+        self._heap = []  # (到期时间, 序号, key)
+        self._due = {}  # key -> 当前有效的到期时间
+        self._seq = itertools.count()
+        self._woken = False
+        self.next_due = 0.0
+        self.listener = None  # next_due 提前时调用（事件循环据此重新计时），可能在其它线程调用
+
+    def schedule(self, key, due):
+        """登记（或替换）key 的到期时间"""
+        self._due[key] = due
+        heapq.heappush(self._heap, (due, next(self._seq), key))
+        if due < self.next_due:
+            self.next_due = due
+            if self.listener is not None:
+                self.listener()
+
+    def cancel(self, key):
+        self._due.pop(key, None)
+
+    def scheduled(self, key):
+        return key in self._due
+
+    def wake(self):
+        """让下一个 tick 立即执行（可在其它线程调用）"""
+        self._woken = True
+        self.next_due = 0.0
+        if self.listener is not None:
+            self.listener()
+
+    def pop_due(self, now):
+        """取出所有已到期的 key，并更新 next_due"""
+        self._woken = False
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            when, _, key = heapq.heappop(heap)
+            if self._due.get(key) == when:
+                del self._due[key]
+                due.append(key)
+
+        # 丢弃堆顶已作废的条目
+        while heap and self._due.get(heap[0][2]) != heap[0][0]:
+            heapq.heappop(heap)
+        self.next_due = heap[0][0] if heap else float('inf')
+        if self._woken:  # 计算期间被其它线程唤醒
+            self.next_due = 0.0
+        return due
+
+
+class AdaptiveInterval:
+    """自适应轮询间隔：结果稳定时按 factor 逐步放宽，发生变化后收紧到最小间隔"""
+
+    def __init__(self, minimum, maximum, factor=1.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.current = minimum
+
+    def next(self, changed):
+        if changed:
+            self.current = self.minimum
+        else:
+            self.current = min(self.maximum, self.current * self.factor)
+        return self.current
+
+    def reset(self):
+        self.current = self.minimum
+
+
+class Backoff:
+    """失败重试间隔：指数增长并带随机抖动（避免多个实例同时重试），
+    连续失败超过 budget 次后固定为最大间隔，成功后恢复"""
+
+    def __init__(self, base, maximum, factor=2, jitter=0.5, budget=8):
+        self.base = base
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.budget = budget
+        self.failures = 0
+
+    @property
+    def exhausted(self):
+        return self.failures > self.budget
+
+    def delay(self):
+        """下一次重试前等待的秒数"""
+        if self.failures == 0:
+            return self.base
+        if self.exhausted:
+            return self.maximum
+        import random  # 只有出现失败时才需要
+        delay = min(self.maximum, self.base * self.factor ** self.failures)
+        return delay * (1 - self.jitter * random.random())
+
+    def fail(self):
+        self.failures += 1
+        return self.delay()
+
+    def reset(self):
+        self.failures = 0
@@ -0,0 +1,309 @@
+import json
+import mmap
+import os
+import stat
+import struct
+import time
+from pathlib import Path
+
+from .file_lock import lock, try_lock, unlock
+
+MAGIC = b'ECSD'
+VERSION = 1
+
+# 共享区布局：头部 | 检测结果 | 登记表
+_HEADER = struct.Struct('<4sIQIId')  # magic, version, seq, leader pid, 结果长度, 心跳时间
+_SEQ_OFFSET = 8
+_RESULT_OFFSET = 64
+_RESULT_SIZE = 16384
+_SLOT = struct.Struct('<QIId')  # seq, pid, 名称长度, 心跳时间
+_SLOT_SIZE = 512
+_SLOTS = 32
+_REGISTRY_OFFSET = _RESULT_OFFSET + _RESULT_SIZE
+_MAP_SIZE = _REGISTRY_OFFSET + _SLOT_SIZE * _SLOTS
+
+
+def default_directory():
+    """共享区所在目录：只属于当前用户的目录（Linux 优先使用 XDG_RUNTIME_DIR）"""
+    if os.name == 'nt':
+        import tempfile  # 只有启用共享检测时才导入
+        return Path(tempfile.gettempdir()) / 'EasiControl'  # Windows 的临时目录属于当前用户
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return Path(runtime_dir) / 'EasiControl'
+    import tempfile
+    return Path(tempfile.gettempdir()) / f'EasiControl-{os.getuid()}'
+
+
+def _private_directory(directory):
+    """创建目录并确认只有当前用户可以访问，否则抛出 PermissionError（避免其它用户伪造检测结果）"""
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if os.name == 'nt':
+        return
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f'共享目录不属于当前用户或其它用户可以访问: {directory}')
+
+
+def _begin_write(mm, offset):
+    """序号置为奇数表示正在写入；上一个写入者中途退出留下奇数时直接跳过"""
+    seq = struct.unpack_from('<Q', mm, offset)[0]
+    seq += 1 if seq % 2 == 0 else 2
+    struct.pack_into('<Q', mm, offset, seq)
+    return seq + 1
+
+
+class SharedProcessDetector:
+    """多个插件实例共享的进程检测
+
+    同一用户下的实例通过内存映射文件交换检测结果。持有 leader.lock 的实例（leader）
+    用本地 ProcessWatcher 检测所有实例登记的进程名，并把结果写入共享区；其它实例按序号校验
+    无锁读取结果。leader 退出后系统释放文件锁，下一个检测的实例接替；结果超过 max_age 秒未更新
+    （应略大于 leader 的最长检测间隔，超过说明 leader 卡住）或尚未包含本实例的进程名时，使用本地检测。
+    登记表中超过 2 * lease 秒未刷新的实例视为已退出。
+    """
+
+    def __init__(self, directory, watcher, max_age=15, lease=30):
+        self.directory = Path(directory)
+        _private_directory(self.directory)
+        self.watcher = watcher  # 本地检测器，作为 leader 或回退时使用
+        self.max_age = max_age
+        self.lease = lease
+        self._names = {}  # key -> 进程名（小写）
+        self._local = set()  # 本地检测器当前监视的进程名
+        self._leader = False
+        self._slot = None
+        self._registered = None
+        self._heartbeat = None  # 本实例最近一次写入登记的心跳时间，用于确认登记仍属于本实例
+        self._stats = {'shared_reads': 0, 'leader_polls': 0, 'fallback_polls': 0, 'takeovers': 0}
+
+        self._leader_file = open(self.directory / 'leader.lock', 'a+b')
+        self._registry_file = open(self.directory / 'registry.lock', 'a+b')
+        self._mm = self._open_map()
+
+    @property
+    def stats(self):
+        return dict(self.watcher.stats, **self._stats)
+
+    @property
+    def leader(self):
+        return self._leader
+
+    @property
+    def generation(self):
+        return self.watcher.generation
+
+    def exit_fds(self):
+        """本地检测器匹配的进程（作为 leader 或回退检测时）的退出通知，见 ProcessWatcher.exit_fds"""
+        return self.watcher.exit_fds()
+
+    def _open_map(self):
+        path = self.directory / 'detector.shm'
+        lock(self._registry_file)
+        try:
+            with open(path, 'ab'):
+                pass
+            f = open(path, 'r+b')
+            try:
+                if os.fstat(f.fileno()).st_size < _MAP_SIZE:
+                    f.truncate(_MAP_SIZE)
+                mm = mmap.mmap(f.fileno(), _MAP_SIZE)
+            finally:
+                f.close()
+            magic, version = _HEADER.unpack_from(mm, 0)[:2]
+            if magic != MAGIC or version != VERSION:
+                mm[:] = bytes(_MAP_SIZE)
+                _HEADER.pack_into(mm, 0, MAGIC, VERSION, 0, 0, 0, 0.0)
+            return mm
+        finally:
+            unlock(self._registry_file)
+
+    def watch(self, key, name=None, predicate=None):
+        """添加监视目标（共享检测只支持按进程名监视）"""
+        if name is None or predicate is not None:
+            raise ValueError('共享进程检测只支持按进程名监视')
+        self._names[key] = name.lower()
+
+    def unwatch(self, key):
+        self._names.pop(key, None)
+        if not self._names:
+            self._release()
+            self._unregister()  # 空闲时不再刷新心跳，清除登记，leader 不再检测本实例的进程名
+
+    def _release(self):
+        """不再需要检测时交出 leader 身份"""
+        if self._leader:
+            self._publish({}, 0.0)  # 作废已发布的结果，其它实例立即接替
+            unlock(self._leader_file)
+            self._leader = False
+
+    def poll(self):
+        """执行一次检测，返回 {key: 是否运行}"""
+        names = set(self._names.values())
+        if not names:
+            return {}
+        now = time.time()
+        self._register(names, now)
+
+        if not self._leader:
+            snapshot = self._read_results()
+            if snapshot is not None:
+                results, heartbeat = snapshot
+                if now - heartbeat < self.max_age and names <= results.keys():
+                    self._stats['shared_reads'] += 1
+                    return {key: results[name] for key, name in self._names.items()}
+            # 没有可用的共享结果：尝试接替 leader
+            self._leader = try_lock(self._leader_file)
+            if self._leader:
+                self._stats['takeovers'] += 1
+
+        if self._leader:
+            self._stats['leader_polls'] += 1
+            results = self._poll_local(names | self._registered_names(now))
+            self._publish(results, now)
+        else:
+            self._stats['fallback_polls'] += 1
+            results = self._poll_local(names)
+        return {key: results.get(name, False) for key, name in self._names.items()}
+
+    def _poll_local(self, names):
+        for name in self._local - names:
+            self.watcher.unwatch(name)
+        for name in names - self._local:
+            self.watcher.watch(name, name=name)
+        self._local = set(names)
+        return self.watcher.poll()
+
+    def _publish(self, results, now):
+        payload = json.dumps(results, separators=(',', ':')).encode('utf-8')
+        if len(payload) > _RESULT_SIZE:
+            return
+        mm = self._mm
+        done = _begin_write(mm, _SEQ_OFFSET)
+        mm[_RESULT_OFFSET:_RESULT_OFFSET + len(payload)] = payload
+        _HEADER.pack_into(mm, 0, MAGIC, VERSION, done - 1, os.getpid(), len(payload), now)
+        struct.pack_into('<Q', mm, _SEQ_OFFSET, done)
+
+    def _read_results(self, retries=8):
+        """按序号校验读取检测结果，返回 (结果, 心跳时间)，读取失败时返回 None"""
+        mm = self._mm
+        for _ in range(retries):
+            magic, version, seq, _, length, heartbeat = _HEADER.unpack_from(mm, 0)
+            if seq % 2 or seq == 0 or length > _RESULT_SIZE:
+                if seq % 2:
+                    continue
+                return None
+            payload = mm[_RESULT_OFFSET:_RESULT_OFFSET + length]
+            if struct.unpack_from('<Q', mm, _SEQ_OFFSET)[0] != seq:
+                continue
+            try:
+                return json.loads(payload), heartbeat
+            except ValueError:
+                return None
+        return None
+
+    def _slot_offset(self, index):
+        return _REGISTRY_OFFSET + index * _SLOT_SIZE
+
+    def _write_slot(self, index, pid, names, now):
+        offset = self._slot_offset(index)
+        data = json.dumps(sorted(names), separators=(',', ':')).encode('utf-8') if names is not None else b''
+        done = _begin_write(self._mm, offset)
+        start = offset + _SLOT.size
+        self._mm[start:start + len(data)] = data
+        _SLOT.pack_into(self._mm, offset, done - 1, pid, len(data), now)
+        struct.pack_into('<Q', self._mm, offset, done)
+
+    def _owns_slot(self):
+        """登记是否仍是本实例写入的（同一进程中可能有多个实例，同时比较心跳时间）"""
+        _, pid, _, heartbeat = _SLOT.unpack_from(self._mm, self._slot_offset(self._slot))
+        return pid == os.getpid() and heartbeat == self._heartbeat
+
+    def _register(self, names, now):
+        """在登记表中写入本实例需要的进程名，并刷新心跳"""
+        names = tuple(sorted(names))
+        if len(json.dumps(names)) > _SLOT_SIZE - _SLOT.size:
+            return  # 名称过多，只能使用本地检测
+
+        if self._slot is not None and now - self._heartbeat > self.lease:
+            # 长时间未刷新（超过 2 * lease 后其它实例可以回收登记）：在登记表锁内确认仍属于本实例再写入
+            lock(self._registry_file)
+            try:
+                if self._owns_slot():
+                    self._write_slot(self._slot, os.getpid(), names, now)
+                    self._registered = names
+                    self._heartbeat = now
+                    return
+            finally:
+                unlock(self._registry_file)
+            self._slot = None  # 已被回收，重新登记
+
+        if self._slot is None:
+            lock(self._registry_file)
+            try:
+                for index in range(_SLOTS):
+                    _, pid, _, heartbeat = _SLOT.unpack_from(self._mm, self._slot_offset(index))
+                    if pid == 0 or now - heartbeat > self.lease * 2:
+                        self._write_slot(index, os.getpid(), names, now)
+                        self._slot = index
+                        self._registered = names
+                        self._heartbeat = now
+                        return
+            finally:
+                unlock(self._registry_file)
+            return
+
+        if names != self._registered:
+            self._write_slot(self._slot, os.getpid(), names, now)
+            self._registered = names
+        else:
+            # 只刷新心跳
+            offset = self._slot_offset(self._slot)
+            done = _begin_write(self._mm, offset)
+            struct.pack_into('<d', self._mm, offset + 16, now)
+            struct.pack_into('<Q', self._mm, offset, done)
+        self._heartbeat = now
+
+    def _unregister(self):
+        """清除本实例的登记；登记已被其它实例回收时不修改"""
+        if self._slot is None:
+            return
+        lock(self._registry_file)
+        try:
+            if self._owns_slot():
+                self._write_slot(self._slot, 0, None, 0.0)
+        finally:
+            unlock(self._registry_file)
+        self._slot = None
+        self._registered = None
+
+    def _registered_names(self, now):
+        """其它实例登记的进程名（跳过心跳过期的登记）"""
+        names = set()
+        for index in range(_SLOTS):
+            if index == self._slot:
+                continue
+            offset = self._slot_offset(index)
+            seq, pid, length, heartbeat = _SLOT.unpack_from(self._mm, offset)
+            if pid == 0 or seq % 2 or now - heartbeat > self.lease * 2:
+                continue
+            start = offset + _SLOT.size
+            data = self._mm[start:start + length]
+            if struct.unpack_from('<Q', self._mm, offset)[0] != seq:
+                continue  # 正在更新，下次再读
+            try:
+                names.update(json.loads(data))
+            except ValueError:
+                continue
+        return names
+
+    def close(self):
+        if self._mm is None:
+            return
+        self._unregister()
+        self._release()
+        self._mm.close()
+        self._mm = None
+        self._leader_file.close()
+        self._registry_file.close()
+        self.watcher.close()
@@ -0,0 +1,13 @@
+class PluginState:
+    """插件运行状态（固定字段）"""
+    __slots__ = ('applied', 'process_running', 'current_lesson', 'dirty')
+
+    def __init__(self):
+        self.applied = {}  # 已生效的规则名 -> 备份信息（{'slots': [[位置, 原始组件, 目标组件], ...]}）
+        self.process_running = {}  # 进程名 -> 是否运行
+        self.current_lesson = None
+        self.dirty = False  # 本 tick 内状态是否需要保存
+
+    def __repr__(self):
+        return (f'PluginState(applied={self.applied!r}, process_running={self.process_running!r}, '
+                f'current_lesson={self.current_lesson!r})')
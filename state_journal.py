@@ -0,0 +1,175 @@
+import json
+import os
+from pathlib import Path
+
+# 持久化级别
+DURABILITY_NONE = 'none'    # 只写入进程缓冲区
+DURABILITY_FLUSH = 'flush'  # 每次提交 flush 到操作系统
+DURABILITY_FSYNC = 'fsync'  # 每次提交 fsync 到磁盘（同一次提交的多条记录只 fsync 一次）
+
+_MISSING = object()
+
+
+class StateJournal:
+    """追加写入的状态日志
+
+    每行一条 JSON 记录：["set", 键, 值] / ["del", 键] / ["snap", 全量状态]。
+    启动时重放日志得到当前状态，末尾不完整的记录（写入中途崩溃）会被截断。
+    记录数超过 compact_every 时写入一条快照替换整个日志。
+    """
+
+    def __init__(self, path, durability=DURABILITY_FLUSH, compact_every=256):
+        if durability not in (DURABILITY_NONE, DURABILITY_FLUSH, DURABILITY_FSYNC):
+            raise ValueError(f'未知的持久化级别: {durability}')
+        self.path = Path(path)
+        self.durability = durability
+        self.compact_every = compact_every
+        self.data = {}
+        self._buffer = []
+        self._undo = []  # 未提交记录对应的旧值，用于 discard()
+        self._records = 0  # 最近一次快照之后的记录数
+        self._file = None
+        # 复用编码器和输出缓冲区，避免每次提交重新创建
+        self._encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        self._out = bytearray()
+        self.stats = {'commits': 0, 'records': 0, 'syncs': 0, 'compactions': 0}
+
+    def exists(self):
+        return self.path.exists()
+
+    def load(self):
+        """重放日志，返回 (当前状态, 被丢弃的损坏记录数)"""
+        self.close()
+        self.data = {}
+        self._records = 0
+        if not self.path.exists():
+            return self.data, 0
+
+        valid_size = 0
+        dropped = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('不完整的记录')
+                    self._replay(json.loads(line))
+                except (ValueError, TypeError, IndexError):
+                    # 之后的记录无法保证顺序正确，全部丢弃
+                    dropped = 1 + sum(1 for _ in f)
+                    break
+                valid_size += len(line)
+                self._records += 1
+
+        if dropped:
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_size)
+        return self.data, dropped
+
+    def _replay(self, record):
+        op = record[0]
+        if op == 'set':
+            self.data[record[1]] = record[2]
+        elif op == 'del':
+            self.data.pop(record[1], None)
+        elif op == 'snap':
+            self.data = dict(record[1])
+        else:
+            raise ValueError(f'未知的记录类型: {op}')
+
+    def set(self, key, value):
+        """暂存一条写入记录，commit() 时写入日志"""
+        self._undo.append((key, self.data.get(key, _MISSING)))
+        self.data[key] = value
+        self._buffer.append(['set', key, value])
+
+    def delete(self, key):
+        """暂存一条删除记录"""
+        if key in self.data:
+            self._undo.append((key, self.data.pop(key)))
+            self._buffer.append(['del', key])
+
+    def discard(self):
+        """丢弃未提交的记录，内存状态恢复到最近一次提交"""
+        for key, old in reversed(self._undo):
+            if old is _MISSING:
+                self.data.pop(key, None)
+            else:
+                self.data[key] = old
+        self._buffer.clear()
+        self._undo.clear()
+
+    def commit(self):
+        """将暂存的记录一次性追加到日志"""
+        if not self._buffer:
+            return False
+
+        if self._records + len(self._buffer) >= self.compact_every:
+            self.compact()
+            return True
+
+        payload = self._encode(self._buffer)
+        f = self._open()
+        start = f.tell()
+        try:
+            f.write(payload)
+            self._sync(f)
+        except Exception:
+            # 截掉写了一半的记录，避免之后追加的记录在重放时被丢弃
+            self.close()
+            with open(self.path, 'r+b') as g:
+                g.truncate(start)
+            raise
+
+        self._records += len(self._buffer)
+        self.stats['records'] += len(self._buffer)
+        self.stats['commits'] += 1
+        self._buffer.clear()
+        self._undo.clear()
+        return True
+
+    def compact(self):
+        """用一条快照记录原子替换整个日志"""
+        self.close()
+        temp_file = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_file, 'wb') as f:
+            f.write(self._encode([['snap', self.data]]))
+            self._sync(f)
+        os.replace(temp_file, self.path)
+        self._buffer.clear()
+        self._undo.clear()
+        self._records = 1
+        self.stats['compactions'] += 1
+
+    def _encode(self, records):
+        """将记录编码到共享缓冲区（每条一行）并返回该缓冲区"""
+        out = self._out
+        out.clear()
+        for record in records:
+            out += self._encoder.encode(record).encode('utf-8')
+            out += b'\n'
+        return out
+
+    def reset(self):
+        """清空全部状态"""
+        self._buffer.clear()
+        self._undo.clear()
+        self.data = {}
+        self.compact()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        return self._file
+
+    def _sync(self, f):
+        if self.durability == DURABILITY_NONE:
+            return
+        f.flush()
+        if self.durability == DURABILITY_FSYNC:
+            os.fsync(f.fileno())
+            self.stats['syncs'] += 1
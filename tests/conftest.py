@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 插件模块使用包内相对导入，测试与基准一样通过 benchmarks.load_plugin_module 加载
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,195 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from benchmarks import load_plugin_module
+
+event_loop = load_plugin_module('event_loop')
+scheduler_module = load_plugin_module('scheduler')
+
+
+class ExitSource:
+    """模拟 ProcessWatcher.exit_fds()：持有被监视进程的 pidfd"""
+
+    def __init__(self, fds=()):
+        self.fds = list(fds)
+        self.generation = 0
+
+    def exit_fds(self):
+        return self.generation, [os.dup(fd) for fd in self.fds]
+
+
+def test_asyncio_driver_ticks_and_wakes():
+    scheduler = scheduler_module.Scheduler()
+    ticks = []
+    ticked = threading.Event()
+
+    def tick(now):
+        ticks.append(scheduler.pop_due(now))
+        ticked.set()
+
+    scheduler.schedule('a', time.time() + 60)
+    driver = event_loop.create_driver('thread', scheduler, tick)
+    driver.start()
+    try:
+        assert ticked.wait(2)  # 启动后先执行一次
+        time.sleep(0.05)
+        assert ticks == [[]]
+        ticked.clear()
+        scheduler.schedule('b', 0)  # next_due 提前，唤醒循环
+        assert ticked.wait(2)
+        assert ticks[1] == ['b']
+    finally:
+        driver.stop()
+
+
+@pytest.mark.skipif(not hasattr(os, 'pidfd_open'), reason='需要 pidfd')
+def test_asyncio_driver_wakes_on_process_exit():
+    child = subprocess.Popen([sys.executable, '-c', 'import sys; sys.stdin.read()'], stdin=subprocess.PIPE)
+    pidfd = os.pidfd_open(child.pid)
+    source = ExitSource([pidfd])
+    exited = threading.Event()
+    scheduler = scheduler_module.Scheduler()
+    driver = event_loop.AsyncioDriver(scheduler, scheduler.pop_due)
+    driver.watch_exits(source, exited.set)
+    driver.start()
+    try:
+        time.sleep(0.05)
+        assert not exited.is_set()
+        child.stdin.close()
+        child.wait()
+        assert exited.wait(2)
+    finally:
+        driver.stop()
+        os.close(pidfd)
+
+
+class _Signal:
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot, *args):
+        self.slots.append(slot)
+
+    def emit(self, *args):
+        for slot in self.slots:
+            slot(*args)
+
+
+class _SignalDescriptor:
+    def __set_name__(self, owner, name):
+        self.name = '_signal_' + name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        if not hasattr(obj, self.name):
+            setattr(obj, self.name, _Signal())
+        return getattr(obj, self.name)
+
+
+class _QTimer:
+    def __init__(self):
+        self.timeout = _Signal()
+        self.interval = None
+
+    def setSingleShot(self, single):
+        pass
+
+    def start(self, interval):
+        self.interval = interval
+
+    def stop(self):
+        self.interval = None
+
+
+class _QSocketNotifier:
+    Read = 0
+    instances = []
+
+    def __init__(self, fd, kind):
+        self.fd = fd
+        self.enabled = True
+        self.activated = _Signal()
+        _QSocketNotifier.instances.append(self)
+
+    def setEnabled(self, enabled):
+        self.enabled = enabled
+
+    def deleteLater(self):
+        pass
+
+
+@pytest.fixture
+def stub_qt(monkeypatch):
+    """不依赖 PyQt5：用同步调用的信号、手动触发的计时器替代"""
+    qtcore = types.ModuleType('PyQt5.QtCore')
+    qtcore.QObject = object
+    qtcore.QTimer = _QTimer
+    qtcore.Qt = types.SimpleNamespace(QueuedConnection=None)
+    qtcore.pyqtSignal = _SignalDescriptor
+    qtcore.QSocketNotifier = _QSocketNotifier
+    pyqt = types.ModuleType('PyQt5')
+    pyqt.QtCore = qtcore
+    monkeypatch.setitem(sys.modules, 'PyQt5', pyqt)
+    monkeypatch.setitem(sys.modules, 'PyQt5.QtCore', qtcore)
+    _QSocketNotifier.instances = []
+
+
+def test_qt_driver_timer_and_wake(stub_qt):
+    scheduler = scheduler_module.Scheduler()
+    ticks = []
+    driver = event_loop.create_driver('qt', scheduler, lambda now: ticks.append(scheduler.pop_due(now)))
+    scheduler.schedule('a', time.time() + 2)
+    driver.start()
+    assert ticks == [[]]  # 启动后先执行一次
+    assert 1000 < driver._timer.interval <= 2000
+
+    scheduler.schedule('b', 0)  # 唤醒信号立即执行 tick
+    assert ticks[1:] == [['b']]
+    assert driver._timer.interval > 1000
+
+    ticks.clear()
+    driver._timer.timeout.emit()  # 未到期时只重新计时
+    assert ticks == []
+    scheduler.schedule('a', 0)
+    driver._timer.timeout.emit()
+    assert ticks == [['a']]
+    assert driver._timer.interval == event_loop.MAX_SLEEP * 1000
+
+    driver.stop()
+    assert scheduler.listener is None
+    scheduler.schedule('c', 0)
+    assert ticks == [['a']]
+
+
+def test_qt_driver_process_exit_notifiers(stub_qt):
+    read_fd, write_fd = os.pipe()
+    source = ExitSource([read_fd])
+    exits = []
+    scheduler = scheduler_module.Scheduler()
+    driver = event_loop.QtDriver(scheduler, scheduler.pop_due)
+    driver.watch_exits(source, lambda: exits.append(True))
+    driver.start()
+    try:
+        [notifier] = _QSocketNotifier.instances
+        notifier.activated.emit(notifier.fd)
+        assert exits == [True]
+        assert not notifier.enabled and driver._notifiers == {}
+
+        # generation 未变化时不重新登记，变化后登记新的副本
+        driver._run()
+        assert len(_QSocketNotifier.instances) == 1
+        source.generation += 1
+        driver._run()
+        assert len(_QSocketNotifier.instances) == 2
+    finally:
+        driver.stop()
+        os.close(read_fd)
+        os.close(write_fd)
+    assert driver._notifiers == {}
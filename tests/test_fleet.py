@@ -0,0 +1,83 @@
+import multiprocessing
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from benchmarks import load_plugin_module
+from benchmarks.bench_fleet import make_rules, make_schedule
+
+pytest.importorskip('numpy')
+
+fleet = load_plugin_module('fleet')
+layout = load_plugin_module('layout')
+rules_module = load_plugin_module('rules')
+timetable = load_plugin_module('timetable')
+
+START = date(2025, 5, 4)  # 周日，之后两天为周一、周二
+DAYS = 3
+PROCESSES = ('lx-music-desktop.exe',)
+WIDGETS = ['weather.ui', 'clock.ui', 'countdown-day.ui', 'schedule.ui', 'lyrics-slot.ui']
+
+
+class ListStore:
+    def __init__(self, widgets):
+        self._widgets = list(widgets)
+
+    def widgets(self):
+        return self._widgets
+
+    def positions(self, name):
+        return [i for i, widget in enumerate(self._widgets) if widget == name]
+
+
+def make_rooms(count, seed=3):
+    rng = random.Random(seed)
+    schedules = [make_schedule(rng) for _ in range(3)]
+    even = make_schedule(rng)
+    even['schedule_even'] = {'0': ['自习'] * 8, '1': ['自习'] * 8}  # 双周周一、周二全天自习
+    rooms = [fleet.Room(f'room-{i}', rng.choice(schedules), WIDGETS, make_rules(rng)) for i in range(count)]
+    rooms.append(fleet.Room('even-week', even, WIDGETS, make_rules(rng), start_date='2025-04-28'))
+    return rooms
+
+
+def reference(room, day, minute):
+    """逐分钟按 Rule.evaluate 计算生效的规则，并按规则顺序修改组件"""
+    lesson = None
+    for start, name in timetable.day_segments(room.schedule, day, room.start_date):
+        if start // 60 <= minute:
+            lesson = name
+    signals = {rules_module.LESSON: lesson, rules_module.CLOCK: minute}
+    signals.update((rules_module.process_signal(name), True) for name in PROCESSES)
+    store = ListStore(room.widgets)
+    for rule in rules_module.RuleEngine.from_dicts(room.rules).rules:
+        if rule.evaluate(signals):
+            changes, _ = layout.plan(store, rule.mappings)
+            for index, _, replacement in changes:
+                store.widgets()[index] = replacement
+    return tuple(store.widgets())
+
+
+def test_matches_per_minute_reference():
+    rooms = make_rooms(4)
+    timeline = fleet.evaluate(rooms, START, days=DAYS, processes=PROCESSES)
+    assert timeline.rooms == [room.name for room in rooms]
+    for r, room in enumerate(rooms):
+        for d in range(DAYS):
+            day = START + timedelta(days=d)
+            for minute in range(0, fleet.MINUTES_PER_DAY, 5):
+                assert timeline.layout_at(r, d, minute) == reference(room, day, minute), (room.name, day, minute)
+
+
+def test_workers_produce_identical_results():
+    rooms = make_rooms(5)
+    single = fleet.evaluate(rooms, START, days=DAYS, processes=PROCESSES)
+    # spawn：子进程不继承父进程注册的插件包（Windows 和 macOS 的默认方式）
+    sharded = fleet.evaluate(
+        rooms, START, days=DAYS, processes=PROCESSES, workers=2, mp_context=multiprocessing.get_context('spawn')
+    )
+    assert sharded.rooms == single.rooms
+    assert len(sharded) == len(single)
+    for a, b in zip(single.runs.tolist(), sharded.runs.tolist()):
+        assert a[:3] == b[:3]
+        assert single.layouts[a[3]] == sharded.layouts[b[3]]
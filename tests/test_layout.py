@@ -0,0 +1,85 @@
+from benchmarks import load_plugin_module
+
+layout = load_plugin_module('layout')
+
+
+class ListStore:
+    """layout 使用的内存组件列表"""
+
+    def __init__(self, widgets):
+        self._widgets = list(widgets)
+
+    def widgets(self):
+        return self._widgets
+
+    def positions(self, name):
+        return [i for i, widget in enumerate(self._widgets) if widget == name]
+
+    def apply(self, changes):
+        for index, name in changes:
+            self._widgets[index] = name
+
+
+def test_plan_slot_and_name():
+    store = ListStore(['a.ui', 'b.ui', 'c.ui'])
+    changes, skipped = layout.plan(store, [(-1, None, 'z.ui'), (None, 'a.ui', 'y.ui'), (None, 'x.ui', 'w.ui')])
+    assert changes == [(2, 'c.ui', 'z.ui'), (0, 'a.ui', 'y.ui')]
+    assert skipped == [('目标组件不存在', 'x.ui')]
+
+
+def test_stacks_follow_replacements_from_top():
+    widgets = ['a.ui', 'b.ui', 'quiet.ui']
+    applied = {
+        'music': {'slots': [[2, 'lyrics.ui', 'music.ui']]},
+        'study': {'slots': [[2, 'music.ui', 'quiet.ui']]},
+        'lesson': {'index': None, 'original': 'x.ui', 'replacement': 'y.ui'},  # 旧版格式不参与叠加
+        'idle': None
+    }
+    stacks = layout.stacks(applied, widgets)
+    assert stacks == {2: [('study', 'music.ui', 'quiet.ui'), ('music', 'lyrics.ui', 'music.ui')]}
+
+    rank = {'music': 0, 'study': 1, 'evening': 2}
+    assert layout.covering(stacks, rank, 0) == {2: ('study', 'music.ui', 'quiet.ui')}
+    assert layout.covering(stacks, rank, 2) == {}
+    # 顺序在 music 之前的规则位于两层之下
+    assert layout.covering(stacks, {'music': 1, 'study': 2, 'early': 0}, 0) == {2: ('music', 'lyrics.ui', 'music.ui')}
+
+
+def test_plan_below_covering_rule():
+    store = ListStore(['a.ui', 'b.ui', 'quiet.ui'])
+    below = {2: 'lyrics.ui'}
+    changes, skipped = layout.plan(store, [(-1, 'lyrics.ui', 'music.ui')], below)
+    assert changes == [(2, 'lyrics.ui', 'music.ui')] and skipped == []
+
+    # 按名称查找时被覆盖的位置按下层组件计算
+    changes, skipped = layout.plan(store, [(None, 'quiet.ui', 'x.ui'), (None, 'lyrics.ui', 'y.ui')], below)
+    assert changes == [(2, 'lyrics.ui', 'y.ui')]
+    assert skipped == [('目标组件不存在', 'quiet.ui')]
+
+
+def test_hand_off_and_revert_overlapping_slots():
+    store = ListStore(['a.ui', 'quiet.ui'])
+    applied = {
+        'music': {'slots': [[1, 'lyrics.ui', 'music.ui']]},
+        'study': {'slots': [[1, 'music.ui', 'quiet.ui']]}
+    }
+
+    # 下层的 music 恢复：不写入，原始组件交给 study
+    slots, handoffs = layout.hand_off(layout.stacks(applied, store.widgets()), 'music', [(1, 'lyrics.ui', 'music.ui')])
+    assert slots == [] and handoffs == [('study', 1, 'quiet.ui', 'lyrics.ui')]
+    applied['study'] = layout.rebase(applied['study'], 1, 'quiet.ui', 'lyrics.ui')
+    del applied['music']
+    assert applied['study'] == {'slots': [[1, 'lyrics.ui', 'quiet.ui']]}
+
+    # 上层的 study 恢复时写回最初的组件
+    slots, handoffs = layout.hand_off(layout.stacks(applied, store.widgets()), 'study', [(1, 'lyrics.ui', 'quiet.ui')])
+    assert handoffs == []
+    changes, missing = layout.plan_revert(store, slots)
+    assert changes == [(1, 'lyrics.ui')] and missing == []
+
+
+def test_plan_revert_falls_back_to_name():
+    store = ListStore(['b.ui', 'y.ui', 'c.ui'])
+    changes, missing = layout.plan_revert(store, [(0, 'a.ui', 'y.ui'), (2, 'd.ui', 'gone.ui')])
+    assert changes == [(1, 'a.ui')]
+    assert missing == ['gone.ui']
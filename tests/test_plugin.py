@@ -0,0 +1,93 @@
+import json
+import os
+import time
+
+import pytest
+
+from benchmarks import load_plugin_module
+from benchmarks.host_sim import TARGET, HostSimulator
+
+file_lock = load_plugin_module('file_lock')
+
+RULES = [
+    {'name': 'music', 'process': TARGET, 'slot': -1, 'widget': 'lx-music-lyrics.ui'},
+    {'name': 'study', 'lessons': ['自习'], 'slot': -1, 'widget': 'quiet.ui'}
+]
+
+
+def write_rules(rules):
+    def setup(sim):
+        sim.main.TIMETABLE = False
+        config_dir = os.path.join(sim.plugin_dir, 'config')
+        os.makedirs(config_dir, exist_ok=True)
+        with open(os.path.join(config_dir, 'rules.json'), 'w', encoding='utf-8') as f:
+            json.dump({'rules': rules}, f)
+    return setup
+
+
+@pytest.fixture
+def sim(tmp_path):
+    sim = HostSimulator(str(tmp_path), process_count=20, background=False, setup=write_rules(RULES))
+    yield sim
+    sim.close()
+
+
+def run(sim, lesson, seconds=20):
+    for _ in range(int(seconds * 2)):
+        sim.tick(lesson, 0.5)
+
+
+def last_widget(sim):
+    with open(os.path.join(sim.base_dir, 'config', 'widget.json'), encoding='utf-8') as f:
+        return json.load(f)['widgets'][-1]
+
+
+@pytest.mark.parametrize('order', [('music', 'study'), ('study', 'music')])
+@pytest.mark.parametrize('revert', [('music', 'study'), ('study', 'music')])
+def test_overlapping_slot_restores_original(sim, order, revert):
+    state = {'music': False, 'study': False}
+
+    def switch(name, on):
+        state[name] = on
+        sim.set_process(state['music'])
+        run(sim, '自习' if state['study'] else '数学')
+
+    run(sim, '数学')
+    assert last_widget(sim) == 'lyrics-slot.ui'
+    for name in order:
+        switch(name, True)
+    # 按规则顺序叠加：study 在上层，与生效先后无关
+    assert last_widget(sim) == 'quiet.ui'
+    assert sorted(sim.plugin.state.applied) == ['music', 'study']
+
+    switch(revert[0], False)
+    assert last_widget(sim) == ('quiet.ui' if revert[0] == 'music' else 'lx-music-lyrics.ui')
+    switch(revert[1], False)
+    assert last_widget(sim) == 'lyrics-slot.ui'
+    assert sim.plugin.state.applied == {}
+
+
+def test_update_does_not_wait_for_background_write(tmp_path):
+    sim = HostSimulator(str(tmp_path), process_count=20, background=True, setup=write_rules(RULES))
+    try:
+        run(sim, '数学', 5)
+        # 其它程序持有 widget.json 的锁：后台写入等待直到超时
+        with file_lock.FileLock(os.path.join(sim.base_dir, 'config', 'widget.json.lock')):
+            slowest = 0
+            deadline = time.monotonic() + 2.5
+            while time.monotonic() < deadline:
+                if not sim.plugin.worker.idle() and sim.plugin._rules_reload is None:
+                    sim.plugin._rules_reload = {'rules': RULES}  # 写入期间重新加载规则
+                slowest = max(slowest, sim.tick('自习', 0.5))
+                time.sleep(0.01)
+        assert slowest < 0.2
+        assert sim.plugin.widget_store.lock.stats['timeouts'] >= 1
+
+        deadline = time.monotonic() + 5
+        while 'study' not in sim.plugin.state.applied and time.monotonic() < deadline:
+            sim.tick('自习', 0.5)
+            time.sleep(0.01)
+        assert last_widget(sim) == 'quiet.ui'
+        assert sorted(sim.plugin.state.applied) == ['study']
+    finally:
+        sim.close()
@@ -0,0 +1,64 @@
+import json
+import logging
+import os
+
+from benchmarks import load_plugin_module
+
+base = load_plugin_module('ClassWidgets.base')
+
+
+def write(path, data):
+    # 写入后修改时间后移，避免文件系统时间精度导致的状态相同
+    path.write_text(data if isinstance(data, str) else json.dumps(data), encoding='utf-8')
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+
+def make_config(tmp_path, data, **options):
+    write(tmp_path / 'rules.json', data)
+    config = base.PluginConfig(str(tmp_path), 'rules.json', **options)
+    config.load_config({})
+    return config
+
+
+def test_reload_notifies_subscribers(tmp_path):
+    config = make_config(tmp_path, {'rules': []})
+    received = []
+    config._callbacks.append(received.append)  # 不启动监视线程，直接调用 update_config
+    assert not config.update_config()
+
+    write(tmp_path / 'rules.json', {'rules': [1]})
+    assert config.update_config()
+    assert config['rules'] == [1]
+    assert received == [{'rules': [1]}]
+
+
+def test_reload_keeps_deferred_edits(tmp_path):
+    config = make_config(tmp_path, {'a': 1, 'b': 1}, flush_delay=60)
+    config['a'] = 2
+    assert config.dirty
+
+    write(tmp_path / 'rules.json', {'a': 1, 'b': 5, 'c': 3})
+    assert config.update_config()
+    assert config.config == {'a': 2, 'b': 5, 'c': 3}
+
+    config.flush()
+    assert json.loads((tmp_path / 'rules.json').read_text(encoding='utf-8')) == {'a': 2, 'b': 5, 'c': 3}
+
+
+def test_broken_file_keeps_last_good_config(tmp_path, caplog):
+    config = make_config(tmp_path, {'rules': [1]})
+    received = []
+    config._callbacks.append(received.append)
+
+    write(tmp_path / 'rules.json', '{"rules": [')
+    with caplog.at_level(logging.ERROR):
+        assert not config.update_config()
+        assert not config.update_config()  # 文件未再变化，不重复报告
+    assert config['rules'] == [1]
+    assert received == []
+    assert len([r for r in caplog.records if r.levelno == logging.ERROR]) == 1
+
+    write(tmp_path / 'rules.json', {'rules': [2]})
+    assert config.update_config()
+    assert received == [{'rules': [2]}]
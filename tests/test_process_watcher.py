@@ -0,0 +1,65 @@
+from benchmarks import load_plugin_module
+from benchmarks.host_sim import TARGET, FakeProcessTable
+
+process_watcher = load_plugin_module('process_watcher')
+
+
+def make_watcher(table):
+    watcher = process_watcher.ProcessWatcher(backend=table)
+    watcher.watch(TARGET, name=TARGET)
+    return watcher
+
+
+def test_detects_start_and_exit():
+    table = FakeProcessTable(20)
+    watcher = make_watcher(table)
+    assert watcher.poll() == {TARGET: False}
+
+    table.spawn(TARGET)
+    assert watcher.poll() == {TARGET: True}
+
+    table.kill(TARGET)
+    assert watcher.poll() == {TARGET: False}
+
+
+def test_known_processes_are_not_reread():
+    table = FakeProcessTable(50)
+    watcher = make_watcher(table)
+    watcher.poll()
+
+    table.name_reads = 0
+    table.churn(3)
+    watcher.poll()
+    assert table.name_reads == 3
+
+
+def test_reused_pid_is_rechecked():
+    table = FakeProcessTable(20)
+    watcher = make_watcher(table)
+    watcher.poll()
+
+    # 两次检测之间一个普通进程退出，系统把它的 PID 分配给了目标进程
+    pid = next(iter(table.table))
+    table.kill(table.table[pid])
+    table.spawn(TARGET, pid=pid)
+    assert watcher.poll() == {TARGET: True}
+
+
+def test_reused_pid_of_matched_process():
+    table = FakeProcessTable(20)
+    watcher = make_watcher(table)
+    pid = table.spawn(TARGET)
+    assert watcher.poll() == {TARGET: True}
+
+    table.kill(TARGET)
+    table.spawn('other.exe', pid=pid)
+    assert watcher.poll() == {TARGET: False}
+
+
+def test_multiple_targets_in_one_scan():
+    table = FakeProcessTable(20)
+    watcher = make_watcher(table)
+    watcher.watch('player', predicate=lambda name, proc: name.startswith('player'))
+    table.spawn('player-2.exe')
+    table.spawn(TARGET)
+    assert watcher.poll() == {TARGET: True, 'player': True}
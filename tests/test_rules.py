@@ -0,0 +1,129 @@
+import random
+
+import pytest
+
+from benchmarks import load_plugin_module
+
+rules = load_plugin_module('rules')
+LESSON, CLOCK, process_signal = rules.LESSON, rules.CLOCK, rules.process_signal
+
+LESSONS = ['语文', '数学', '自习', '课间', '暂无课程']
+PROCESSES = ['a.exe', 'b.exe']
+RULES = [
+    {'name': 'self-study', 'lessons': ['自习'], 'swap': ['weather.ui', 'countdown.ui']},
+    {'name': 'break', 'lessons': ['课间', '暂无课程'], 'slot': 0, 'widget': 'tips.ui'},
+    {'name': 'music', 'process': 'A.exe', 'slot': -1, 'widget': 'lyrics.ui'},
+    {'name': 'both', 'process': ['a.exe', 'b.exe'], 'lessons': ['数学'], 'slot': 1, 'widget': 'x.ui'},
+    {'name': 'morning', 'time': ['07:30', '08:00'], 'slot': 2, 'widget': 'morning.ui'},
+    {'name': 'night', 'time': ['23:58', '00:02'], 'slot': 3, 'widget': 'night.ui'},
+    {'name': 'noon-music', 'time': ['12:00', '12:01'], 'process': 'b.exe', 'slot': 4, 'widget': 'noon.ui'}
+]
+
+
+def full_evaluation(items, signals):
+    """不使用索引，逐条计算全部规则"""
+    return {rule.name for rule in rules.RuleEngine.from_dicts(items).rules if rule.evaluate(signals)}
+
+
+def active(engine):
+    return {rule.name for rule in engine.rules if rule.active}
+
+
+def random_signals(rng, minute):
+    signals = {LESSON: rng.choice(LESSONS), CLOCK: minute}
+    for name in PROCESSES:
+        signals[process_signal(name)] = rng.random() < 0.5
+    return signals
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_matches_full_evaluation(seed):
+    rng = random.Random(seed)
+    engine = rules.RuleEngine.from_dicts(RULES)
+    signals = random_signals(rng, rng.randrange(rules.MINUTES_PER_DAY))
+    for step in range(3000):
+        if rng.random() < 0.9:
+            # 大多数 tick 时间前进一分钟（包括跨越午夜和窗口边界），偶尔跳变
+            signals[CLOCK] = (signals[CLOCK] + 1) % rules.MINUTES_PER_DAY
+        else:
+            signals[CLOCK] = rng.randrange(rules.MINUTES_PER_DAY)
+        if rng.random() < 0.2:
+            signals[LESSON] = rng.choice(LESSONS)
+        if rng.random() < 0.1:
+            key = process_signal(rng.choice(PROCESSES))
+            signals[key] = not signals[key]
+
+        engine.evaluate(dict(signals), step)
+        assert active(engine) == full_evaluation(RULES, signals), (step, signals)
+
+
+def test_window_boundaries():
+    engine = rules.RuleEngine.from_dicts(RULES)
+    seen = {}
+    for minute in range(23 * 60 + 55, 24 * 60 + 5):
+        engine.evaluate({CLOCK: minute % rules.MINUTES_PER_DAY})
+        seen[minute % rules.MINUTES_PER_DAY] = 'night' in active(engine)
+    assert [m for m, on in seen.items() if on] == [1438, 1439, 0, 1]
+
+    for minute, expected in ((7 * 60 + 29, False), (7 * 60 + 30, True), (7 * 60 + 59, True), (8 * 60, False)):
+        engine.evaluate({CLOCK: minute})
+        assert ('morning' in active(engine)) == expected, minute
+
+
+def test_changed_rules_are_reported_once():
+    engine = rules.RuleEngine.from_dicts(RULES)
+    changed = engine.evaluate({LESSON: '自习', process_signal('a.exe'): False})
+    assert [rule.name for rule in changed] == ['self-study']
+    assert engine.evaluate({LESSON: '自习', process_signal('a.exe'): False}) == []
+    changed = engine.evaluate({LESSON: '课间', process_signal('a.exe'): True})
+    assert sorted(rule.name for rule in changed) == ['break', 'music', 'self-study']
+
+
+def test_reload_matches_full_evaluation():
+    rng = random.Random(1)
+    engine = rules.RuleEngine.from_dicts(RULES)
+    items = RULES
+    signals = random_signals(rng, 7 * 60 + 40)
+    engine.evaluate(dict(signals))
+    for _ in range(50):
+        # 与插件重新加载规则相同：新规则从已生效的状态开始，之后按当前信号计算
+        items = rng.sample(RULES, rng.randint(1, len(RULES)))
+        previous = active(engine)
+        engine = rules.RuleEngine.from_dicts(items)
+        engine.preset(previous)
+        changed = engine.evaluate(dict(signals))
+        expected = full_evaluation(items, signals)
+        assert active(engine) == expected
+        assert {rule.name for rule in changed} == (expected ^ previous) & {item['name'] for item in items}
+
+        signals = random_signals(rng, (signals[CLOCK] + rng.randrange(60)) % rules.MINUTES_PER_DAY)
+        engine.evaluate(dict(signals))
+        assert active(engine) == full_evaluation(items, signals)
+
+
+def test_debounce_and_hysteresis():
+    engine = rules.RuleEngine.from_dicts([
+        {'name': 'music', 'process': 'a.exe', 'slot': -1, 'widget': 'lyrics.ui', 'debounce': 5, 'hysteresis': 10}
+    ])
+    running = process_signal('a.exe')
+    assert engine.evaluate({running: True}, 0) == []
+    assert engine.next_switch() == 5
+    assert engine.evaluate({running: True}, 4) == []
+    assert [rule.name for rule in engine.evaluate({running: True}, 5)] == ['music']
+
+    assert engine.evaluate({running: False}, 6) == []
+    # 延迟期间条件恢复：取消切换
+    assert engine.evaluate({running: True}, 8) == []
+    assert engine.next_switch() is None
+    assert engine.evaluate({running: False}, 9) == []
+    assert [rule.name for rule in engine.evaluate({running: False}, 19)] == ['music']
+    assert active(engine) == set()
+
+
+def test_invalid_rules():
+    with pytest.raises(ValueError):
+        rules.RuleEngine.from_dicts([{'name': 'x', 'slot': 0, 'widget': 'a.ui'}])
+    with pytest.raises(ValueError):
+        rules.RuleEngine.from_dicts([{'name': 'x', 'lessons': ['自习'], 'swap': ['a.ui']}])
+    with pytest.raises(ValueError):
+        rules.RuleEngine.from_dicts([RULES[0], RULES[0]])
@@ -0,0 +1,114 @@
+import os
+import time
+
+import pytest
+
+from benchmarks import load_plugin_module
+from benchmarks.host_sim import TARGET, FakeProcessTable
+
+shared_detector = load_plugin_module('shared_detector')
+process_watcher = load_plugin_module('process_watcher')
+
+
+def make_detector(directory, table, **options):
+    detector = shared_detector.SharedProcessDetector(
+        directory, process_watcher.ProcessWatcher(backend=table), **options
+    )
+    detector.watch(TARGET, name=TARGET)
+    return detector
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='Windows 的临时目录本身属于当前用户')
+def test_rejects_directory_accessible_by_other_users(tmp_path):
+    directory = tmp_path / 'shared'
+    directory.mkdir(mode=0o755)
+    os.chmod(directory, 0o755)
+    with pytest.raises(PermissionError):
+        make_detector(directory, FakeProcessTable(5))
+
+    make_detector(tmp_path / 'private', FakeProcessTable(5)).close()
+    assert os.stat(tmp_path / 'private').st_mode & 0o777 == 0o700
+
+
+def test_followers_read_leader_results(tmp_path):
+    table = FakeProcessTable(5, target_present=True)
+    leader = make_detector(tmp_path / 'shared', table)
+    follower = make_detector(tmp_path / 'shared', table)
+    try:
+        assert leader.poll() == {TARGET: True}
+        assert follower.poll() == {TARGET: True}
+        assert leader.leader and not follower.leader
+        assert follower.stats['shared_reads'] == 1
+        assert follower.stats['polls'] == 0
+    finally:
+        follower.close()
+        leader.close()
+
+
+def test_stale_results_fall_back_to_local_detection(tmp_path, monkeypatch):
+    table = FakeProcessTable(5, target_present=True)
+    leader = make_detector(tmp_path / 'shared', table, max_age=10)
+    follower = make_detector(tmp_path / 'shared', table, max_age=10)
+    try:
+        leader.poll()
+        now = time.time()
+        monkeypatch.setattr(shared_detector.time, 'time', lambda: now + 11)  # leader 超过 max_age 未检测
+        assert follower.poll() == {TARGET: True}
+        assert follower.stats['shared_reads'] == 0
+        assert follower.stats['fallback_polls'] == 1
+    finally:
+        follower.close()
+        leader.close()
+
+
+def test_follower_takes_over_when_leader_leaves(tmp_path):
+    table = FakeProcessTable(5)
+    leader = make_detector(tmp_path / 'shared', table)
+    follower = make_detector(tmp_path / 'shared', table)
+    try:
+        leader.poll()
+        leader.close()
+        assert follower.poll() == {TARGET: False}
+        assert follower.leader
+        assert follower.stats['takeovers'] == 1
+    finally:
+        follower.close()
+
+
+def test_idle_instance_clears_its_registration(tmp_path):
+    table = FakeProcessTable(5)
+    leader = make_detector(tmp_path / 'shared', table)
+    idle = make_detector(tmp_path / 'shared', table)
+    idle.watch('editor', name='notepad.exe')
+    try:
+        idle.poll()
+        assert leader._registered_names(time.time()) == {TARGET.lower(), 'notepad.exe'}
+        idle.unwatch(TARGET)
+        idle.unwatch('editor')  # 不再需要检测时不刷新心跳，登记立即清除
+        assert leader._registered_names(time.time()) == set()
+    finally:
+        idle.close()
+        leader.close()
+
+
+def test_expired_registration_is_not_overwritten_after_reclaim(tmp_path, monkeypatch):
+    table = FakeProcessTable(5)
+    stale = make_detector(tmp_path / 'shared', table, lease=30)
+    other = make_detector(tmp_path / 'shared', table, lease=30)
+    other.unwatch(TARGET)
+    other.watch('editor', name='notepad.exe')
+    try:
+        stale.poll()
+        now = time.time()
+        monkeypatch.setattr(shared_detector.time, 'time', lambda: now + 61)  # 超过 2 * lease 未刷新心跳
+        other.poll()
+        assert other._slot == stale._slot  # 过期的登记被回收
+
+        stale.watch('music', name='lx-music-desktop.exe')
+        stale.poll()
+        assert stale._slot != other._slot  # 重新登记，不写入其它实例的登记
+        assert stale._registered_names(now + 61) == {'notepad.exe'}
+        assert other._registered_names(now + 61) == {TARGET.lower(), 'lx-music-desktop.exe'}
+    finally:
+        other.close()
+        stale.close()
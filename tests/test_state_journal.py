@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+from benchmarks import load_plugin_module
+
+state_journal = load_plugin_module('state_journal')
+
+
+def reopen(path, **options):
+    journal = state_journal.StateJournal(path, **options)
+    data, dropped = journal.load()
+    return journal, data, dropped
+
+
+def lines(path):
+    return [json.loads(line) for line in path.read_bytes().splitlines()]
+
+
+def test_replays_set_del_and_snap(tmp_path):
+    path = tmp_path / 'state.journal'
+    path.write_text(
+        '["set","a",1]\n'
+        '["set","b",{"slots":[[0,"x.ui","y.ui"]]}]\n'
+        '["snap",{"c":null,"b":2}]\n'
+        '["del","b"]\n'
+        '["set","d",[1,2]]\n',
+        encoding='utf-8'
+    )
+    _, data, dropped = reopen(path)
+    assert data == {'c': None, 'd': [1, 2]}
+    assert dropped == 0
+
+
+def test_commit_appends_and_reloads(tmp_path):
+    path = tmp_path / 'state.journal'
+    journal, _, _ = reopen(path)
+    journal.set('lesson', {'slots': [[None, '组件.ui', 'b.ui']]})
+    journal.set('music', None)
+    assert journal.commit()
+    journal.delete('music')
+    journal.delete('missing')  # 不存在的键不产生记录
+    assert journal.commit()
+    assert not journal.commit()
+    journal.close()
+
+    assert lines(path) == [
+        ['set', 'lesson', {'slots': [[None, '组件.ui', 'b.ui']]}],
+        ['set', 'music', None],
+        ['del', 'music']
+    ]
+    _, data, _ = reopen(path)
+    assert data == {'lesson': {'slots': [[None, '组件.ui', 'b.ui']]}}
+
+
+def test_discard_restores_last_commit(tmp_path):
+    journal, _, _ = reopen(tmp_path / 'state.journal')
+    journal.set('a', 1)
+    journal.commit()
+    journal.set('a', 2)
+    journal.set('b', 3)
+    journal.delete('a')
+    journal.discard()
+    assert journal.data == {'a': 1}
+    assert not journal.commit()
+
+
+def test_compaction_replaces_log_with_snapshot(tmp_path):
+    path = tmp_path / 'state.journal'
+    journal, _, _ = reopen(path, compact_every=4)
+    for i in range(10):
+        journal.set(f'k{i % 3}', i)
+        journal.commit()
+    journal.close()
+
+    assert journal.stats['compactions'] >= 2
+    records = lines(path)
+    assert records[0][0] == 'snap'
+    assert len(records) < 4
+    _, data, _ = reopen(path)
+    assert data == {'k0': 9, 'k1': 7, 'k2': 8}
+
+
+@pytest.mark.parametrize('tail', [b'["set","b",', b'["set","b",2]', b'\xff\xfe', b'["bogus"]\n'])
+def test_torn_last_record_is_dropped(tmp_path, tail):
+    path = tmp_path / 'state.journal'
+    path.write_bytes(b'["set","a",1]\n' + tail)
+    journal, data, dropped = reopen(path)
+    assert data == {'a': 1}
+    assert dropped == 1
+    assert path.read_bytes() == b'["set","a",1]\n'
+
+    # 截断后追加的记录在下次启动时仍能重放
+    journal.set('c', 3)
+    journal.commit()
+    journal.close()
+    _, data, dropped = reopen(path)
+    assert data == {'a': 1, 'c': 3}
+    assert dropped == 0
+
+
+def test_records_after_corruption_are_dropped(tmp_path):
+    path = tmp_path / 'state.journal'
+    path.write_bytes(b'["set","a",1]\nnot json\n["set","b",2]\n')
+    _, data, dropped = reopen(path)
+    assert data == {'a': 1}
+    assert dropped == 2
+
+
+def test_reset_and_durability(tmp_path):
+    path = tmp_path / 'state.journal'
+    journal, _, _ = reopen(path, durability='fsync')
+    journal.set('a', 1)
+    journal.commit()
+    assert journal.stats['syncs'] == 1
+    journal.reset()
+    journal.close()
+    _, data, _ = reopen(path)
+    assert data == {}
+
+    with pytest.raises(ValueError):
+        state_journal.StateJournal(path, durability='always')
@@ -0,0 +1,57 @@
+from benchmarks import load_plugin_module
+
+tick_trace = load_plugin_module('tick_trace')
+
+
+def kinds(path):
+    return [record['k'] for record in tick_trace.read_trace(path)]
+
+
+def test_records_reach_disk_without_close(tmp_path):
+    path = tmp_path / 'trace.ndjson'
+    recorder = tick_trace.TraceRecorder(path, 's1', snapshot=lambda: {'applied': {}}, flush_interval=1.0)
+    recorder.record('tick', 100.0, lesson='语文')
+    assert kinds(path) == ['start', 'tick']
+
+    recorder.record('tick', 100.2, lesson='语文')  # 刷新间隔内的 tick 记录可以留在缓冲区
+    recorder.record('process', 100.4, running={'a.exe': True})
+    recorder.record('actions', 100.5, done=['规则生效: a'], applied=['a'])
+    assert kinds(path) == ['start', 'tick', 'tick', 'process', 'actions']
+
+    recorder.record('tick', 100.6, lesson='语文')
+    recorder.record('tick', 101.7, lesson='数学')
+    assert kinds(path)[-2:] == ['tick', 'tick']
+    recorder.close()
+
+
+def test_rotation_starts_each_file_with_snapshot(tmp_path):
+    path = tmp_path / 'trace.ndjson'
+    recorder = tick_trace.TraceRecorder(path, 's1', max_bytes=200, backups=2, snapshot=lambda: {'applied': {}})
+    for i in range(40):
+        recorder.record('tick', float(i), lesson='自习')
+    recorder.close()
+
+    assert recorder.stats['rotations'] > 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['trace.ndjson', 'trace.ndjson.1', 'trace.ndjson.2']
+    for file in tmp_path.iterdir():
+        assert tick_trace.read_trace(file)[0]['k'] == 'start'
+
+    records = tick_trace.read_trace(path)
+    times = [record['t'] for record in records if record['k'] == 'tick']
+    assert times == sorted(times) and times[-1] == 39.0
+    # 轮转产生的 start 记录属于同一次运行
+    assert len(tick_trace.split_sessions(records)) == 1
+
+
+def test_sessions_and_torn_lines(tmp_path):
+    path = tmp_path / 'trace.ndjson'
+    for session in ('s1', 's2'):
+        recorder = tick_trace.TraceRecorder(path, session)
+        recorder.record('tick', 1.0, lesson='')
+        recorder.close()
+    with open(path, 'ab') as f:
+        f.write(b'{"k":"tick","t":')  # 中途退出时写了一半的行
+
+    sessions = tick_trace.split_sessions(tick_trace.read_trace(path))
+    assert [s[0]['session'] for s in sessions] == ['s1', 's2']
+    assert [len(s) for s in sessions] == [2, 2]
@@ -0,0 +1,116 @@
+import json
+import os
+from datetime import date, datetime
+from pathlib import Path
+
+from benchmarks import load_plugin_module
+from benchmarks.host_sim import HostSimulator
+
+timetable = load_plugin_module('timetable')
+NO_LESSON = timetable.NO_LESSON
+BREAK = timetable.BREAK
+
+MONDAY = date(2025, 5, 5)  # 学期从 2025-04-28 开始时为双周，下周一为单周
+START_DATE = '2025-04-28'
+SCHEDULE = {
+    'part': {'0': [8, 0, 'part'], '1': [14, 0, 'part']},
+    'timeline': {'default': {'a01': '40', 'f01': '10', 'a02': '40', 'a11': '45'}},
+    'schedule': {'0': ['语文', '数学', '自习'], '3': ['物理', '化学', '自习'], '6': []},
+    'schedule_even': {'0': ['自习', '自习', '英语'], '1': []}
+}
+
+
+def clock(hour, minute=0):
+    return hour * 3600 + minute * 60
+
+
+def expected(first, second, third):
+    return [
+        (0, NO_LESSON), (clock(8), first), (clock(8, 40), BREAK), (clock(8, 50), second),
+        (clock(9, 30), NO_LESSON), (clock(14), third), (clock(14, 45), NO_LESSON)
+    ]
+
+
+def test_day_segments_parts_and_breaks():
+    assert timetable.day_segments(SCHEDULE, MONDAY) == expected('语文', '数学', '自习')
+    assert timetable.day_segments({}, MONDAY) == [(0, NO_LESSON)]
+
+
+def test_day_segments_odd_and_even_weeks():
+    assert timetable.day_segments(SCHEDULE, MONDAY, START_DATE) == expected('自习', '自习', '英语')
+    assert timetable.day_segments(SCHEDULE, date(2025, 5, 12), START_DATE) == expected('语文', '数学', '自习')
+    # 无效的学期开始日期按单周处理
+    assert timetable.day_segments(SCHEDULE, MONDAY, '2025/04/28') == expected('语文', '数学', '自习')
+    # 双周课表当天为空时使用单周课表
+    tuesday = timetable.day_segments(SCHEDULE, date(2025, 5, 6), START_DATE)
+    assert tuesday == expected(NO_LESSON, NO_LESSON, NO_LESSON)
+
+
+def test_day_segments_empty_day():
+    sunday = timetable.day_segments(SCHEDULE, date(2025, 5, 11))
+    assert [name for _, name in sunday] == [NO_LESSON, NO_LESSON, BREAK, NO_LESSON, NO_LESSON, NO_LESSON, NO_LESSON]
+
+
+def write_timetable(base_dir, schedule='test.json', start_date=START_DATE):
+    os.makedirs(os.path.join(base_dir, 'config', 'schedule'), exist_ok=True)
+    with open(os.path.join(base_dir, 'config', 'schedule', 'test.json'), 'w', encoding='utf-8') as f:
+        json.dump(SCHEDULE, f, ensure_ascii=False)
+    with open(os.path.join(base_dir, 'config.ini'), 'w', encoding='utf-8') as f:
+        f.write(f'[General]\nschedule = {schedule}\n\n[Date]\nstart_date = {start_date}\n')
+
+
+def test_load_and_transitions(tmp_path):
+    write_timetable(str(tmp_path))
+    table = timetable.Timetable(Path(tmp_path))
+    assert table.load() is True
+    assert table.load() is False
+
+    # 双周：两节自习之间的课间也是切换点
+    assert table.transitions(MONDAY, {'自习'}) == [
+        (clock(8), '自习'), (clock(8, 40), BREAK), (clock(8, 50), '自习'), (clock(9, 30), NO_LESSON)
+    ]
+    assert table.transitions(MONDAY, {'英语'}) == [(clock(14), '英语'), (clock(14, 45), NO_LESSON)]
+    assert table.transitions(MONDAY, {'物理'}) == []
+
+    write_timetable(str(tmp_path), start_date='2025-05-05')  # 学期开始日期变化
+    assert table.load() is True
+    assert table.transitions(MONDAY, {'自习'}) == [(clock(14), '自习'), (clock(14, 45), NO_LESSON)]
+
+    write_timetable(str(tmp_path), schedule='missing.json')
+    try:
+        table.load()
+    except FileNotFoundError:
+        pass
+    else:
+        raise AssertionError('找不到课表时应抛出 FileNotFoundError')
+    table.close()
+
+
+def test_failed_midnight_reload_is_retried(tmp_path):
+    rules = [{'name': 'study', 'lessons': ['自习'], 'slot': -1, 'widget': 'quiet.ui'}]
+
+    def setup(sim):
+        write_timetable(sim.base_dir)
+        config_dir = os.path.join(sim.plugin_dir, 'config')
+        os.makedirs(config_dir, exist_ok=True)
+        with open(os.path.join(config_dir, 'rules.json'), 'w', encoding='utf-8') as f:
+            json.dump({'rules': rules}, f)
+
+    sim = HostSimulator(str(tmp_path), process_count=20, background=False, setup=setup)
+    try:
+        plugin = sim.plugin
+        assert plugin.timetable is not None and plugin._transitions  # 2025-05-01 周四下午有自习
+
+        # 午夜重新读取时 config.ini 指向不存在的课表
+        write_timetable(sim.base_dir, schedule='missing.json')
+        sim.tick('', datetime(2025, 5, 2, 0, 0, 2).timestamp() - sim.clock.time())
+        assert plugin._transitions == []
+        retry = plugin.scheduler._due['timetable_day']
+        assert retry == sim.clock.time() + sim.main.TIMETABLE_RETRY
+
+        write_timetable(sim.base_dir)
+        sim.tick('', sim.main.TIMETABLE_RETRY + 1)
+        # 周五没有课：切换点为空，下一次重新读取安排在下一个午夜之后
+        assert plugin.scheduler._due['timetable_day'] == datetime(2025, 5, 3, 0, 0, 1).timestamp()
+    finally:
+        sim.close()
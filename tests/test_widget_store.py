@@ -0,0 +1,131 @@
+import json
+import os
+
+import pytest
+
+from benchmarks import load_plugin_module
+
+widget_store = load_plugin_module('widget_store')
+
+# 宿主的格式：制表符缩进、多余空格、嵌套的同名键、转义字符和其它类型的值
+HOST_LAYOUT = (
+    '{\n\t"theme":"dark", "nested": {"widgets": ["x"]},\n'
+    '\t"widgets" : [ "a.ui","课表.ui" ,\n\t\t"q\\"uote.ui"],\n'
+    '\t"n": [1, 2.5e3, true, null]\n}\n'
+)
+
+
+def make_store(tmp_path, text=HOST_LAYOUT):
+    path = tmp_path / 'widget.json'
+    path.write_text(text, encoding='utf-8')
+    return path, widget_store.WidgetConfigStore(path)
+
+
+def test_widget_spans():
+    raw = HOST_LAYOUT.encode('utf-8')
+    spans = widget_store.widget_spans(raw)
+    assert [json.loads(raw[start:end]) for start, end in spans] == ['a.ui', '课表.ui', 'q"uote.ui']
+
+    assert widget_store.widget_spans(b'{"widgets": []}') == []
+    for bad in (b'{"widgets": [["a"]]}', b'{"widgets": [{"a": 1}]}', b'{"a": {"widgets": ["x"]}}', b'{"widgets": ["a"'):
+        assert not widget_store.widget_spans(bad)
+
+
+def test_same_length_edit_writes_in_place(tmp_path):
+    path, store = make_store(tmp_path)
+    inode = os.stat(path).st_ino
+    store.set_widget(0, 'b.ui')
+    assert store.commit()
+    assert path.read_text(encoding='utf-8') == HOST_LAYOUT.replace('"a.ui"', '"b.ui"')
+    assert os.stat(path).st_ino == inode
+    assert store.stats['inplace_writes'] == 1 and store.stats['full_writes'] == 0
+
+
+def test_length_changing_edit_keeps_layout(tmp_path):
+    path, store = make_store(tmp_path)
+    store.set_widget(0, 'longer-name.ui')
+    store.set_widget(-1, 'z.ui')
+    assert store.commit()
+    expected = HOST_LAYOUT.replace('"a.ui"', '"longer-name.ui"').replace('"q\\"uote.ui"', '"z.ui"')
+    assert path.read_text(encoding='utf-8') == expected
+    assert store.stats['patches'] == 1 and store.stats['inplace_writes'] == 0 and store.stats['full_writes'] == 0
+
+    # 更新后的位置可以继续按位置修改
+    store.set_widget(1, '天气预报.ui')
+    assert store.commit()
+    assert json.loads(path.read_text(encoding='utf-8'))['widgets'] == ['longer-name.ui', '天气预报.ui', 'z.ui']
+    assert store.stats['patches'] == 2
+
+
+@pytest.mark.parametrize('name', ['课表.ui', 'back\\slash.ui', 'q"uote.ui', 'tab\t.ui', '\U0001f600.ui'])
+def test_escaped_and_unicode_names(tmp_path, name):
+    # 原文件中的组件名用 \u 转义
+    path, store = make_store(tmp_path, '{"widgets": ["\\u8bfe\\u8868.ui", "b.ui"]}')
+    assert store.widgets() == ['课表.ui', 'b.ui']
+    store.set_widget(0, name)
+    store.set_widget(1, name)
+    assert store.commit()
+    assert json.loads(path.read_text(encoding='utf-8')) == {'widgets': [name, name]}
+    assert store.stats['patches'] == 1
+
+    reloaded = widget_store.WidgetConfigStore(path)
+    assert reloaded.widgets() == [name, name]
+    assert reloaded.positions(name) == [0, 1]
+
+
+def test_unrecognized_spans_fall_back_to_full_write(tmp_path):
+    # 重复的键：扫描到第一个 widgets，json 使用最后一个，位置校验失败
+    path, store = make_store(tmp_path, '{"widgets": ["a.ui"], "widgets": ["b.ui", "c.ui"]}')
+    assert store.widgets() == ['b.ui', 'c.ui']
+    assert store._spans is None
+    store.set_widget(0, 'd.ui')
+    assert store.commit()
+    assert json.loads(path.read_text(encoding='utf-8')) == {'widgets': ['d.ui', 'c.ui']}
+    assert store.stats['full_writes'] == 1 and store.stats['patches'] == 0
+
+
+def test_write_patch(tmp_path):
+    path, store = make_store(tmp_path)
+    store.data()
+    assert store._write_patch(*store._patch({})) is False
+    assert store.stats['skipped_commits'] == 1
+
+    # 内容相同但文件状态变化（例如被重写为相同内容）：原地写入前放弃
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    with pytest.raises(widget_store.ConflictError):
+        store._write_patch(*store._patch({0: 'b.ui'}))
+    assert path.read_text(encoding='utf-8') == HOST_LAYOUT
+
+
+def test_reverted_edit_skips_write(tmp_path):
+    path, store = make_store(tmp_path)
+    mtime = os.stat(path).st_mtime_ns
+    store.set_widget(0, 'b.ui')
+    store.set_widget(0, 'a.ui')
+    assert store.commit() is False
+    assert store.stats['skipped_commits'] == 1
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_external_change_raises_conflict(tmp_path):
+    path, store = make_store(tmp_path)
+    store.set_widget(0, 'b.ui')
+    path.write_text(HOST_LAYOUT.replace('"dark"', '"lite"'), encoding='utf-8')
+    with pytest.raises(widget_store.ConflictError):
+        store.commit()
+    assert store.stats['conflicts'] == 1
+
+    # 缓存已丢弃，按新内容重新修改
+    assert not store.dirty
+    store.set_widget(0, 'b.ui')
+    assert store.commit()
+    assert path.read_text(encoding='utf-8') == HOST_LAYOUT.replace('"dark"', '"lite"').replace('"a.ui"', '"b.ui"')
+
+
+def test_positions_on_first_read_and_after_reload(tmp_path):
+    path, store = make_store(tmp_path)
+    assert store.positions('课表.ui') == [1]  # 首次读取即建立索引
+    path.write_text('{"widgets": ["课表.ui", "a.ui"]}', encoding='utf-8')
+    assert store.positions('课表.ui') == [0]
+    assert store.positions('missing.ui') == ()
@@ -0,0 +1,110 @@
+import json
+import os
+from pathlib import Path
+
+_FLUSH_KINDS = frozenset(('start', 'process', 'rules', 'actions'))  # 写入后立即刷新的记录类型
+
+
+class TraceRecorder:
+    """tick 输入与执行操作的记录（NDJSON，每行一条）
+
+    k 为记录类型：start（文件开头的状态快照）、tick（宿主输入）、process（进程检测结果变化）、
+    rules（重新加载的规则）、actions（执行的操作）；t 为时间戳。
+    只有实际执行的 tick 才会记录，空闲 tick 没有额外开销。文件超过 max_bytes 时轮转为
+    trace.ndjson.1 ... trace.ndjson.N，每个文件都以 start 记录开头，可以单独回放。
+    进程检测结果、规则和操作记录写入后立即刷新到系统，tick 记录最多缓冲 flush_interval 秒，
+    插件崩溃或运行中复制文件时不会丢失需要回放的记录。
+    """
+
+    def __init__(self, path, session, max_bytes=1024 * 1024, backups=3, snapshot=None, flush_interval=1.0):
+        self.path = Path(path)
+        self.session = session  # 同一次运行的记录共用的标识
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.snapshot = snapshot  # 返回当前状态快照（写入 start 记录）的函数
+        self.flush_interval = flush_interval
+        self._flushed = None  # 上次刷新的时间
+        self._encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        self._file = None
+        self._size = 0
+        self.stats = {'records': 0, 'bytes': 0, 'rotations': 0, 'flushes': 0}
+
+    def record(self, kind, now, **fields):
+        if self._file is None:
+            self._open(now, rotated=False)
+        elif self._size >= self.max_bytes:
+            self._rotate(now)
+        fields['k'] = kind
+        fields['t'] = now
+        self._write(fields)
+        if kind in _FLUSH_KINDS or self._flushed is None or now - self._flushed >= self.flush_interval:
+            self.flush()
+            self._flushed = now
+
+    def _write(self, record):
+        data = (self._encoder.encode(record) + '\n').encode('utf-8')
+        self._file.write(data)
+        self._size += len(data)
+        self.stats['records'] += 1
+        self.stats['bytes'] += len(data)
+
+    def _open(self, now, rotated):
+        self._file = open(self.path, 'ab')
+        self._size = self._file.tell()
+        start = dict(self.snapshot()) if self.snapshot is not None else {}
+        start.update(k='start', t=now, session=self.session, rotated=rotated)
+        self._write(start)
+
+    def _rotate(self, now):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            source = self.path.with_name(f'{self.path.name}.{i}')
+            if source.exists():
+                os.replace(source, self.path.with_name(f'{self.path.name}.{i + 1}'))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f'{self.path.name}.1'))
+        else:
+            self.path.unlink(missing_ok=True)
+        self.stats['rotations'] += 1
+        self._open(now, rotated=True)
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+            self.stats['flushes'] += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_trace(path):
+    """按时间顺序读取记录（先读最旧的轮转文件），跳过无法解析的行（例如中途退出时写了一半）"""
+    path = Path(path)
+    rotated = [p for p in path.parent.glob(f'{path.name}.*') if p.suffix[1:].isdigit()]
+    rotated.sort(key=lambda p: int(p.suffix[1:]), reverse=True)
+    records = []
+    for file in rotated + [path]:
+        if not file.exists():
+            continue
+        with open(file, 'rb') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+
+def split_sessions(records):
+    """按 start 记录的 session 把记录分为每次运行一组（轮转产生的 start 记录不分组）"""
+    sessions = []
+    current = None
+    for record in records:
+        if record.get('k') == 'start' and (current is None or record.get('session') != current[0].get('session')):
+            current = [record]
+            sessions.append(current)
+        elif current is not None:
+            current.append(record)
+    return sessions
@@ -0,0 +1,138 @@
+import os
+from datetime import date as _date
+
+from .ClassWidgets.base import PluginConfig
+
+BREAK = '课间'
+NO_LESSON = '暂无课程'
+
+
+def _part_start(value):
+    """节点开始时间 [时, 分] 或 [时, 分, 类型] 转换为当天的秒数"""
+    return int(value[0]) * 3600 + int(value[1]) * 60
+
+
+def _is_even_week(day, start_date):
+    if not start_date:
+        return False
+    try:
+        start = _date.fromisoformat(start_date)
+    except ValueError:
+        return False
+    return ((day - start).days // 7) % 2 == 1
+
+
+def day_segments(data, day, start_date=None):
+    """按课表内容 data 计算 day 当天的课程时间段：按开始时间排序的 [(开始秒数, 课程名)]，第一项从 0 点开始
+
+    start_date 为学期开始日期（YYYY-MM-DD），用于区分单双周课表。
+    """
+    weekday = str(day.weekday())
+
+    timeline = data.get('timeline', {})
+    items = timeline.get(weekday) or timeline.get('default') or {}
+    schedule = data.get('schedule', {})
+    if _is_even_week(day, start_date) and data.get('schedule_even', {}).get(weekday):
+        schedule = data['schedule_even']
+    lessons = list(schedule.get(weekday, []))
+
+    # 时间线键名为 类型 + 节点 + 序号，如 a01（节点 0 第 1 节课）、f01（之后的课间）
+    parts = data.get('part', {})
+    entries = []
+    for key, minutes in items.items():
+        kind, part, index = key[0], key[1], key[2:]
+        if kind not in ('a', 'f') or part not in parts or not index.isdigit():
+            continue
+        entries.append((_part_start(parts[part]), int(index), kind == 'f', part, int(minutes)))
+    entries.sort()
+
+    result = [(0, NO_LESSON)]
+    current_part = None
+    elapsed = 0
+    for start, _, is_break, part, minutes in entries:
+        if part != current_part:
+            if current_part is not None:
+                result.append((elapsed, NO_LESSON))  # 两个节点之间
+            current_part, elapsed = part, start
+        if is_break:
+            name = BREAK
+        else:
+            name = lessons.pop(0) if lessons else NO_LESSON
+        result.append((elapsed, name))
+        elapsed += minutes * 60
+    if entries:
+        result.append((elapsed, NO_LESSON))
+    return result
+
+
+class Timetable:
+    """ClassWidgets 课表
+
+    从宿主的 config.ini 读取当前课表文件名，解析 config/schedule/ 下的课表，
+    计算某一天的课程时间段和课程切换时间。课表内容由 PluginConfig 缓存，
+    可通过 subscribe() 在课表文件变化时收到通知。
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.schedule_dir = base_dir / 'config' / 'schedule'
+        self.settings = {}  # config.ini 中与课表相关的设置
+        self.config = None
+        self._callback = None
+
+    def _read_settings(self):
+        import configparser  # 只在启用课表时才导入
+        parser = configparser.ConfigParser(interpolation=None)
+        for path in (self.base_dir / 'config.ini', self.base_dir / 'config' / 'config.ini'):
+            if path.exists():
+                parser.read(path, encoding='utf-8')
+                break
+        return {
+            'schedule': parser.get('General', 'schedule', fallback=None),
+            'start_date': parser.get('Date', 'start_date', fallback=None)
+        }
+
+    def load(self):
+        """读取当前课表，返回课表文件或设置是否发生变化；找不到课表时抛出 FileNotFoundError"""
+        settings = self._read_settings()
+        name = settings['schedule']
+        if not name or not os.path.exists(self.schedule_dir / name):
+            raise FileNotFoundError(f'找不到课表文件: {name}')
+
+        changed = settings != self.settings
+        if self.config is None or self.config.filename != name:
+            # 宿主切换了课表：改为监视新的课表文件
+            self.close()
+            self.config = PluginConfig(str(self.schedule_dir), name)
+            if self._callback is not None:
+                self.config.subscribe(self._callback)
+            changed = True
+        self.settings = settings
+        return self.config.update_config() or changed
+
+    def subscribe(self, callback):
+        """课表文件内容变化时调用 callback(config)（在监视线程中调用）；config.ini 的变化在下次 load() 时生效"""
+        self._callback = callback
+        if self.config is not None:
+            self.config.subscribe(callback)
+
+    def close(self):
+        if self.config is not None and self._callback is not None:
+            self.config.unsubscribe(self._callback)
+
+    def segments(self, day):
+        """day 当天的课程时间段：按开始时间排序的 [(开始秒数, 课程名)]，第一项从 0 点开始"""
+        data = self.config.config if self.config is not None else {}
+        return day_segments(data, day, self.settings.get('start_date'))
+
+    def transitions(self, day, lessons):
+        """day 当天进入或离开 lessons 中课程的时间点：[(开始秒数, 新课程名)]"""
+        result = []
+        previous = None
+        for start, name in self.segments(day):
+            if name == previous:
+                continue
+            if previous is not None and (name in lessons or previous in lessons):
+                result.append((start, name))
+            previous = name
+        return result
@@ -0,0 +1,299 @@
+import bisect
+import json
+import os
+import re
+from pathlib import Path
+
+from .file_lock import FileLock
+
+# JSON 字符串和结构符号；数字、true/false/null 和空白由正则引擎直接跳过
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[\[\]{}:,]')
+
+
+class ConflictError(Exception):
+    """提交时发现 widget.json 已被其它程序修改"""
+
+
+def widget_spans(raw):
+    """扫描 widget.json 的原始字节，返回顶层 widgets 数组中每个字符串元素的 (开始, 结束) 字节位置
+
+    widgets 不存在、元素不是字符串或文件结构无法识别时返回 None。
+    """
+    depth = 0
+    candidate = key = None  # 顶层对象中最近的字符串 / 冒号前的键
+    spans = None
+    in_widgets = False
+    for match in _TOKEN.finditer(raw):
+        token = match.group()
+        char = token[:1]
+        if char == b'"':
+            if in_widgets:
+                spans.append(match.span())
+            elif depth == 1:
+                candidate = token
+        elif char in b'{[':
+            depth += 1
+            if in_widgets:
+                return None  # 嵌套的数组或对象
+            if char == b'[' and depth == 2 and key == b'"widgets"' and spans is None:
+                in_widgets = True
+                spans = []
+        elif char in b'}]':
+            in_widgets = False
+            depth -= 1
+            if depth < 0:
+                return None
+        elif depth == 1:
+            key = candidate if char == b':' else None
+    return spans if depth == 0 else None
+
+
+class WidgetConfigStore:
+    """widget.json 缓存层
+
+    解析结果保存在内存中，仅当文件的 mtime/大小/inode 变化时重新读取。
+    同一 tick 内的修改先暂存，最后由 commit() 统一写入一次；内容与磁盘相同时跳过写入。
+    读取时记录 widgets 数组中每个组件名的字节位置，只修改组件名时直接替换这些字节
+    （长度不变时原地写入，否则原子替换文件），保留宿主的格式和其它键；
+    无法识别文件结构或修改了整个列表时按 indent 重新序列化并原子写入。
+    组件名 -> 位置的索引按需建立，单个组件修改时增量更新。
+    读取和写入时持有 widget.json.lock 上的建议锁（协调多个插件实例）；提交前确认磁盘内容
+    与读取时一致，不一致时抛出 ConflictError，由调用方按新内容重新计算。
+    """
+
+    def __init__(self, path, indent=4, lock_timeout=2):
+        self.path = Path(path)
+        self.indent = indent
+        self.lock = FileLock(self.path.with_name(self.path.name + '.lock'), timeout=lock_timeout)
+        self._encoder = json.JSONEncoder(indent=indent)
+        self._data = None
+        self._raw = None  # 与磁盘内容一致的原始字节
+        self._spans = None  # widgets 中每个组件名在 _raw 中的字节位置
+        self._changed = {}  # 暂存的 位置 -> 组件名
+        self._signature = None
+        self._dirty = False
+        self._index = None  # 组件名 -> 升序位置列表
+        self.stats = {
+            'loads': 0, 'cache_hits': 0, 'commits': 0, 'skipped_commits': 0,
+            'patches': 0, 'inplace_writes': 0, 'full_writes': 0, 'conflicts': 0, 'read_errors': 0
+        }
+
+    def _stat_signature(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def data(self):
+        """返回当前配置（含本 tick 已暂存的修改）"""
+        if self._dirty:
+            return self._data
+
+        signature = self._stat_signature()
+        if self._data is not None and signature == self._signature:
+            self.stats['cache_hits'] += 1
+            return self._data
+
+        with self.lock:
+            signature = self._stat_signature()
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+        try:
+            data = json.loads(raw.decode('utf-8'))
+        except ValueError:
+            # 宿主写入到一半等情况：不缓存，下次重新读取
+            self.stats['read_errors'] += 1
+            raise
+        self._data = data
+        self._index = None
+        self._raw = raw
+        self._spans = self._check_spans(raw, widget_spans(raw))
+        self._changed = {}
+        self._signature = signature
+        self.stats['loads'] += 1
+        return self._data
+
+    def _check_spans(self, raw, spans):
+        """确认每个位置解析出的组件名与 json 解析结果一致，否则不使用按位置替换"""
+        widgets = self._data.get('widgets') if isinstance(self._data, dict) else None
+        if spans is None or not isinstance(widgets, list) or len(spans) != len(widgets):
+            return None
+        for (start, end), widget in zip(spans, widgets):
+            if json.loads(raw[start:end]) != widget:
+                return None
+        return spans
+
+    def widgets(self):
+        """返回 widgets 列表（只读使用，修改请调用 set_widget）"""
+        return self.data().get('widgets', [])
+
+    def positions(self, name):
+        """组件 name 所在的位置（升序，只读），基于最近一次 data()/widgets() 读取的内容"""
+        widgets = self.widgets()  # 重新读取文件时会清空索引，先读取再建立
+        if self._index is None:
+            index = {}
+            for i, widget in enumerate(widgets):
+                index.setdefault(widget, []).append(i)
+            self._index = index
+        return self._index.get(name, ())
+
+    def set_widget(self, index, name):
+        """暂存单个组件修改"""
+        widgets = self.data()['widgets']
+        index = range(len(widgets))[index]  # 负数位置转换为正数，越界时抛出 IndexError
+        old = widgets[index]
+        if old == name:
+            return
+        widgets[index] = name
+        self._dirty = True
+        self._changed[index] = name
+
+        if self._index is not None:
+            positions = self._index[old]
+            positions.remove(index)
+            if not positions:
+                del self._index[old]
+            bisect.insort(self._index.setdefault(name, []), index)
+
+    def apply(self, changes):
+        """暂存一组 (位置, 组件名) 修改"""
+        for index, name in changes:
+            self.set_widget(index, name)
+
+    @property
+    def dirty(self):
+        return self._dirty
+
+    def commit(self):
+        """写入暂存的修改，返回是否实际写入了文件"""
+        if not self._dirty:
+            return False
+        self._dirty = False
+        changed, self._changed = self._changed, {}
+
+        try:
+            with self.lock:
+                self._check_version()
+                if self._spans is not None:
+                    patch = self._patch(changed)
+                    if patch is not None:
+                        return self._write_patch(*patch)
+                return self._write_full()
+        except Exception:
+            # 写入失败时丢弃缓存，下次重新读取磁盘内容
+            self.invalidate()
+            raise
+
+    def _check_version(self):
+        """确认磁盘内容与读取时一致
+
+        始终比较内容：文件修改时间的精度有限，长度不变的原地写入后文件状态可能完全相同。
+        """
+        signature = self._stat_signature()
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        if raw != self._raw:
+            self.stats['conflicts'] += 1
+            raise ConflictError('widget.json 已被其它程序修改')
+        self._signature = signature
+
+    def _patch(self, changed):
+        """只替换修改过的组件名，返回 (新内容, 新位置, [(开始, 结束, 新字节)])；校验失败时返回 None"""
+        raw = self._raw
+        parts = []
+        spans = []
+        edits = []
+        position = shift = 0
+        for index, (start, end) in enumerate(self._spans):
+            encoded = None
+            if index in changed:
+                encoded = json.dumps(changed[index], ensure_ascii=False).encode('utf-8')
+                if raw[start:end] == encoded:
+                    encoded = None
+            if encoded is None:
+                spans.append((start + shift, end + shift))
+                continue
+            parts.append(raw[position:start])
+            parts.append(encoded)
+            position = end
+            edits.append((start, end, encoded))
+            spans.append((start + shift, start + shift + len(encoded)))
+            shift += len(encoded) - (end - start)
+        parts.append(raw[position:])
+        patched = b''.join(parts)
+
+        # 位置在读取时已校验，文件的其余部分不变：只需确认新位置上是合法的 JSON 字符串且解析为目标组件名，
+        # 替换后的内容必然仍能解析
+        for index, name in changed.items():
+            start, end = spans[index]
+            try:
+                if json.loads(patched[start:end]) != name:
+                    return None
+            except ValueError:
+                return None
+        return patched, spans, edits
+
+    def _write_patch(self, patched, spans, edits):
+        if not edits:
+            self.stats['skipped_commits'] += 1
+            return False
+
+        if all(end - start == len(encoded) for start, end, encoded in edits):
+            # 每个组件名长度都不变：只写入修改的字节（打开后再确认仍是同一个文件）
+            with open(self.path, 'r+b') as f:
+                st = os.fstat(f.fileno())
+                if (st.st_mtime_ns, st.st_size, st.st_ino) != self._signature:
+                    self.stats['conflicts'] += 1
+                    raise ConflictError('widget.json 已被其它程序修改')
+                for start, _, encoded in edits:
+                    f.seek(start)
+                    f.write(encoded)
+            self.stats['inplace_writes'] += 1
+        else:
+            self._replace(patched)
+        self._raw = patched
+        self._spans = spans
+        self._signature = self._stat_signature()
+        self.stats['patches'] += 1
+        self.stats['commits'] += 1
+        return True
+
+    def _write_full(self):
+        raw = self._encoder.encode(self._data).encode('utf-8')
+        if raw == self._raw:
+            self.stats['skipped_commits'] += 1
+            return False
+        self._replace(raw)
+        self._raw = raw
+        self._spans = widget_spans(raw)
+        self._signature = self._stat_signature()
+        self.stats['full_writes'] += 1
+        self.stats['commits'] += 1
+        return True
+
+    def _replace(self, raw):
+        """先写临时文件再替换，避免写入中断时损坏配置"""
+        temp_file = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(temp_file, 'wb') as f:
+                f.write(raw)
+            os.replace(temp_file, self.path)
+        except Exception:
+            temp_file.unlink(missing_ok=True)
+            raise
+
+    def close(self):
+        self.lock.close()
+
+    def discard(self):
+        """丢弃暂存的修改"""
+        if self._dirty:
+            self.invalidate()
+
+    def invalidate(self):
+        """清空缓存，下次访问时重新读取"""
+        self._data = None
+        self._raw = None
+        self._spans = None
+        self._changed = {}
+        self._signature = None
+        self._index = None
+        self._dirty = False
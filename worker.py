@@ -0,0 +1,101 @@
+import logging
+import threading
+from collections import OrderedDict, deque
+
+
+class _Job:
+    __slots__ = ('key', 'fn', 'args', 'callback')
+
+    def __init__(self, key, fn, args, callback):
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.callback = callback
+
+
+class BackgroundWorker:
+    """后台任务线程
+
+    任务按 key 排队，同一 key 尚未开始执行的任务会被新提交的任务替换（合并），
+    队列长度有上限。任务完成后回调不会在后台线程执行，而是由宿主线程调用
+    run_callbacks() 时依次执行，因此回调中可以安全地修改插件状态。
+    on_complete 在每个任务完成后于后台线程调用，用于通知宿主线程有回调待执行。
+    """
+
+    def __init__(self, name='EasiControlWorker', maxsize=16, on_complete=None):
+        self.maxsize = maxsize
+        self.on_complete = on_complete
+        self._pending = OrderedDict()  # key -> _Job
+        self._running = None
+        self._completed = deque()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self.logger = logging.getLogger(__name__)
+        self.stats = {'submitted': 0, 'coalesced': 0, 'rejected': 0, 'completed': 0, 'failed': 0}
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, key, fn, *args, callback=None):
+        """提交任务，返回是否已入队（队列已满或已关闭时返回 False）"""
+        with self._cond:
+            if self._stopping:
+                return False
+            if key in self._pending:
+                # 替换尚未执行的同类任务，保留原有排队位置
+                self._pending[key] = _Job(key, fn, args, callback)
+                self.stats['coalesced'] += 1
+                return True
+            if len(self._pending) >= self.maxsize:
+                self.stats['rejected'] += 1
+                return False
+
+            self._pending[key] = _Job(key, fn, args, callback)
+            self.stats['submitted'] += 1
+            self._cond.notify()
+            return True
+
+    def idle(self):
+        with self._cond:
+            return not self._pending and self._running is None
+
+    def run_callbacks(self):
+        """在宿主线程中执行已完成任务的回调"""
+        while self._completed:
+            job, result, error = self._completed.popleft()
+            if error is not None:
+                self.logger.error("后台任务失败 %s: %s", job.key, error)
+                continue
+            if job.callback is not None:
+                job.callback(result)
+
+    def shutdown(self, timeout=5):
+        """执行完剩余任务后停止线程"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                _, job = self._pending.popitem(last=False)
+                self._running = job
+
+            try:
+                result, error = job.fn(*job.args), None
+                self.stats['completed'] += 1
+            except Exception as e:
+                result, error = None, e
+                self.stats['failed'] += 1
+
+            self._completed.append((job, result, error))
+            with self._cond:
+                self._running = None
+            if self.on_complete is not None:
+                self.on_complete()